@@ -0,0 +1,204 @@
+"""Helpers for keeping blocking work off the event loop."""
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from .config import get_settings
+from .metrics import (
+    event_loop_lag,
+    event_loop_slow_callbacks,
+    pool_active,
+    pool_pending,
+    pool_queue_wait,
+    pool_size,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_call_context = threading.local()
+
+
+def current_queue_wait() -> float | None:
+    """Seconds the running pool call waited for a worker thread (None outside a pool)."""
+    return getattr(_call_context, "queue_wait", None)
+
+
+class BlockingPool:
+    """
+    Bounded thread pool for running blocking calls from async handlers.
+
+    Keeps track of how many calls are running or waiting, and how long
+    they wait for a worker thread, so the pool can be monitored.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"{name}-pool"
+        )
+        self._pending = 0
+        self._active = 0
+        self._active_lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Number of calls submitted and not yet finished (running or queued)."""
+        return self._pending
+
+    @property
+    def active(self) -> int:
+        """Number of calls currently running in a worker thread."""
+        return self._active
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run ``func(*args, **kwargs)`` in the pool and await its result."""
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        try:
+            return await loop.run_in_executor(
+                self._executor,
+                functools.partial(self._call, time.monotonic(), func, *args, **kwargs),
+            )
+        finally:
+            self._pending -= 1
+
+    def _call(self, submitted: float, func: Callable[..., T], *args, **kwargs) -> T:
+        wait = time.monotonic() - submitted
+        pool_queue_wait.observe(wait, pool=self.name)
+        _call_context.queue_wait = wait
+        with self._active_lock:
+            self._active += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _call_context.queue_wait = None
+            with self._active_lock:
+                self._active -= 1
+
+    def shutdown(self) -> None:
+        """Stop accepting work and wait for running calls to finish."""
+        self._executor.shutdown(wait=True)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight call.
+
+    The first caller for a key starts the work; callers arriving while it
+    is still running await the same result instead of repeating it.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Run ``func()`` for ``key`` unless a call for it is already in flight."""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        # Shield so one caller going away doesn't cancel the others' result
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+
+_settings = get_settings()
+
+# Separate pools so long-running code execution can never starve
+# the quick filesystem reads that serve curriculum pages.
+io_pool = BlockingPool("io", _settings.io_pool_workers)
+execution_pool = BlockingPool("execution", _settings.execution_pool_workers)
+_pools = (io_pool, execution_pool)
+
+pool_pending.set_function(lambda: {(p.name,): p.pending for p in _pools})
+pool_active.set_function(lambda: {(p.name,): p.active for p in _pools})
+pool_size.set_function(lambda: {(p.name,): p.max_workers for p in _pools})
+
+
+class LoopLagMonitor:
+    """
+    Measures how long the event loop is blocked.
+
+    A background task sleeps for ``interval`` seconds at a time; any extra
+    delay before it wakes up is time the loop spent running something else
+    without yielding. Delays above ``threshold`` are logged.
+    """
+
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.slow_count = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start monitoring the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop monitoring."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            if lag <= 0:
+                continue
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self.slow_count += 1
+                self.total_lag += lag
+                logger.warning("Event loop blocked for %.3f seconds", lag)
+
+    def stats(self) -> dict:
+        """Blocking statistics since the monitor started."""
+        return {
+            "max_lag_seconds": round(self.max_lag, 6),
+            "blocked_seconds": round(self.total_lag, 6),
+            "slow_count": self.slow_count,
+        }
+
+
+loop_monitor = LoopLagMonitor(threshold=_settings.event_loop_lag_threshold)
+
+event_loop_lag.set_function(
+    lambda: {("max",): loop_monitor.max_lag, ("blocked",): loop_monitor.total_lag}
+)
+event_loop_slow_callbacks.set_function(lambda: {(): loop_monitor.slow_count})
+
+
+def enable_slow_callback_logging(threshold: float) -> None:
+    """
+    Turn on asyncio debug mode so callbacks slower than ``threshold``
+    are logged by name. Debug mode adds overhead, so only use it in development.
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_debug(True)
+    loop.slow_callback_duration = threshold
@@ -1,6 +1,8 @@
 """Application configuration."""
 from functools import lru_cache
 from pathlib import Path
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -13,13 +15,107 @@ class Settings(BaseSettings):
     # Content directory (relative to project root)
     content_dir: Path = Path(__file__).parent.parent.parent / "content"
 
-    # Docker settings for code execution
-    docker_image: str = "python:3.11-slim"
+    # Local cache directory (docs index, caches)
+    cache_dir: Path = Path(__file__).parent.parent / ".cache"
+
+    # Code execution: "subprocess" (no isolation) or "jail" (Linux user, network,
+    # PID, mount and IPC namespaces via unshare, a read-only filesystem, rlimits
+    # and a seccomp filter)
+    execution_backend: Literal["subprocess", "jail"] = "subprocess"
+    # Sandboxes started ahead of time with torch already imported (0 disables)
+    sandbox_pool_size: int = 2
+    # Jail limits: largest file written and address space (0 = no limit)
+    sandbox_max_file_bytes: int = 64 * 1024 * 1024
+    sandbox_memory_bytes: int = 0
+    sandbox_seccomp: bool = True
+    # Private /dev/shm of each jailed sandbox (DataLoader workers pass batches
+    # through it); the subprocess backend uses the host's
+    sandbox_shm_bytes: int = 256 * 1024 * 1024
+    # Private /tmp of each jailed sandbox, and its working directory (the
+    # rest of the filesystem is read-only, or copy-on-write for the caches)
+    sandbox_tmp_bytes: int = 256 * 1024 * 1024
+    # DataLoader workers alive at once per sandbox, across its loaders
+    # (num_workers above what is left is lowered); they are forked from the
+    # warm sandbox, with torch already imported
+    execution_max_dataloader_workers: int = 2
     code_execution_timeout: int = 10  # seconds
+    # Answer empty code, syntax errors, forbidden imports/calls and endless
+    # loops in the API process, without taking a sandbox
+    execution_preflight: bool = True
+    # Extra time for interpreter startup and imports on top of the time
+    # budget, which only covers the learner's code
+    execution_startup_grace: float = 20.0  # seconds
+    # Longer stdout/stderr from user code is cut off (0 disables)
+    execution_max_output_chars: int = 100_000
+    # Profile mode: operators in the returned table, and operator calls
+    # recorded before the profiler stops (bounds its time and memory overhead)
+    execution_profile_top_n: int = 15
+    execution_profile_max_events: int = 2000
+
+    # Read-only datasets/weights mapped into executions (defaults to cache_dir/artifacts)
+    artifacts_dir: Path | None = None
+
+    # torch.compile (Inductor) artifacts shared by all executions, per torch
+    # version and trimmed to a size limit (defaults to cache_dir/compile).
+    # Jailed executions only read it (their writes are discarded), so with
+    # the jail backend it is filled by `python -m app.services.compile_cache --warm`
+    compile_cache_dir: Path | None = None
+    compile_cache_max_bytes: int = 1024 * 1024 * 1024
+
+    # Figures captured from executions (matplotlib), deduplicated by content
+    # hash in a size-bounded blob store (defaults to cache_dir/blobs)
+    blob_store_dir: Path | None = None
+    blob_store_max_bytes: int = 256 * 1024 * 1024
+    execution_max_figures: int = 10
+    execution_max_figure_bytes: int = 2 * 1024 * 1024
+
+    # Remote execution worker agents (python -m app.services.worker_agent)
+    # register on this address; port 0 disables the dispatcher
+    dispatcher_host: str = "127.0.0.1"
+    dispatcher_port: int = 0
+    # Shared secret agents must present; required unless the host is loopback.
+    # It travels in plaintext, like the jobs: off loopback, keep agents on a
+    # private network or behind a TLS tunnel
+    dispatcher_token: str | None = None
+    # Agents send a heartbeat every few seconds; silent ones are dropped
+    dispatcher_heartbeat_timeout: float = 15.0  # seconds
+    # Other workers tried when the one running a job disconnects
+    dispatcher_max_retries: int = 2
+    # Run locally when every worker is busy (otherwise queue on the least loaded)
+    dispatcher_local_fallback: bool = True
+
+    # Identical concurrent /api/execute requests share one run, and its
+    # result is reused for this long (catches near-simultaneous stragglers)
+    execution_share_ttl: float = 2.0  # seconds
+    execution_share_max_entries: int = 256
+
+    # Incremental lesson sessions: one persistent Python process each
+    session_max_count: int = 8
+    session_idle_timeout: float = 600.0  # seconds
+    session_max_timeout: int = 30  # seconds per cell run
+
+    # Thread pools for blocking work called from async handlers
+    io_pool_workers: int = 8
+    execution_pool_workers: int = 4
+    # Log when the event loop is blocked longer than this (0 disables)
+    event_loop_lag_threshold: float = 0.1  # seconds
 
     # Documentation cache settings
     docs_cache_ttl: int = 86400  # 24 hours in seconds
+    docs_cache_negative_ttl: int = 300  # failed lookups, in seconds
+    docs_cache_max_stale: int = 7 * 86400  # serve stale entries up to a week
+    docs_cache_max_entries: int = 5000
+    # SQLite file shared by all workers (defaults to cache_dir/docs-cache.sqlite3)
+    docs_cache_path: Path | None = None
     pytorch_docs_base_url: str = "https://pytorch.org/docs/stable"
+    # Offline docs index (defaults to cache_dir/docs-index-<torch version>.json)
+    docs_index_path: Path | None = None
+    # Pooled HTTP client for remote docs lookups (HTTP/2 needs the 'h2' package)
+    docs_http2: bool = False
+    docs_max_connections: int = 10
+    docs_keepalive_expiry: float = 60.0  # seconds
+    # Warm the docs cache with every <DocRef> symbol at startup
+    docs_prefetch: bool = True
 
     # CORS settings
     cors_origins: list[str] = ["http://localhost:5173", "http://localhost:3000"]
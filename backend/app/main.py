@@ -1,18 +1,93 @@
 """PyTorch Academy Backend - FastAPI Application."""
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
+from .concurrency import enable_slow_callback_logging, io_pool, loop_monitor
 from .config import get_settings
-from .routers import curriculum_router, validation_router, docs_router, execution_router
+from .metrics import MetricsMiddleware, cache_entries, registry
+from .routers import (
+    curriculum_router,
+    validation_router,
+    docs_router,
+    execution_router,
+    blobs_router,
+    sessions_router,
+    jobs_router,
+)
+from .services.blobs import get_blob_store
+from .services.content import get_content_service
+from .services.dispatcher import get_dispatcher
+from .services.docs import get_docs_service
+from .services.sandboxes import get_sandbox_pool
+from .services.sessions import get_session_manager
 
 settings = get_settings()
 
+
+async def prefetch_docs() -> None:
+    """Warm the docs service with every symbol referenced by a <DocRef>."""
+    try:
+        symbols = await get_content_service().aget_doc_symbols()
+        found = await get_docs_service().prefetch(symbols)
+        print(f"Prefetched docs for {found}/{len(symbols)} symbols")
+    except Exception as e:
+        print(f"Error prefetching docs: {e}")
+
+
+def collect_cache_entries() -> dict[tuple[str, ...], float]:
+    """Entries held by each cache, read when /metrics is scraped."""
+    docs_service = get_docs_service()
+    graph = get_content_service()._graph
+    return {
+        ("docs",): docs_service.cache.stats()["entries"],
+        ("docs_index",): len(docs_service.index),
+        ("prerequisite_graph",): len(graph) if graph is not None else 0,
+        ("blobs",): get_blob_store().stats()["blobs"],
+        ("sandbox_pool",): len(get_sandbox_pool()),
+    }
+
+
+cache_entries.set_function(collect_cache_entries)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background services."""
+    if settings.event_loop_lag_threshold > 0:
+        loop_monitor.start()
+        if settings.debug:
+            enable_slow_callback_logging(settings.event_loop_lag_threshold)
+    docs_service = get_docs_service()
+    await docs_service.start()
+    prefetch_task = asyncio.create_task(prefetch_docs()) if settings.docs_prefetch else None
+    if settings.dispatcher_port:
+        await get_dispatcher().start()
+    # Sandboxes import torch in their own processes, off the request path
+    sandboxes = get_sandbox_pool()
+    await io_pool.run(sandboxes.fill)
+    yield
+    await get_dispatcher().stop()
+    get_session_manager().close_all()
+    await io_pool.run(sandboxes.close)
+    if prefetch_task:
+        prefetch_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await prefetch_task
+    await docs_service.aclose()
+    await loop_monitor.stop()
+
+
 app = FastAPI(
     title=settings.app_name,
     description="Backend API for PyTorch Academy - Interactive PyTorch Learning Platform",
     version="1.0.0",
     docs_url="/api/docs" if settings.debug else None,
     redoc_url="/api/redoc" if settings.debug else None,
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -24,11 +99,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route, exposed at /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(curriculum_router)
 app.include_router(validation_router)
 app.include_router(docs_router)
 app.include_router(execution_router)
+app.include_router(blobs_router)
+app.include_router(sessions_router)
+app.include_router(jobs_router)
 
 
 @app.get("/")
@@ -44,6 +125,10 @@ async def root():
             "validate": "/api/validate",
             "execute": "/api/execute",
             "docs": "/api/docs/pytorch/{symbol}",
+            "blobs": "/api/blobs/{blob_id}",
+            "sessions": "/api/modules/{module_id}/sessions",
+            "cancel_job": "/api/jobs/{job_id}/cancel",
+            "metrics": "/metrics",
         },
     }
 
@@ -52,3 +137,11 @@ async def root():
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics (text exposition format)."""
+    # Some collectors read the SQLite docs cache, so render off the event loop
+    body = await io_pool.run(registry.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
@@ -0,0 +1,31 @@
+"""
+<CodeCell> extraction from lesson MDX.
+
+Standard library only: scripts/run-snippets.py imports it in CI, where only
+torch and numpy are installed, so the backend and the script read cells the
+same way.
+"""
+import re
+
+CODE_CELL_PATTERN = re.compile(r'<CodeCell\s+id="([^"]+)">([\s\S]*?)</CodeCell>')
+
+_TEMPLATE_ESCAPES = {"n": "\n", "t": "\t"}
+
+
+def _unwrap_template_literal(code: str) -> str:
+    """
+    Code of a cell written as {`...`} (a JSX template literal), as MDX
+    hands it to the component: without the delimiters, escapes resolved.
+    """
+    if not (code.startswith("{`") and code.endswith("`}")):
+        return code
+    body = code[2:-2]
+    return re.sub(r"\\(.)", lambda m: _TEMPLATE_ESCAPES.get(m.group(1), m.group(1)), body)
+
+
+def extract_code_cells(mdx_content: str) -> list[tuple[str, str]]:
+    """The (id, code) of every <CodeCell> in a lesson, in order."""
+    return [
+        (cell_id, _unwrap_template_literal(code.strip()).strip())
+        for cell_id, code in CODE_CELL_PATTERN.findall(mdx_content)
+    ]
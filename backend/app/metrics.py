@@ -0,0 +1,343 @@
+"""
+Prometheus-compatible metrics.
+
+A small in-process registry of counters, gauges and histograms rendered in
+the Prometheus text exposition format at ``/metrics``. Values are per
+process: with several uvicorn workers, each one is scraped separately.
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Iterable
+
+LabelValues = tuple[str, ...]
+
+# Latency buckets (seconds) covering cached page loads up to code execution
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Base class: a named metric with a fixed set of label names."""
+
+    type = "untyped"
+    # Appended to the name in the HELP/TYPE lines and every sample
+    family_suffix = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.label_names)
+
+    def samples(self) -> Iterable[tuple[str, LabelValues, float, tuple[str, ...]]]:
+        """Yield (suffix, label values, value, extra label names/values)."""
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        family = self.name + self.family_suffix
+        lines = [f"# HELP {family} {self.help}", f"# TYPE {family} {self.type}"]
+        for suffix, values, value, extra in self.samples():
+            names = self.label_names + extra[0::2]
+            all_values = values + extra[1::2]
+            lines.append(
+                f"{family}{suffix}{_format_labels(names, all_values)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing count, exposed as ``<name>_total``."""
+
+    type = "counter"
+    family_suffix = "_total"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            yield "", values, value, ()
+
+
+class Gauge(Metric):
+    """
+    Value that can go up and down.
+
+    Either set explicitly, or computed at scrape time by a function
+    returning ``{label values: value}`` (see :meth:`set_function`).
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[LabelValues, float] = {}
+        self._function: Callable[[], dict[LabelValues, float]] | None = None
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], dict[LabelValues, float]]) -> None:
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            try:
+                values = self._function()
+            except Exception as e:
+                print(f"Error collecting metric {self.name}: {e}")
+                values = {}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield "", key, value, ()
+
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, +Inf count, sum)
+        self._values: dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return entry[1] if entry else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        for values, (counts, total, value_sum) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield "_bucket", values, cumulative, ("le", _format_value(bound))
+            yield "_bucket", values, total, ("le", "+Inf")
+            yield "_sum", values, value_sum, ()
+            yield "_count", values, total, ()
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    labels=("method", "route", "status"),
+)
+http_requests_in_progress = registry.gauge(
+    "http_requests_in_progress", "HTTP requests currently being served"
+)
+execution_phase_duration = registry.histogram(
+    "execution_phase_seconds",
+    "Time spent in each phase of a code execution or validation",
+    labels=("kind", "phase"),
+)
+execution_timeouts = registry.counter(
+    "execution_timeouts", "Executions and validations stopped by their timeout", labels=("kind",)
+)
+execution_truncations = registry.counter(
+    "execution_output_truncations",
+    "Executions whose stdout or stderr was truncated",
+    labels=("kind",),
+)
+execution_preflight_checks = registry.counter(
+    "execution_preflight_checks",
+    "Code checked before running, by outcome (passed, empty, syntax, policy, long_running)",
+    labels=("kind", "outcome"),
+)
+execution_cancellations = registry.counter(
+    "execution_cancellations",
+    "Executions and validations cancelled, by reason (client, disconnect, superseded)",
+    labels=("kind", "reason"),
+)
+execution_dispatches = registry.counter(
+    "execution_dispatches",
+    "Executions by where they ran (remote worker agent or local) and outcome",
+    labels=("target", "outcome"),
+)
+execution_worker_slots = registry.gauge(
+    "execution_worker_slots",
+    "Job slots of connected remote worker agents (busy or free)",
+    labels=("worker", "state"),
+)
+pool_queue_wait = registry.histogram(
+    "pool_queue_wait_seconds",
+    "Time a blocking call waited for a free worker thread",
+    labels=("pool",),
+)
+pool_pending = registry.gauge(
+    "pool_pending_calls", "Blocking calls running or waiting in each pool", labels=("pool",)
+)
+pool_active = registry.gauge(
+    "pool_active_workers", "Worker threads currently running a call", labels=("pool",)
+)
+pool_size = registry.gauge("pool_max_workers", "Worker threads per pool", labels=("pool",))
+cache_requests = registry.counter(
+    "cache_requests",
+    "Cache lookups by cache and result (hit, stale, negative, coalesced, miss)",
+    labels=("cache", "result"),
+)
+cache_hit_ratio = registry.gauge(
+    "cache_hit_ratio", "Share of lookups served from each cache", labels=("cache",)
+)
+
+
+def _hit_ratios() -> dict[LabelValues, float]:
+    totals: dict[str, float] = {}
+    misses: dict[str, float] = {}
+    for (cache, result), value in list(cache_requests._values.items()):
+        totals[cache] = totals.get(cache, 0.0) + value
+        if result == "miss":
+            misses[cache] = misses.get(cache, 0.0) + value
+    return {
+        (cache,): round((total - misses.get(cache, 0.0)) / total, 4)
+        for cache, total in totals.items()
+        if total
+    }
+
+
+cache_hit_ratio.set_function(_hit_ratios)
+cache_entries = registry.gauge("cache_entries", "Entries stored in each cache", labels=("cache",))
+event_loop_lag = registry.gauge(
+    "event_loop_lag_seconds", "Event loop blocking (max lag and total blocked time)", labels=("stat",)
+)
+event_loop_slow_callbacks = registry.gauge(
+    "event_loop_slow_callbacks", "Times the event loop was blocked past the lag threshold"
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency of every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        http_requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_progress.dec()
+            route = scope.get("route")
+            # Route templates keep the label set small; unknown paths share one label
+            path = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=path,
+                status=status,
+            )
@@ -1,5 +1,5 @@
 """Pydantic models for the API."""
-from .curriculum import Module, ModuleMetadata, Curriculum, Section
+from .curriculum import Module, ModuleMetadata, Curriculum, Section, LearningPath
 from .exercise import (
     Exercise,
     ExerciseValidation,
@@ -8,13 +8,31 @@ from .exercise import (
     ValidationResult,
     ValidationType,
 )
-from .execution import CodeExecutionRequest, CodeExecutionResponse
+from .execution import (
+    CodeDiagnostic,
+    CodeExecutionRequest,
+    CodeExecutionResponse,
+    CompileCacheStats,
+    ExecutionFigure,
+    ExecutionProfile,
+    ExecutionTiming,
+    ProfiledOperator,
+)
+from .session import (
+    CellRunRequest,
+    CellRunResponse,
+    CellRunResult,
+    LessonSessionResponse,
+    SessionCell,
+)
+from .docs import DocInfo, DocsBatchRequest, DocsBatchResponse
 
 __all__ = [
     "Module",
     "ModuleMetadata",
     "Curriculum",
     "Section",
+    "LearningPath",
     "Exercise",
     "ExerciseValidation",
     "ValidationRequest",
@@ -23,4 +41,18 @@ __all__ = [
     "ValidationType",
     "CodeExecutionRequest",
     "CodeExecutionResponse",
+    "ExecutionTiming",
+    "CodeDiagnostic",
+    "ExecutionFigure",
+    "CompileCacheStats",
+    "ExecutionProfile",
+    "ProfiledOperator",
+    "SessionCell",
+    "LessonSessionResponse",
+    "CellRunRequest",
+    "CellRunResult",
+    "CellRunResponse",
+    "DocInfo",
+    "DocsBatchRequest",
+    "DocsBatchResponse",
 ]
@@ -38,3 +38,11 @@ class Curriculum(BaseModel):
     sections: list[Section]
     total_modules: int
     total_estimated_minutes: int
+
+
+class LearningPath(BaseModel):
+    """Everything a learner needs before starting a module."""
+
+    module_id: str
+    prerequisites: list[str]  # Transitive prerequisites, in learning order
+    total_estimated_minutes: int
@@ -0,0 +1,23 @@
+"""Models for PyTorch documentation lookups."""
+from pydantic import BaseModel, Field
+
+
+class DocInfo(BaseModel):
+    """Documentation summary for a PyTorch symbol."""
+
+    symbol: str
+    signature: str | None = None
+    description: str | None = None
+    url: str
+
+
+class DocsBatchRequest(BaseModel):
+    """Request to look up several symbols at once."""
+
+    symbols: list[str] = Field(min_length=1, max_length=100)
+
+
+class DocsBatchResponse(BaseModel):
+    """Documentation per requested symbol (None when not found)."""
+
+    docs: dict[str, DocInfo | None]
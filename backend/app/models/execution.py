@@ -1,4 +1,6 @@
 """Models for code execution."""
+from typing import Literal
+
 from pydantic import BaseModel
 
 
@@ -7,6 +9,84 @@ class CodeExecutionRequest(BaseModel):
 
     code: str
     timeout: int = 10  # seconds
+    # Run under torch.profiler and tracemalloc and return an ExecutionProfile
+    profile: bool = False
+    # Image format for captured matplotlib figures
+    figure_format: Literal["png", "svg"] = "png"
+    # Identical requests running at the same time share one execution;
+    # False always runs the code (unseeded random draws are never shared)
+    shared: bool = True
+    # Id to cancel the job with, along with client_id (generated when missing)
+    job_id: str | None = None
+    # A new job from the same client and cell cancels the previous one
+    client_id: str | None = None
+    cell_id: str | None = None
+
+
+class ExecutionTiming(BaseModel):
+    """
+    Where the time of one execution or validation went, in seconds.
+
+    Phases are measured with monotonic clocks inside the worker process;
+    a phase is None when it never ran (e.g. the process was killed first).
+    Only ``user_code`` (and ``tests`` for validations) counts against the
+    time budget.
+    """
+
+    queue: float | None = None  # waiting for a free execution slot
+    startup: float | None = None  # process spawn and interpreter boot (if not pre-warmed)
+    imports: float | None = None  # torch / numpy imports
+    user_code: float | None = None
+    tests: float | None = None
+    teardown: float | None = None  # collecting output and process exit
+    total: float = 0.0
+
+
+class ProfiledOperator(BaseModel):
+    """Aggregated profiler stats for one operator (e.g. ``aten::mm``)."""
+
+    name: str
+    calls: int
+    self_cpu_time_us: float
+    cpu_time_us: float  # including child operators
+    self_memory_bytes: int  # net tensor memory allocated by the operator itself
+    input_shapes: str | None = None  # shapes of the first call
+
+
+class ExecutionProfile(BaseModel):
+    """Where profiled user code spent CPU time and memory."""
+
+    operators: list[ProfiledOperator] = []  # top operators by self CPU time
+    self_cpu_time_total_us: float = 0.0
+    peak_tensor_memory_bytes: int = 0
+    peak_python_memory_bytes: int = 0  # from tracemalloc
+    event_count: int = 0  # operator calls counted until the profiler stopped
+    events_truncated: bool = False  # the profiler stopped before the code finished
+
+
+class ExecutionFigure(BaseModel):
+    """A figure drawn by the executed code, served from the blob store."""
+
+    id: str  # content hash plus extension
+    url: str
+    media_type: str
+    bytes: int
+
+
+class CompileCacheStats(BaseModel):
+    """torch.compile graphs loaded from the shared cache vs compiled from scratch."""
+
+    hits: int = 0
+    misses: int = 0
+
+
+class CodeDiagnostic(BaseModel):
+    """A problem found in the code before running it."""
+
+    kind: Literal["syntax", "policy", "long_running"]
+    message: str
+    line: int | None = None  # 1-based, in the submitted code
+    column: int | None = None  # 1-based
 
 
 class CodeExecutionResponse(BaseModel):
@@ -18,3 +98,12 @@ class CodeExecutionResponse(BaseModel):
     result: str | None = None  # Result of last expression
     execution_time: float = 0.0
     error: str | None = None
+    timing: ExecutionTiming | None = None
+    profile: ExecutionProfile | None = None
+    figures: list[ExecutionFigure] = []
+    compile_cache: CompileCacheStats | None = None  # only when the code used torch.compile
+    worker: str | None = None  # remote worker agent that ran the code (None: this host)
+    # Why the code was rejected without running (syntax errors, policy...)
+    diagnostics: list[CodeDiagnostic] = []
+    job_id: str | None = None
+    cancelled: bool = False  # stopped by the client, a disconnect or a newer run
@@ -2,6 +2,8 @@
 from enum import Enum
 from pydantic import BaseModel
 
+from .execution import CodeDiagnostic, ExecutionTiming
+
 
 class ValidationType(str, Enum):
     """Type of validation for an exercise."""
@@ -36,6 +38,10 @@ class ValidationRequest(BaseModel):
     exercise_id: str
     module_id: str
     code: str
+    # Id to cancel the job with, along with client_id (generated when missing)
+    job_id: str | None = None
+    # A new validation of the same exercise by this client cancels the previous one
+    client_id: str | None = None
 
 
 class ValidationResult(str, Enum):
@@ -45,6 +51,7 @@ class ValidationResult(str, Enum):
     FAILED = "failed"
     ERROR = "error"
     TIMEOUT = "timeout"
+    CANCELLED = "cancelled"
 
 
 class ValidationResponse(BaseModel):
@@ -57,3 +64,6 @@ class ValidationResponse(BaseModel):
     error_message: str | None = None
     stdout: str = ""
     stderr: str = ""
+    timing: ExecutionTiming | None = None
+    diagnostics: list[CodeDiagnostic] = []  # set when the code was rejected without running
+    job_id: str | None = None
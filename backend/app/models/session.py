@@ -0,0 +1,54 @@
+"""Models for incremental lesson sessions."""
+from pydantic import BaseModel
+
+from .execution import CodeDiagnostic, ExecutionFigure
+
+
+class SessionCell(BaseModel):
+    """A lesson cell and what the static analysis found in it."""
+
+    id: str
+    defines: list[str] = []  # names it binds at module level
+    uses: list[str] = []  # names it reads from earlier cells
+    depends_on: list[str] = []  # earlier cells binding those names
+    syntax_error: str | None = None
+
+
+class LessonSessionResponse(BaseModel):
+    """A new session: one persistent namespace for a lesson's cells."""
+
+    session_id: str
+    module_id: str
+    cells: list[SessionCell]
+
+
+class CellRunRequest(BaseModel):
+    """Run (or re-run after an edit) one cell of a session."""
+
+    code: str | None = None  # new code for the cell; None keeps the current code
+    timeout: int = 10  # seconds, per cell
+    # Also re-run the cells downstream of the edit; otherwise they are
+    # only reported as stale
+    run_downstream: bool = True
+
+
+class CellRunResult(BaseModel):
+    """Outcome of one cell run in the session namespace."""
+
+    cell_id: str
+    success: bool
+    stdout: str = ""
+    stderr: str = ""
+    error: str | None = None
+    execution_time: float = 0.0
+    figures: list[ExecutionFigure] = []
+    # Why the cell was rejected without running (syntax errors, policy...)
+    diagnostics: list[CodeDiagnostic] = []
+
+
+class CellRunResponse(BaseModel):
+    """Cells run for a request, in lesson order, and cells left stale."""
+
+    results: list[CellRunResult]
+    # Cells whose output no longer matches the code above them
+    stale: list[str] = []
@@ -3,5 +3,16 @@ from .curriculum import router as curriculum_router
 from .validation import router as validation_router
 from .docs import router as docs_router
 from .execution import router as execution_router
+from .blobs import router as blobs_router
+from .sessions import router as sessions_router
+from .jobs import router as jobs_router
 
-__all__ = ["curriculum_router", "validation_router", "docs_router", "execution_router"]
+__all__ = [
+    "curriculum_router",
+    "validation_router",
+    "docs_router",
+    "execution_router",
+    "blobs_router",
+    "sessions_router",
+    "jobs_router",
+]
@@ -0,0 +1,25 @@
+"""Blob endpoints (figures produced by executions)."""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from ..services.blobs import MEDIA_TYPES, get_blob_store
+
+router = APIRouter(prefix="/api", tags=["blobs"])
+
+# Blob ids are content hashes, so a response never goes stale
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.get("/blobs/{blob_id}")
+async def get_blob(blob_id: str) -> FileResponse:
+    """Serve a stored figure by its content-addressed id."""
+    path = get_blob_store().get_path(blob_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Blob '{blob_id}' not found")
+
+    extension = blob_id.rsplit(".", 1)[1]
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[extension],
+        headers={"Cache-Control": CACHE_CONTROL, "ETag": f'"{blob_id}"'},
+    )
@@ -1,12 +1,28 @@
 """Curriculum and module endpoints."""
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 
-from ..models import Curriculum, Module
+from ..models import Curriculum, LearningPath, Module
 from ..services.content import get_content_service
+from ..services.prerequisites import PrerequisiteError, PrerequisiteGraph
 
 router = APIRouter(prefix="/api", tags=["curriculum"])
 
 
+def _invalid_prerequisites(error: PrerequisiteError) -> HTTPException:
+    """
+    A content error (unknown prerequisite or cycle), named in the detail:
+    409, the modules' prerequisites conflict, rather than a generic 500.
+    """
+    return HTTPException(status_code=409, detail=f"Invalid module prerequisites: {error}")
+
+
+async def _prerequisite_graph() -> PrerequisiteGraph:
+    try:
+        return await get_content_service().aget_prerequisite_graph()
+    except PrerequisiteError as e:
+        raise _invalid_prerequisites(e) from e
+
+
 @router.get("/curriculum", response_model=Curriculum)
 async def get_curriculum():
     """
@@ -15,7 +31,7 @@ async def get_curriculum():
     Returns a list of sections, each containing module metadata.
     """
     service = get_content_service()
-    return service.get_curriculum()
+    return await service.aget_curriculum()
 
 
 @router.get("/modules/{module_id}", response_model=Module)
@@ -26,7 +42,7 @@ async def get_module(module_id: str):
     Returns the full module content including MDX and exercises.
     """
     service = get_content_service()
-    module = service.get_module(module_id)
+    module = await service.aget_module(module_id)
 
     if not module:
         raise HTTPException(
@@ -42,4 +58,53 @@ async def list_modules():
     Get a list of all module IDs.
     """
     service = get_content_service()
-    return service.get_module_ids()
+    return await service.aget_module_ids()
+
+
+@router.get("/modules/{module_id}/prerequisites", response_model=LearningPath)
+async def get_module_prerequisites(module_id: str):
+    """
+    Get everything needed before a module.
+
+    Returns the transitive prerequisites in a valid learning order,
+    together with their total estimated time.
+    """
+    service = get_content_service()
+    try:
+        path = await service.aget_learning_path(module_id)
+    except PrerequisiteError as e:
+        raise _invalid_prerequisites(e) from e
+
+    if not path:
+        raise HTTPException(
+            status_code=404, detail=f"Module '{module_id}' not found"
+        )
+
+    return path
+
+
+@router.get("/modules/{module_id}/unlocks", response_model=list[str])
+async def get_module_unlocks(module_id: str):
+    """
+    Get the modules that list this module as a direct prerequisite.
+    """
+    graph = await _prerequisite_graph()
+
+    if module_id not in graph:
+        raise HTTPException(
+            status_code=404, detail=f"Module '{module_id}' not found"
+        )
+
+    return list(graph.dependents(module_id))
+
+
+@router.get("/learning-path/next", response_model=list[str])
+async def get_next_modules(completed: list[str] = Query(default=[])):
+    """
+    Get the modules a learner can start next.
+
+    Pass each completed module as a ``completed`` query parameter, e.g.
+    ``/api/learning-path/next?completed=01-tensors&completed=02-tensor-operations``.
+    """
+    graph = await _prerequisite_graph()
+    return graph.available(completed)
@@ -1,6 +1,7 @@
 """PyTorch documentation proxy endpoints."""
 from fastapi import APIRouter, HTTPException
 
+from ..models import DocsBatchRequest, DocsBatchResponse
 from ..services.docs import get_docs_service
 
 router = APIRouter(prefix="/api/docs", tags=["documentation"])
@@ -11,9 +12,11 @@ async def get_pytorch_docs(symbol: str):
     """
     Get documentation for a PyTorch symbol.
 
-    Proxies to the official PyTorch documentation and extracts
-    the signature and first paragraph of description.
-    Results are cached for 24 hours.
+    Answers from the offline index built from the installed torch when
+    possible. Otherwise proxies to the official PyTorch documentation and
+    extracts the signature and first paragraph of description.
+    Remote results are cached on disk for 24 hours and failed lookups
+    for a few minutes; stale results are served while they refresh.
 
     Examples:
     - GET /api/docs/pytorch/torch.tensor
@@ -35,7 +38,23 @@ async def get_pytorch_docs(symbol: str):
 @router.get("/pytorch-cached")
 async def get_cached_symbols():
     """
-    Get list of currently cached PyTorch documentation symbols.
+    Get currently cached PyTorch documentation symbols and cache stats
+    (entries, size, age and hit ratio).
     """
     service = get_docs_service()
-    return {"cached_symbols": service.get_cached_symbols()}
+    return {
+        "cached_symbols": await service.get_cached_symbols(),
+        "stats": await service.get_cache_stats(),
+    }
+
+
+@router.post("/pytorch-batch", response_model=DocsBatchResponse)
+async def get_pytorch_docs_batch(request: DocsBatchRequest):
+    """
+    Get documentation for several PyTorch symbols in one request.
+
+    Symbols are resolved concurrently; symbols without documentation
+    map to null instead of failing the whole request.
+    """
+    service = get_docs_service()
+    return {"docs": await service.get_doc_infos(request.symbols)}
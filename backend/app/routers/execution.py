@@ -1,19 +1,25 @@
 """Code execution endpoints."""
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
 from ..models import CodeExecutionRequest, CodeExecutionResponse
 from ..services.execution import get_execution_service
+from ..services.jobs import get_job_registry, new_job_id
 
 router = APIRouter(prefix="/api", tags=["execution"])
 
 
 @router.post("/execute", response_model=CodeExecutionResponse)
-async def execute_code(request: CodeExecutionRequest) -> CodeExecutionResponse:
+async def execute_code(request: CodeExecutionRequest, http_request: Request) -> CodeExecutionResponse:
     """
     Execute Python code server-side with PyTorch support.
 
     Runs the provided code in a subprocess with access to torch,
-    numpy, and other common libraries.
+    numpy, and other common libraries. The run is killed if the client
+    disconnects, cancels the job or runs the same cell again.
     """
     service = get_execution_service()
-    return service.execute(request)
+    request.job_id = request.job_id or new_job_id()
+    async with get_job_registry().cancel_on_disconnect(
+        http_request.is_disconnected, request.job_id, request.client_id
+    ):
+        return await service.aexecute(request)
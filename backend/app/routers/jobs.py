@@ -0,0 +1,20 @@
+"""Job cancellation endpoints."""
+from fastapi import APIRouter, HTTPException
+
+from ..services.jobs import get_job_registry
+
+router = APIRouter(prefix="/api", tags=["jobs"])
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, client_id: str | None = None):
+    """
+    Cancel a running execution or validation and kill its sandbox.
+
+    Only the client that started the job can cancel it: pass the same
+    ``client_id`` it was started with. The request waiting for the job is
+    answered as cancelled.
+    """
+    if not get_job_registry().cancel(job_id, client_id=client_id):
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return {"cancelled": job_id}
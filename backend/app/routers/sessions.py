@@ -0,0 +1,59 @@
+"""Incremental lesson session endpoints."""
+from fastapi import APIRouter, HTTPException
+
+from ..concurrency import execution_pool, io_pool
+from ..models import CellRunRequest, CellRunResponse, LessonSessionResponse
+from ..services.content import get_content_service
+from ..services.sessions import SessionError, get_session_manager
+
+router = APIRouter(prefix="/api", tags=["sessions"])
+
+
+@router.post("/modules/{module_id}/sessions", response_model=LessonSessionResponse)
+async def create_session(module_id: str) -> LessonSessionResponse:
+    """
+    Open a session for a lesson: one persistent namespace for its cells.
+
+    Returns the cells with the names each one defines and uses, and the
+    earlier cells it depends on.
+    """
+    cells = await get_content_service().aget_code_cells(module_id)
+    if not cells:
+        raise HTTPException(status_code=404, detail=f"Module '{module_id}' has no code cells")
+
+    # Making room may wait for evicted session processes to exit
+    session = await io_pool.run(get_session_manager().create, module_id, cells)
+    return LessonSessionResponse(
+        session_id=session.id, module_id=module_id, cells=session.cells()
+    )
+
+
+@router.post("/sessions/{session_id}/cells/{cell_id}/run", response_model=CellRunResponse)
+async def run_cell(session_id: str, cell_id: str, request: CellRunRequest) -> CellRunResponse:
+    """
+    Run a cell, after an optional edit, in the session namespace.
+
+    Only the cell, the cells downstream of the edit and any earlier cells
+    whose state is missing run; cells left outdated are listed as stale.
+    """
+    session = await io_pool.run(get_session_manager().get, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session '{session_id}' not found")
+    if cell_id not in session.graph.ids:
+        raise HTTPException(status_code=404, detail=f"Cell '{cell_id}' not found")
+
+    try:
+        return await execution_pool.run(
+            session.run, cell_id, request.code, request.timeout, request.run_downstream
+        )
+    except SessionError:
+        # Closed (idle or evicted) while the request waited
+        raise HTTPException(status_code=404, detail=f"Session '{session_id}' not found")
+
+
+@router.delete("/sessions/{session_id}")
+async def close_session(session_id: str):
+    """Close a session and stop its process."""
+    if not await execution_pool.run(get_session_manager().close, session_id):
+        raise HTTPException(status_code=404, detail=f"Session '{session_id}' not found")
+    return {"closed": session_id}
@@ -1,19 +1,25 @@
 """Validation endpoints."""
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
 from ..models import ValidationRequest, ValidationResponse
+from ..services.jobs import get_job_registry, new_job_id
 from ..services.validation import get_validation_service
 
 router = APIRouter(prefix="/api", tags=["validation"])
 
 
 @router.post("/validate", response_model=ValidationResponse)
-async def validate_exercise(request: ValidationRequest):
+async def validate_exercise(request: ValidationRequest, http_request: Request):
     """
     Validate user code against exercise tests.
 
     Executes the user's code in a sandboxed environment and runs
-    the predefined tests for the specified exercise.
+    the predefined tests for the specified exercise. The run is killed
+    if the client disconnects, cancels the job or validates again.
     """
     service = get_validation_service()
-    return service.validate(request)
+    request.job_id = request.job_id or new_job_id()
+    async with get_job_registry().cancel_on_disconnect(
+        http_request.is_disconnected, request.job_id, request.client_id
+    ):
+        return await service.avalidate(request)
@@ -0,0 +1,7 @@
+"""
+Modules for code running in the execution subprocess.
+
+The execution wrapper puts this directory on ``sys.path`` of the worker
+process. Modules here must only depend on torch, numpy and the standard
+library, never on the rest of the app.
+"""
@@ -0,0 +1,21 @@
+"""
+torch.compile cache statistics for executed code.
+
+Imported by the execution wrapper inside the subprocess; the cache
+itself is configured through environment variables by the parent
+(see app/services/compile_cache.py).
+"""
+import sys
+
+
+def cache_stats() -> dict | None:
+    """Inductor graph cache hits and misses, or None if nothing was compiled."""
+    if "torch._dynamo" not in sys.modules:
+        return None
+    from torch._dynamo.utils import counters
+
+    hits = counters["inductor"]["fxgraph_cache_hit"]
+    misses = counters["inductor"]["fxgraph_cache_miss"]
+    if not hits and not misses:
+        return None
+    return {"hits": hits, "misses": misses}
@@ -0,0 +1,57 @@
+"""
+DataLoader worker support for executed code.
+
+Imported by the sandbox entry points (``_warm.py``, ``_session.py``)
+before any user code runs. Worker processes are forked from the sandbox,
+which has already imported torch, so they start in milliseconds instead
+of re-importing everything. ``ACADEMY_DATALOADER_MAX_WORKERS`` (set by
+the parent) caps the child processes alive in the sandbox at once, across
+all its DataLoaders, so one job can't start dozens of processes: a loader
+iterated while the others hold the workers gets what is left, or loads
+in-process. Batches come back through shared memory (``/dev/shm``, sized
+by the jail when there is one).
+"""
+import functools
+import multiprocessing
+import os
+import warnings
+
+from torch.utils.data import DataLoader
+
+ENV_VAR = "ACADEMY_DATALOADER_MAX_WORKERS"
+
+
+def configure() -> None:
+    """Cap and fork the workers of every DataLoader created from now on."""
+    max_workers = int(os.environ.pop(ENV_VAR, "2"))
+    # The cap below already bounds the workers; the CPU count advice would
+    # otherwise land on stderr and fail the execution
+    warnings.filterwarnings("ignore", message="This DataLoader will create")
+
+    init = DataLoader.__init__
+    get_iterator = DataLoader._get_iterator
+
+    @functools.wraps(init)
+    def __init__(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        if self.num_workers > max_workers:
+            self.num_workers = max_workers
+        if self.num_workers > 0 and self.multiprocessing_context is None:
+            self.multiprocessing_context = "fork"
+        self._academy_workers = self.num_workers
+
+    @functools.wraps(get_iterator)
+    def _get_iterator(self):
+        # Workers start here; those of iterators still running count too
+        free = max_workers - len(multiprocessing.active_children())
+        self.num_workers = max(0, min(self._academy_workers, free))
+        return get_iterator(self)
+
+    DataLoader.__init__ = __init__
+    DataLoader._get_iterator = _get_iterator
+
+
+def stop_workers() -> None:
+    """Kill the workers of DataLoaders left running (by an error or timeout)."""
+    for child in multiprocessing.active_children():
+        child.kill()
@@ -0,0 +1,47 @@
+"""
+Figure capture for executed code.
+
+Imported by the execution wrapper inside the subprocess. matplotlib is
+only configured (headless Agg backend) and read back if the user code
+imported it, so plain executions don't pay for it.
+"""
+import base64
+import io
+import os
+import sys
+import warnings
+
+
+def setup() -> None:
+    """Make matplotlib headless before the user code can import it."""
+    os.environ["MPLBACKEND"] = "Agg"
+    # plt.show() is a no-op on Agg; don't report it as an error
+    warnings.filterwarnings("ignore", message=".*non-interactive.*")
+
+
+def collect(format: str = "png", max_figures: int = 10, max_bytes: int = 2_000_000) -> list[dict]:
+    """
+    Render every open figure and close them.
+
+    Figures beyond ``max_figures`` or larger than ``max_bytes`` are left
+    out. Output is made byte-for-byte reproducible (no timestamps, fixed
+    SVG ids) so identical plots get the same content hash.
+    """
+    pyplot = sys.modules.get("matplotlib.pyplot")
+    if pyplot is None:
+        return []
+
+    import matplotlib
+
+    matplotlib.rcParams["svg.hashsalt"] = "academy"
+    metadata = {"Date": None} if format == "svg" else {"Software": None}
+
+    figures = []
+    for number in pyplot.get_fignums()[:max_figures]:
+        buffer = io.BytesIO()
+        pyplot.figure(number).savefig(buffer, format=format, bbox_inches="tight", metadata=metadata)
+        data = buffer.getvalue()
+        if len(data) <= max_bytes:
+            figures.append({"format": format, "data": base64.b64encode(data).decode()})
+    pyplot.close("all")
+    return figures
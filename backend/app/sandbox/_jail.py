@@ -0,0 +1,280 @@
+"""
+Confinement applied inside a jailed sandbox process.
+
+Imported by the sandbox entry points (``_warm.py``, ``_session.py``) once
+their preloads are done. The jail executor passes the limits as JSON in
+the ``ACADEMY_SANDBOX_JAIL`` environment variable; without it nothing is
+applied. The namespaces (no network, own PIDs, IPC, hostname and
+mounts) come from the ``unshare`` wrapper the process runs under; this
+module adds, in order:
+
+- a read-only view of the host filesystem, with private, size-limited
+  tmpfs mounts on ``/tmp`` (the working directory) and ``/dev/shm``
+  (shared memory for DataLoader workers); the app and its configuration
+  are hidden behind empty tmpfs mounts, and read-only binds put back what
+  the sandbox loads (the sandbox modules, the interpreter, site-packages,
+  the artifact store) if it lives under a hidden directory or ``/tmp``;
+- copy-on-write overlays on directories jobs read and write, like the
+  torch.compile cache: writes land in a private tmpfs and are discarded
+  with the sandbox, so a job can't poison what later jobs load;
+- resource limits;
+- a seccomp filter making the syscalls that could undo the jail (new
+  namespaces included, through ``clone``) or reach the host kernel's
+  internals fail with EPERM.
+"""
+import ctypes
+import errno
+import json
+import os
+import platform
+import resource
+import struct
+import tempfile
+
+ENV_VAR = "ACADEMY_SANDBOX_JAIL"
+
+# Denied syscalls by architecture: namespace and mount manipulation,
+# tracing other processes, kernel modules, keyrings, BPF and the like
+DENIED_SYSCALLS = {
+    "x86_64": {
+        "ptrace": 101, "pivot_root": 155, "chroot": 161, "mount": 165, "umount2": 166,
+        "swapon": 167, "swapoff": 168, "reboot": 169, "init_module": 175,
+        "delete_module": 176, "kexec_load": 246, "add_key": 248, "request_key": 249,
+        "keyctl": 250, "unshare": 272, "perf_event_open": 298, "name_to_handle_at": 303,
+        "open_by_handle_at": 304, "setns": 308, "process_vm_readv": 310,
+        "process_vm_writev": 311, "finit_module": 313, "kexec_file_load": 320, "bpf": 321,
+        "userfaultfd": 323, "open_tree": 428, "move_mount": 429, "fsopen": 430,
+        "fsconfig": 431, "fsmount": 432, "fspick": 433, "mount_setattr": 442,
+    },
+    "aarch64": {
+        "umount2": 39, "mount": 40, "pivot_root": 41, "chroot": 51, "unshare": 97,
+        "kexec_load": 104, "init_module": 105, "delete_module": 106, "ptrace": 117,
+        "reboot": 142, "add_key": 217, "request_key": 218, "keyctl": 219, "swapon": 224,
+        "swapoff": 225, "perf_event_open": 241, "name_to_handle_at": 264,
+        "open_by_handle_at": 265, "setns": 268, "process_vm_readv": 270,
+        "process_vm_writev": 271, "finit_module": 273, "bpf": 280, "userfaultfd": 282,
+        "kexec_file_load": 294, "open_tree": 428, "move_mount": 429, "fsopen": 430,
+        "fsconfig": 431, "fsmount": 432, "fspick": 433, "mount_setattr": 442,
+    },
+}
+AUDIT_ARCH = {"x86_64": 0xC000003E, "aarch64": 0xC00000B7}
+SECCOMP_SYSCALL = {"x86_64": 317, "aarch64": 277}
+# clone is allowed without CLONE_NEW* flags (fork, threads); clone3 passes
+# its flags in memory the filter can't read, so it fails with ENOSYS and
+# the C library falls back to clone
+CLONE_SYSCALL = {"x86_64": 56, "aarch64": 220}
+CLONE3_SYSCALL = 435
+# CLONE_NEWTIME, NEWNS, NEWCGROUP, NEWUTS, NEWIPC, NEWUSER, NEWPID, NEWNET
+CLONE_NAMESPACE_FLAGS = 0x7E020080
+MOUNT_SETATTR_SYSCALL = 442
+# x32 syscalls on x86_64 have this bit set; none are allowed
+X32_SYSCALL_BIT = 0x40000000
+
+_LD_ABS_W = 0x20
+_JEQ_K = 0x15
+_JGE_K = 0x35
+_JSET_K = 0x45
+_RET_K = 0x06
+_RET_ALLOW = 0x7FFF0000
+_RET_ERRNO = 0x00050000
+_RET_KILL_PROCESS = 0x80000000
+_PR_SET_NO_NEW_PRIVS = 38
+_SECCOMP_SET_MODE_FILTER = 1
+# Apply the filter to every thread (torch may have started some already)
+_SECCOMP_FILTER_FLAG_TSYNC = 1
+# Low 32 bits of the first syscall argument in seccomp_data (little endian)
+_ARG0_OFFSET = 16
+_MS_NOSUID = 2
+_MS_NODEV = 4
+_MS_BIND = 4096
+_MS_REC = 16384
+_AT_FDCWD = -100
+_AT_RECURSIVE = 0x8000
+_MOUNT_ATTR_RDONLY = 1
+
+
+class _SockFprog(ctypes.Structure):
+    _fields_ = [("len", ctypes.c_ushort), ("filter", ctypes.c_char_p)]
+
+
+class _MountAttr(ctypes.Structure):
+    _fields_ = [
+        ("attr_set", ctypes.c_uint64),
+        ("attr_clr", ctypes.c_uint64),
+        ("propagation", ctypes.c_uint64),
+        ("userns_fd", ctypes.c_uint64),
+    ]
+
+
+def _filter(machine: str) -> bytes:
+    """
+    Classic BPF program: deny the listed syscalls and clone with namespace
+    flags, make clone3 unavailable, allow the rest.
+    """
+    denied = sorted(DENIED_SYSCALLS[machine].values())
+    # (jump code, value, target) checked against the syscall number
+    checks = [(_JGE_K, X32_SYSCALL_BIT, "eperm")] if machine == "x86_64" else []
+    checks += [(_JEQ_K, CLONE3_SYSCALL, "enosys"), (_JEQ_K, CLONE_SYSCALL[machine], "clone")]
+    checks += [(_JEQ_K, number, "eperm") for number in denied]
+    # Other architectures (32-bit compat syscalls) are killed outright
+    program = [
+        (_LD_ABS_W, 0, 0, 4),
+        (_JEQ_K, 1, 0, AUDIT_ARCH[machine]),
+        (_RET_K, 0, 0, _RET_KILL_PROCESS),
+        (_LD_ABS_W, 0, 0, 0),
+    ]
+    # After the checks: ALLOW, the clone flags check, ALLOW, EPERM, ENOSYS
+    allow = len(program) + len(checks)
+    targets = {"clone": allow + 1, "eperm": allow + 4, "enosys": allow + 5}
+    for code, value, target in checks:
+        program.append((code, targets[target] - len(program) - 1, 0, value))
+    program += [
+        (_RET_K, 0, 0, _RET_ALLOW),
+        (_LD_ABS_W, 0, 0, _ARG0_OFFSET),
+        (_JSET_K, 1, 0, CLONE_NAMESPACE_FLAGS),
+        (_RET_K, 0, 0, _RET_ALLOW),
+        (_RET_K, 0, 0, _RET_ERRNO | errno.EPERM),
+        (_RET_K, 0, 0, _RET_ERRNO | errno.ENOSYS),
+    ]
+    return b"".join(struct.pack("HBBI", *instruction) for instruction in program)
+
+
+def install_seccomp() -> None:
+    machine = platform.machine()
+    if machine not in DENIED_SYSCALLS:
+        raise RuntimeError(f"No seccomp filter for {machine}; disable it or use another backend")
+    program = _filter(machine)
+    fprog = _SockFprog(len(program) // 8, program)
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.prctl(_PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0) != 0:
+        raise OSError(ctypes.get_errno(), "prctl(PR_SET_NO_NEW_PRIVS) failed")
+    result = libc.syscall(
+        SECCOMP_SYSCALL[machine],
+        _SECCOMP_SET_MODE_FILTER,
+        _SECCOMP_FILTER_FLAG_TSYNC,
+        ctypes.byref(fprog),
+    )
+    if result != 0:
+        raise OSError(ctypes.get_errno(), "seccomp filter could not be installed")
+
+
+def _mount(source: str, target: str, fstype: str, flags: int, options: str) -> None:
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.mount(source.encode(), target.encode(), fstype.encode(), flags, options.encode()) != 0:
+        raise OSError(ctypes.get_errno(), f"could not mount {fstype} on {target}")
+
+
+def mount_tmpfs(path: str, size: int) -> None:
+    """Mount a tmpfs (of at most ``size`` bytes) on ``path``, visible only in the jail."""
+    options = f"size={size},mode=1777" if size else "mode=1777"
+    _mount("tmpfs", path, "tmpfs", _MS_NOSUID | _MS_NODEV, options)
+
+
+def make_read_only(path: str = "/") -> None:
+    """Make every mount at or below ``path`` read-only (needs Linux 5.12+)."""
+    libc = ctypes.CDLL(None, use_errno=True)
+    attr = _MountAttr(attr_set=_MOUNT_ATTR_RDONLY)
+    result = libc.syscall(
+        MOUNT_SETATTR_SYSCALL,
+        _AT_FDCWD,
+        path.encode(),
+        _AT_RECURSIVE,
+        ctypes.byref(attr),
+        ctypes.sizeof(attr),
+    )
+    if result != 0:
+        raise OSError(ctypes.get_errno(), f"could not make {path} read-only")
+
+
+def _open_directory(path: str) -> int:
+    return os.open(path, os.O_PATH | os.O_DIRECTORY)
+
+
+def mount_overlay(lower: str, scratch: str) -> int:
+    """
+    Mount ``lower`` copy-on-write under ``scratch`` (which keeps the
+    changes); returns an ``O_PATH`` descriptor of the merged directory.
+    """
+    upper, work, merged = (os.path.join(scratch, name) for name in ("upper", "work", "merged"))
+    for path in (upper, work, merged):
+        os.makedirs(path)
+    _mount("overlay", merged, "overlay", 0, f"lowerdir={lower},upperdir={upper},workdir={work}")
+    return os.open(merged, os.O_PATH | os.O_DIRECTORY)
+
+
+def _is_within(path: str, directory: str) -> bool:
+    return os.path.commonpath([path, directory]) == directory
+
+
+def isolate_filesystem(
+    tmp_bytes: int,
+    read_only: list[str],
+    overlays: dict[str, str],
+    hidden: list[str],
+) -> None:
+    """
+    Read-only host filesystem with a private ``/tmp`` as the working
+    directory (and ``TMPDIR``). The ``hidden`` directories are replaced by
+    empty ones. The ``read_only`` directories stay visible at their path
+    even under ``/tmp`` or a hidden directory; ``overlays`` maps paths in
+    the jail to the host directories shown there copy-on-write.
+    """
+    make_read_only()
+    # Opened before the jail's /tmp hides the host directories under it
+    binds = {path: _open_directory(path) for path in read_only if os.path.isdir(path)}
+    lowers = {
+        target: _open_directory(source)
+        for target, source in overlays.items()
+        if os.path.isdir(source)
+    }
+    merged = {}
+    if lowers:
+        # The changes live in a tmpfs hidden under the working one
+        mount_tmpfs("/tmp", tmp_bytes)
+        for index, (target, lower) in enumerate(lowers.items()):
+            merged[target] = mount_overlay(f"/proc/self/fd/{lower}", f"/tmp/{index}")
+            os.close(lower)
+    mount_tmpfs("/tmp", tmp_bytes)
+    targets = {**binds, **merged}
+    # Outermost first: a directory inside a hidden one only still exists
+    # if something put back in the outer one lives under it
+    for path in sorted(hidden, key=len):
+        if not os.path.isdir(path):
+            continue
+        mount_tmpfs(path, 0)
+        for target in targets:
+            if _is_within(target, path):
+                os.makedirs(target, exist_ok=True)
+        make_read_only(path)
+    for target, directory in targets.items():
+        os.makedirs(target, exist_ok=True)  # only missing under /tmp
+        _mount(f"/proc/self/fd/{directory}", target, "", _MS_BIND | _MS_REC, "")
+        os.close(directory)
+        if target in binds:
+            make_read_only(target)
+    os.chdir("/tmp")
+    os.environ["TMPDIR"] = tempfile.tempdir = "/tmp"
+
+
+def confine() -> None:
+    """Apply the limits from the environment, if the process runs jailed."""
+    limits = json.loads(os.environ.pop(ENV_VAR, "null"))
+    if not limits:
+        return
+    isolate_filesystem(
+        limits.get("tmp_bytes", 0),
+        limits.get("read_only", []),
+        limits.get("overlays", {}),
+        limits.get("hidden", []),
+    )
+    if limits.get("shm_bytes"):
+        mount_tmpfs("/dev/shm", limits["shm_bytes"])
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    if limits.get("max_file_bytes"):
+        size = limits["max_file_bytes"]
+        resource.setrlimit(resource.RLIMIT_FSIZE, (size, size))
+    if limits.get("memory_bytes"):
+        size = limits["memory_bytes"]
+        resource.setrlimit(resource.RLIMIT_AS, (size, size))
+    if limits.get("seccomp"):
+        install_seccomp()
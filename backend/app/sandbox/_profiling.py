@@ -0,0 +1,171 @@
+"""
+Profiler for the "profile" execution mode.
+
+Imported by the execution wrapper inside the subprocess, so it depends only
+on torch and the standard library (not on the app package).
+"""
+import contextlib
+import os
+import sys
+import tracemalloc
+
+from torch.profiler import ProfilerActivity, profile
+from torch.utils._python_dispatch import TorchDispatchMode, _get_current_dispatch_mode
+
+# Upper bound for turning recorded events into the summary; parsing
+# stops there and the summary covers the events parsed so far
+POST_PROCESSING_TIMEOUT = 2.0  # seconds
+
+# Profiler bookkeeping events left out of the operator table
+_HIDDEN_EVENTS = {"[memory]", "PythonDispatchMode"}
+
+
+@contextlib.contextmanager
+def _quiet_native_stderr():
+    """Hide the log lines the profiler writes straight to fd 2 on start/stop."""
+    sys.__stderr__.flush()
+    saved = os.dup(2)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 2)
+    try:
+        yield
+    finally:
+        os.dup2(saved, 2)
+        os.close(saved)
+        os.close(devnull)
+
+
+class _OperatorLimit(TorchDispatchMode):
+    """
+    Counts operator calls and stops the profiler after ``limit`` of them,
+    then leaves the dispatch stack so later ops don't go through Python.
+
+    The mode can't be popped from ``__torch_dispatch__`` (it is stashed
+    while it runs and pushed back after), so a one-shot profile hook pops
+    it at the next Python event outside the dispatch.
+    """
+
+    def __init__(self, profiler: "Profiler", limit: int):
+        super().__init__()
+        self.profiler = profiler
+        self.limit = limit
+        self.calls = 0
+        self.active = False
+        self._previous_hook = None
+
+    def __enter__(self):
+        self.active = True
+        return super().__enter__()
+
+    def __exit__(self, *exc):
+        if sys.getprofile() == self._leave:
+            sys.setprofile(self._previous_hook)
+        if self.active:
+            self.active = False
+            super().__exit__(*exc)
+
+    def __torch_dispatch__(self, func, types, args=(), kwargs=None):
+        self.calls += 1
+        if self.calls > self.limit and not self.profiler.stopped:
+            self.profiler.stop()
+            self._previous_hook = sys.getprofile()
+            sys.setprofile(self._leave)
+        return func(*args, **(kwargs or {}))
+
+    def _leave(self, frame, event, arg) -> None:
+        if _get_current_dispatch_mode() is not self:
+            return  # still inside the dispatch (or under a mode of the user's)
+        self.__exit__(None, None, None)
+
+
+class Profiler:
+    """
+    Runs a block under ``torch.profiler`` (CPU ops, shapes, memory) and
+    ``tracemalloc``, and summarizes it as a top-N operator table.
+
+    Recording every operator is expensive (a tight loop of small ops can
+    produce millions of events), so the profiler stops after
+    ``max_events`` operator calls; the rest of the block runs unprofiled
+    and uncounted, and the summary says it was truncated.
+    """
+
+    def __init__(self, top_n: int = 15, max_events: int = 2000):
+        self.top_n = top_n
+        self.python_peak = 0
+        self.stopped = False
+        self._profile = profile(
+            activities=[ProfilerActivity.CPU],
+            record_shapes=True,
+            profile_memory=True,
+            post_processing_timeout_s=POST_PROCESSING_TIMEOUT,
+        )
+        self._limit = _OperatorLimit(self, max_events)
+
+    def __enter__(self):
+        with _quiet_native_stderr():
+            self._profile.__enter__()
+        self._limit.__enter__()
+        # Started last so the profiler's own setup isn't traced
+        tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._limit.__exit__(*exc)
+        self.stop()
+        return False
+
+    def stop(self) -> None:
+        """Stop recording (the block keeps running)."""
+        if self.stopped:
+            return
+        self.stopped = True
+        self.python_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        with _quiet_native_stderr():
+            self._profile.__exit__(None, None, None)
+
+    def summary(self) -> dict:
+        """Operator table and totals, as plain JSON-serializable data."""
+        events = sorted(self._profile.events(), key=lambda e: e.time_range.start)
+
+        operators: dict[str, dict] = {}
+        memory = peak = 0
+        for event in events:
+            # Allocations and frees in order give the live tensor memory over time
+            memory += event.self_cpu_memory_usage
+            peak = max(peak, memory)
+            if event.name in _HIDDEN_EVENTS:
+                continue
+            if any(child.name == "PythonDispatchMode" for child in event.cpu_children):
+                # Outer record of an op seen by the operator counter; the
+                # real call is recorded again under PythonDispatchMode
+                continue
+            op = operators.get(event.name)
+            if op is None:
+                op = operators[event.name] = {
+                    "name": event.name,
+                    "calls": 0,
+                    "self_cpu_time_us": 0.0,
+                    "cpu_time_us": 0.0,
+                    "self_memory_bytes": 0,
+                    "input_shapes": None,
+                }
+            op["calls"] += 1
+            op["self_cpu_time_us"] += event.self_cpu_time_total
+            op["cpu_time_us"] += event.cpu_time_total
+            op["self_memory_bytes"] += event.self_cpu_memory_usage
+            if op["input_shapes"] is None and any(event.input_shapes):
+                op["input_shapes"] = str(event.input_shapes)
+
+        ranked = sorted(operators.values(), key=lambda op: op["self_cpu_time_us"], reverse=True)
+        for op in ranked:
+            op["self_cpu_time_us"] = round(op["self_cpu_time_us"], 3)
+            op["cpu_time_us"] = round(op["cpu_time_us"], 3)
+        return {
+            "operators": ranked[: self.top_n],
+            "self_cpu_time_total_us": round(sum(op["self_cpu_time_us"] for op in ranked), 3),
+            "peak_tensor_memory_bytes": peak,
+            "peak_python_memory_bytes": self.python_peak,
+            "event_count": self._limit.calls,
+            "events_truncated": self._limit.calls > self._limit.limit,
+        }
@@ -0,0 +1,96 @@
+"""
+Persistent namespace for incremental lesson execution.
+
+Started by ``app/services/sessions.py`` with the artifact store path as
+argument. Reads one JSON request per line on stdin (``{"code", "timeout",
+"figure_format", "max_figures", "max_figure_bytes"}``), runs the code in a
+namespace kept for the whole session and answers each request with one
+JSON line. torch and the other preloads are imported once, at startup.
+"""
+import io
+import json
+import os
+import signal
+import sys
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+import _dataloader
+import _figures
+import _jail
+import academy
+
+PRELOAD = (
+    "import sys\n"
+    "import torch\n"
+    "import torch.nn as nn\n"
+    "import torch.nn.functional as F\n"
+    "import numpy as np\n"
+    "import academy\n"
+)
+
+
+class _BudgetExceeded(BaseException):
+    """Raised in the running cell when its time budget is up."""
+
+
+def _on_alarm(signum, frame):
+    raise _BudgetExceeded()
+
+
+def _run(code: str, namespace: dict, timeout: float) -> dict:
+    stdout, stderr = io.StringIO(), io.StringIO()
+    timed_out = False
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+            try:
+                exec(compile(code, "<cell>", "exec"), namespace)
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except _BudgetExceeded:
+        timed_out = True
+    except (Exception, SystemExit):
+        stderr.write(traceback.format_exc())
+    return {
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "timed_out": timed_out,
+        "execution_time": time.perf_counter() - start,
+    }
+
+
+def main() -> None:
+    # Answers go to a private copy of stdout; fd 1 then points at stderr
+    # so output written around the redirects can't corrupt the protocol
+    channel = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+
+    _figures.setup()
+    _dataloader.configure()
+    academy.use_store(sys.argv[1])
+    namespace = {"__name__": "__main__"}
+    exec(PRELOAD, namespace)
+    _jail.confine()
+    signal.signal(signal.SIGALRM, _on_alarm)
+
+    channel.write(json.dumps({"ready": True}) + "\n")
+    channel.flush()
+    for line in sys.stdin:
+        request = json.loads(line)
+        result = _run(request["code"], namespace, request["timeout"])
+        try:
+            result["figures"] = _figures.collect(
+                request["figure_format"], request["max_figures"], request["max_figure_bytes"]
+            )
+        except Exception as e:
+            result["figures"] = []
+            result["stderr"] += f"Could not render figures: {type(e).__name__}: {e}\n"
+        channel.write(json.dumps(result) + "\n")
+        channel.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Pre-warmed interpreter for a single execution.
+
+Started ahead of time by the sandbox pool (``app/services/sandboxes.py``):
+imports torch and the other preloads, sets up DataLoader workers and
+applies the jail limits (if any), then blocks until an execution or
+validation script arrives on stdin and runs it as ``__main__``. The
+process exits after that one script, so nothing is left over for the
+next job, which gets a fresh process.
+"""
+import linecache
+import os
+import sys
+import traceback
+import types
+
+import _dataloader
+import _figures
+import _jail
+import academy  # noqa: F401
+import numpy  # noqa: F401
+import torch  # noqa: F401
+import torch.nn  # noqa: F401
+import torch.nn.functional  # noqa: F401
+
+SCRIPT_NAME = "<sandbox>"
+
+
+def main() -> None:
+    _figures.setup()
+    _dataloader.configure()
+    _jail.confine()
+
+    script = sys.stdin.read()
+    if not script:
+        # The pool was closed before handing out this sandbox
+        return
+    # Tracebacks show the script lines, as when it ran from a file (the
+    # built-in hook only reads real files, the traceback module linecache)
+    linecache.cache[SCRIPT_NAME] = (len(script), None, script.splitlines(True), SCRIPT_NAME)
+    sys.excepthook = sys.__excepthook__ = traceback.print_exception
+    module = types.ModuleType("__main__")
+    sys.modules["__main__"] = module
+    sys.argv = [SCRIPT_NAME]
+    try:
+        exec(compile(script, SCRIPT_NAME, "exec"), module.__dict__)
+        status = 0
+    except SystemExit as e:
+        status = _exit_status(e)
+    except BaseException as e:
+        # Leave this frame out of the traceback
+        e = e.with_traceback(e.__traceback__.tb_next)
+        sys.excepthook(type(e), e, e.__traceback__)
+        status = 1
+    _dataloader.stop_workers()
+    # Skip interpreter finalization (torch's takes most of a second): the
+    # process is thrown away, and the parent only waits for its output
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(status)
+
+
+def _exit_status(exit: SystemExit) -> int:
+    """Exit status for ``sys.exit(code)``, as the interpreter would use."""
+    if exit.code is None:
+        return 0
+    if isinstance(exit.code, int):
+        return exit.code
+    print(exit.code, file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    main()
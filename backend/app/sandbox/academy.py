@@ -0,0 +1,73 @@
+"""
+Datasets and pretrained weights for lesson code.
+
+Preloaded in executed code, next to torch::
+
+    data = academy.load("digits")              # dict of tensors
+    dataset = academy.dataset("digits")        # TensorDataset(inputs, targets)
+    model.load_state_dict(academy.load("small-cnn"), assign=True)  # stays mapped
+    academy.artifacts()                        # available names
+
+Files are memory-mapped read-only (copy-on-write): every execution shares
+the same pages, and changes made by the code stay private to it.
+"""
+import json
+from pathlib import Path
+
+_store: Path | None = None
+_loaded: dict[str, object] = {}
+
+
+def use_store(path: str | Path) -> None:
+    """Point the helpers at an artifact store directory (done by the wrapper)."""
+    global _store
+    _store = Path(path)
+    _loaded.clear()
+
+
+def _manifest() -> dict[str, dict]:
+    if _store is None:
+        return {}
+    try:
+        with open(_store / "manifest.json", "r", encoding="utf-8") as f:
+            return json.load(f).get("artifacts", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def artifacts() -> dict[str, str]:
+    """Available artifacts and their descriptions."""
+    return {name: entry.get("description", "") for name, entry in sorted(_manifest().items())}
+
+
+def load(name: str):
+    """
+    Open an artifact: a dict of tensors (or state_dict) for torch files,
+    a read-only ``numpy.memmap`` for arrays.
+    """
+    if name in _loaded:
+        return _loaded[name]
+    entry = _manifest().get(name)
+    if entry is None:
+        available = ", ".join(sorted(_manifest())) or "none"
+        raise KeyError(f"Unknown artifact '{name}' (available: {available})")
+
+    path = _store / entry["file"]
+    if entry["format"] == "numpy":
+        import numpy as np
+
+        value = np.load(path, mmap_mode="r")
+    else:
+        import torch
+
+        value = torch.load(path, mmap=True, weights_only=True)
+    _loaded[name] = value
+    return value
+
+
+def dataset(name: str):
+    """A ``TensorDataset`` over an artifact's ``inputs`` and ``targets``."""
+    from torch.utils.data import TensorDataset
+
+    data = load(name)
+    return TensorDataset(data["inputs"], data["targets"])
@@ -0,0 +1,195 @@
+"""
+Read-only store of datasets and model weights for lesson code.
+
+Artifacts are saved once, as ``torch.save`` files (dicts of tensors or
+state_dicts) or ``.npy`` arrays, next to a ``manifest.json`` describing
+them. Execution workers open them through the ``academy`` helper module
+(``app/sandbox/academy.py``) with ``torch.load(mmap=True)`` or numpy
+memmaps, so concurrent executions share the same physical pages instead
+of each loading its own copy, and nothing needs the network.
+
+Build the built-in artifacts with::
+
+    python -m app.services.artifacts
+
+The API process only reads the manifest; torch is imported when building.
+"""
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+from ..config import get_settings
+
+MANIFEST = "manifest.json"
+
+# Seed for the generated built-in artifacts, so every build is identical
+BUILTIN_SEED = 0
+
+
+def default_store_path() -> Path:
+    settings = get_settings()
+    return settings.artifacts_dir or settings.cache_dir / "artifacts"
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """Directory of artifacts plus their manifest."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def manifest(self) -> dict[str, dict]:
+        """Artifact name -> entry (file, format, kind, bytes, sha256, description)."""
+        try:
+            with open(self.path / MANIFEST, "r", encoding="utf-8") as f:
+                return json.load(f).get("artifacts", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, artifacts: dict[str, dict]) -> None:
+        tmp_path = self.path / (MANIFEST + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"artifacts": artifacts}, f, indent=2, sort_keys=True)
+        tmp_path.replace(self.path / MANIFEST)
+
+    def _register(self, name: str, file: str, format: str, kind: str, description: str) -> dict:
+        artifacts = self.manifest()
+        entry = {
+            "file": file,
+            "format": format,
+            "kind": kind,
+            "bytes": (self.path / file).stat().st_size,
+            "sha256": _sha256(self.path / file),
+            "description": description,
+        }
+        artifacts[name] = entry
+        self._write_manifest(artifacts)
+        return entry
+
+    def add_tensors(self, name: str, tensors: dict, kind: str, description: str = "") -> dict:
+        """
+        Save a dict of tensors (a dataset's fields or a state_dict).
+
+        Written to a temporary file and renamed, so workers never map a
+        half-written file.
+        """
+        import torch
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        file = f"{name}.pt"
+        tmp_path = self.path / (file + ".tmp")
+        torch.save({key: value.contiguous() for key, value in tensors.items()}, tmp_path)
+        tmp_path.replace(self.path / file)
+        return self._register(name, file, "torch", kind, description)
+
+    def add_array(self, name: str, array, kind: str = "dataset", description: str = "") -> dict:
+        """Save a numpy array, opened by workers as a read-only memmap."""
+        import numpy as np
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        file = f"{name}.npy"
+        tmp_path = self.path / (file + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(array))
+        tmp_path.replace(self.path / file)
+        return self._register(name, file, "numpy", kind, description)
+
+    def verify(self) -> list[str]:
+        """Names of artifacts whose file is missing or doesn't match its checksum."""
+        return [
+            name
+            for name, entry in self.manifest().items()
+            if not (self.path / entry["file"]).exists()
+            or _sha256(self.path / entry["file"]) != entry["sha256"]
+        ]
+
+
+def _synthetic_digits(count: int = 2000):
+    """
+    MNIST-shaped dataset (1x28x28 images, 10 classes) drawn procedurally:
+    each class is a fixed stroke pattern with per-sample shifts and noise.
+    """
+    import torch
+
+    generator = torch.Generator().manual_seed(BUILTIN_SEED)
+    templates = (torch.rand(10, 1, 28, 28, generator=generator) > 0.8).float()
+    targets = torch.arange(count) % 10
+    shifts = torch.randint(-2, 3, (count, 2), generator=generator)
+    inputs = torch.empty(count, 1, 28, 28)
+    for i in range(count):
+        image = templates[targets[i]].roll(shifts[i].tolist(), dims=(1, 2))
+        inputs[i] = image + 0.1 * torch.randn(1, 28, 28, generator=generator)
+    return {"inputs": inputs.clamp(0, 1), "targets": targets}
+
+
+def _small_cnn_weights():
+    """Fixed weights for the feature extractor used in lesson 19."""
+    import torch
+    from torch import nn
+
+    torch.manual_seed(BUILTIN_SEED)
+    model = nn.ModuleDict(
+        {
+            "features": nn.Sequential(
+                nn.Conv2d(3, 64, 3, padding=1),
+                nn.ReLU(),
+                nn.MaxPool2d(2),
+                nn.Conv2d(64, 128, 3, padding=1),
+                nn.ReLU(),
+                nn.AdaptiveAvgPool2d((1, 1)),
+            ),
+            "classifier": nn.Linear(128, 1000),
+        }
+    )
+    return model.state_dict()
+
+
+def build_builtin(store: ArtifactStore) -> list[str]:
+    """Generate the artifacts used by the lessons (deterministic, offline)."""
+    store.add_tensors(
+        "digits",
+        _synthetic_digits(),
+        kind="dataset",
+        description="2000 synthetic MNIST-shaped digits: inputs (N, 1, 28, 28) and targets (N,)",
+    )
+    store.add_tensors(
+        "small-cnn",
+        _small_cnn_weights(),
+        kind="weights",
+        description="state_dict for the lesson 19 PretrainedModel (features + 1000-class classifier)",
+    )
+    return ["digits", "small-cnn"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build the read-only artifact store")
+    parser.add_argument("--output", type=Path, default=None, help="Store directory")
+    parser.add_argument("--verify", action="store_true", help="Only check the stored files")
+    args = parser.parse_args()
+
+    store = ArtifactStore(args.output or default_store_path())
+    if args.verify:
+        broken = store.verify()
+        for name in broken:
+            print(f"Missing or corrupted: {name}")
+        return 1 if broken else 0
+
+    names = build_builtin(store)
+    for name in names:
+        entry = store.manifest()[name]
+        print(f"{name}: {entry['file']} ({entry['bytes'] / 1e6:.1f} MB)")
+    print(f"Wrote {len(names)} artifacts to {store.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Content-addressed store for binary execution outputs (figures).
+
+Blobs are named by the SHA-256 of their bytes, so the same plot produced
+by many learners is stored once, and a blob id never changes meaning:
+clients can cache ``/api/blobs/{id}`` forever. When the store grows past
+its size limit, the least recently stored or re-used blobs are evicted.
+"""
+import base64
+import hashlib
+import os
+import re
+import threading
+from pathlib import Path
+
+from ..config import get_settings
+from ..metrics import cache_requests
+from ..models import ExecutionFigure
+
+MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+BLOB_ID = re.compile(r"^[0-9a-f]{64}\.(png|svg)$")
+
+# Eviction frees space down to this fraction of the limit, so it doesn't
+# run again on the very next write
+LOW_WATERMARK = 0.8
+
+
+class BlobStore:
+    """Directory of blobs sharded by the first two hex digits of their hash."""
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: int | None = None
+
+    def _blob_path(self, blob_id: str) -> Path:
+        return self.path / blob_id[:2] / blob_id
+
+    def _files(self) -> list[Path]:
+        return [p for p in self.path.glob("??/*") if BLOB_ID.match(p.name)]
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(p.stat().st_size for p in self._files())
+        return self._size
+
+    def put(self, data: bytes, extension: str) -> str:
+        """Store ``data`` (if new) and return its blob id."""
+        blob_id = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+        path = self._blob_path(blob_id)
+        if path.exists():
+            # Mark as recently used so eviction keeps it
+            os.utime(path)
+            cache_requests.inc(cache="blobs", result="hit")
+            return blob_id
+
+        cache_requests.inc(cache="blobs", result="miss")
+        with self._lock:
+            # Scanned before writing, so the first scan doesn't count this blob
+            self._current_size()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{blob_id}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+        with self._lock:
+            self._size = self._current_size() + len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+        return blob_id
+
+    def _evict(self) -> None:
+        """Delete the oldest blobs until the store is under the low watermark."""
+        entries = []
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        size = sum(entry[1] for entry in entries)
+        target = self.max_bytes * LOW_WATERMARK
+        for _, file_size, path in entries:
+            if size <= target:
+                break
+            path.unlink(missing_ok=True)
+            size -= file_size
+        self._size = size
+
+    def store_figures(self, figures: list[dict]) -> list[ExecutionFigure]:
+        """Store figures captured in a sandbox (base64 data), returning their URLs."""
+        stored = []
+        for figure in figures:
+            data = base64.b64decode(figure["data"])
+            blob_id = self.put(data, figure["format"])
+            stored.append(
+                ExecutionFigure(
+                    id=blob_id,
+                    url=f"/api/blobs/{blob_id}",
+                    media_type=MEDIA_TYPES[figure["format"]],
+                    bytes=len(data),
+                )
+            )
+        return stored
+
+    def get_path(self, blob_id: str) -> Path | None:
+        """Path of a stored blob, or None for unknown or malformed ids."""
+        if not BLOB_ID.match(blob_id):
+            return None
+        path = self._blob_path(blob_id)
+        return path if path.exists() else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"blobs": len(self._files()), "bytes": self._current_size()}
+
+
+_blob_store: BlobStore | None = None
+
+
+def get_blob_store() -> BlobStore:
+    """Get blob store singleton."""
+    global _blob_store
+    if _blob_store is None:
+        settings = get_settings()
+        _blob_store = BlobStore(
+            settings.blob_store_dir or settings.cache_dir / "blobs",
+            max_bytes=settings.blob_store_max_bytes,
+        )
+    return _blob_store
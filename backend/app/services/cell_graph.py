@@ -0,0 +1,284 @@
+"""
+Def-use analysis of a lesson's code cells.
+
+Every cell is parsed (never run) for the names it binds at module level
+and the names it reads. A later cell that reads a name an earlier cell
+binds depends on it, so after an edit only the edited cell and the cells
+downstream of it need to run again.
+
+The analysis is static and errs on the side of re-running: a name read
+anywhere in a cell (function bodies included) counts as a use unless it
+is a parameter, loop variable or local there, and mutations through attributes, subscripts, augmented assignment or
+in-place methods (``x.add_()``, ``optimizer.step()``) count as
+rebinding the base name. Effects it can't see, like ``loss.backward()``
+filling ``w.grad``, are only tracked through the names involved.
+"""
+import ast
+from dataclasses import dataclass, field
+
+# Methods that change their object in place (besides torch's ``*_`` ones)
+MUTATING_METHODS = {
+    "append", "extend", "insert", "pop", "remove", "clear", "update", "add", "discard",
+    "setdefault", "sort", "reverse", "step", "zero_grad", "backward", "train", "eval",
+    "load_state_dict", "register_buffer", "register_parameter", "add_module", "apply",
+}
+
+
+@dataclass
+class CellSymbols:
+    """Names a cell binds at module level and names it reads from earlier cells."""
+
+    defines: set[str] = field(default_factory=set)
+    uses: set[str] = field(default_factory=set)
+    syntax_error: str | None = None
+
+
+def _stored_names(nodes) -> set[str]:
+    """Names bound anywhere in ``nodes`` (the locals of a function body)."""
+    names = set()
+    for node in nodes:
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name) and not isinstance(child.ctx, ast.Load):
+                names.add(child.id)
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                names.add(child.name)
+            elif isinstance(child, (ast.Import, ast.ImportFrom)):
+                names.update((a.asname or a.name).split(".")[0] for a in child.names)
+            elif isinstance(child, (ast.Global, ast.Nonlocal)):
+                names.difference_update(child.names)
+    return names
+
+
+def _parameters(args: ast.arguments) -> set[str]:
+    params = args.posonlyargs + args.args + args.kwonlyargs
+    params += [a for a in (args.vararg, args.kwarg) if a is not None]
+    return {a.arg for a in params}
+
+
+def _target_names(node: ast.AST | None) -> set[str]:
+    if node is None:
+        return set()
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+
+
+def _base_name(node: ast.AST) -> str | None:
+    """``x`` for ``x``, ``x.a.b``, ``x[0].a`` and the like."""
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+class _SymbolVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.symbols = CellSymbols()
+        # Nesting of function, class, lambda and comprehension scopes
+        self.depth = 0
+        # Names known to be bound where they are read (loop variables,
+        # parameters and locals of the enclosing functions)
+        self.bound: list[set[str]] = []
+
+    def _bind(self, name: str) -> None:
+        if self.depth == 0:
+            self.symbols.defines.add(name)
+
+    def _mutate(self, target: ast.AST) -> None:
+        name = _base_name(target)
+        if name is not None and not self._is_bound(name):
+            self.symbols.uses.add(name)
+            self._bind(name)
+
+    def _nested(self, nodes, local_names: set[str] = frozenset()) -> None:
+        self.depth += 1
+        self._with_bound(local_names, nodes)
+        self.depth -= 1
+
+    def _with_bound(self, names: set[str], nodes) -> None:
+        self.bound.append(set(names))
+        for node in nodes:
+            self.visit(node)
+        self.bound.pop()
+
+    def _is_bound(self, name: str) -> bool:
+        return any(name in names for names in self.bound)
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if isinstance(node.ctx, ast.Load):
+            if not self._is_bound(node.id):
+                self.symbols.uses.add(node.id)
+        else:
+            self._bind(node.id)
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        if not isinstance(node.ctx, ast.Load):
+            self._mutate(node)
+        self.generic_visit(node)
+
+    visit_Subscript = visit_Attribute
+
+    def visit_AugAssign(self, node: ast.AugAssign) -> None:
+        self._mutate(node.target)
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call) -> None:
+        func = node.func
+        if isinstance(func, ast.Attribute) and (
+            func.attr in MUTATING_METHODS or (func.attr.endswith("_") and not func.attr.startswith("_"))
+        ):
+            self._mutate(func.value)
+        self.generic_visit(node)
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self._bind(alias.asname or alias.name.split(".")[0])
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        for alias in node.names:
+            if alias.name != "*":
+                self._bind(alias.asname or alias.name)
+
+    def visit_Global(self, node: ast.Global) -> None:
+        self.symbols.defines.update(node.names)
+
+    def _visit_loop(self, node) -> None:
+        # The loop variable is always bound inside the body
+        self.visit(node.iter)
+        self.visit(node.target)
+        self._with_bound(_target_names(node.target), node.body)
+        for statement in node.orelse:
+            self.visit(statement)
+
+    visit_For = visit_AsyncFor = _visit_loop
+
+    def _visit_with(self, node) -> None:
+        names = set()
+        for item in node.items:
+            self.visit(item)
+            names |= _target_names(item.optional_vars)
+        self._with_bound(names, node.body)
+
+    visit_With = visit_AsyncWith = _visit_with
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> None:
+        if node.type:
+            self.visit(node.type)
+        if node.name:
+            self._bind(node.name)
+        self._with_bound({node.name} if node.name else set(), node.body)
+
+    def _visit_function(self, node) -> None:
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.visit(node.args)
+        if node.returns:
+            self.visit(node.returns)
+        self._bind(node.name)
+        self._nested(node.body, _parameters(node.args) | _stored_names(node.body))
+
+    visit_FunctionDef = visit_AsyncFunctionDef = _visit_function
+
+    def visit_arguments(self, node: ast.arguments) -> None:
+        # Defaults and annotations are evaluated in the enclosing scope;
+        # the parameter names themselves are local to the function
+        for default in node.defaults + [d for d in node.kw_defaults if d is not None]:
+            self.visit(default)
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        for expr in node.decorator_list + node.bases + [k.value for k in node.keywords]:
+            self.visit(expr)
+        self._bind(node.name)
+        self._nested(node.body)
+
+    def visit_Lambda(self, node: ast.Lambda) -> None:
+        self.visit(node.args)
+        self._nested([node.body], _parameters(node.args))
+
+    def _visit_comprehension(self, node) -> None:
+        # The first iterable is evaluated outside the comprehension's scope
+        self.visit(node.generators[0].iter)
+        self.depth += 1
+        self.bound.append(set().union(*(_target_names(g.target) for g in node.generators)))
+        for generator in node.generators:
+            self.visit(generator.target)
+            if generator is not node.generators[0]:
+                self.visit(generator.iter)
+            for condition in generator.ifs:
+                self.visit(condition)
+        for child in ("elt", "key", "value"):
+            if hasattr(node, child):
+                self.visit(getattr(node, child))
+        self.bound.pop()
+        self.depth -= 1
+
+    visit_ListComp = visit_SetComp = visit_GeneratorExp = visit_DictComp = _visit_comprehension
+
+    def visit_NamedExpr(self, node: ast.NamedExpr) -> None:
+        # Walrus targets bind in the enclosing function or module scope
+        self.visit(node.value)
+        if self.depth == 0 or not isinstance(node.target, ast.Name):
+            self.visit(node.target)
+
+
+def analyze_cell(code: str) -> CellSymbols:
+    """Names a cell defines and uses (both empty if it doesn't parse)."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return CellSymbols(syntax_error=f"line {e.lineno}: {e.msg}")
+    symbols = CellSymbols()
+    # Statement by statement, so that a name the cell binds before reading
+    # it (like its own ``import torch``) isn't a dependency on other cells
+    for statement in tree.body:
+        visitor = _SymbolVisitor()
+        visitor.visit(statement)
+        symbols.uses |= visitor.symbols.uses - symbols.defines
+        symbols.defines |= visitor.symbols.defines
+    return symbols
+
+
+class CellGraph:
+    """The ordered cells of a lesson and the dependencies between them."""
+
+    def __init__(self, cells: list[tuple[str, str]]):
+        self.ids = [cell_id for cell_id, _ in cells]
+        self.codes = [code for _, code in cells]
+        self.symbols = [analyze_cell(code) for code in self.codes]
+
+    def index(self, cell_id: str) -> int:
+        return self.ids.index(cell_id)
+
+    def definer(self, index: int, name: str) -> int | None:
+        """The last cell before ``index`` that binds ``name``."""
+        for earlier in range(index - 1, -1, -1):
+            if name in self.symbols[earlier].defines:
+                return earlier
+        return None
+
+    def dependencies(self, index: int) -> set[int]:
+        """Cells whose bindings cell ``index`` reads."""
+        definers = (self.definer(index, name) for name in self.symbols[index].uses)
+        return {definer for definer in definers if definer is not None}
+
+    def downstream(self, index: int, names: set[str]) -> list[int]:
+        """
+        Cells after ``index`` affected when it rebinds ``names``: a cell is
+        affected if it reads a name that is still dirty when it runs, and
+        everything it binds becomes dirty in turn. A cell rebinding a name
+        without reading dirty state makes it clean again.
+        """
+        dirty = set(names)
+        affected = []
+        for later in range(index + 1, len(self.ids)):
+            symbols = self.symbols[later]
+            if symbols.uses & dirty:
+                affected.append(later)
+                dirty |= symbols.defines
+            else:
+                dirty -= symbols.defines
+        return affected
+
+    def update(self, index: int, code: str) -> list[int]:
+        """Replace a cell's code; returns the cells downstream of the change."""
+        changed = set(self.symbols[index].defines)
+        self.codes[index] = code
+        self.symbols[index] = analyze_cell(code)
+        return self.downstream(index, changed | self.symbols[index].defines)
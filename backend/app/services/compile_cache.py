@@ -0,0 +1,168 @@
+"""
+Shared cache of torch.compile artifacts for executed code.
+
+Every execution runs in a fresh process, so ``torch.compile`` would
+redo the whole Inductor compilation (tens of seconds on CPU, past the
+time budget) each time. Executions point Inductor's on-disk caches (FX
+graph and AOTAutograd caches) at one directory per torch version, shared
+by every execution on the host, so a graph compiled once is loaded on
+later runs. Inductor keys entries by the traced graph, its inputs and
+the compiler configuration. The directory is trimmed to a size limit,
+oldest files first.
+
+Under the jail backend executions only read the cache: it is mounted
+copy-on-write so learner code can't plant artifacts other jobs load, and
+what they compile is discarded. There, only the trusted ``--warm`` run
+(the lesson cells, outside the jail) fills it; other code compiles from
+scratch every time.
+
+Report the cache size (and trim it) or pre-compile the lesson cells that
+call ``torch.compile``::
+
+    python -m app.services.compile_cache [--warm]
+"""
+import argparse
+import getpass
+import os
+import re
+import sys
+import tempfile
+from importlib import metadata
+from pathlib import Path
+
+from ..config import get_settings
+
+# Trimming frees space down to this fraction of the limit
+LOW_WATERMARK = 0.8
+
+# torch.compile calls outside comments
+COMPILE_CALL = re.compile(r"^[^#\n]*\btorch\.compile\(", re.MULTILINE)
+
+
+def _torch_version() -> str:
+    try:
+        return metadata.version("torch")
+    except metadata.PackageNotFoundError:
+        return "none"
+
+
+class CompileCache:
+    """Directory of Inductor caches, one subdirectory per torch version."""
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        # Artifacts compiled by another torch version are never loaded
+        self.version_path = path / _torch_version()
+
+    def env(self) -> dict[str, str]:
+        """Environment variables making a worker process use the cache."""
+        return {
+            "TORCHINDUCTOR_CACHE_DIR": str(self.version_path / "inductor"),
+            "TORCHINDUCTOR_FX_GRAPH_CACHE": "1",
+            "TORCHINDUCTOR_AUTOGRAD_CACHE": "1",
+            "TRITON_CACHE_DIR": str(self.version_path / "triton"),
+        }
+
+    def jail_overlays(self) -> dict[str, str]:
+        """
+        Directories jailed executions load compiled code from, by their
+        path in the jail (which writes to them are kept from): the cache,
+        and the C++ headers Inductor precompiles into its per-user
+        temporary directory, too large to rebuild under the jail's file
+        size limit.
+        """
+        headers = "torchinductor_" + re.sub(r'[\\/:*?"<>|]', "_", getpass.getuser())
+        return {
+            str(self.version_path): str(self.version_path),
+            f"/tmp/{headers}": os.path.join(tempfile.gettempdir(), headers),
+        }
+
+    def _files(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.path.rglob("*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.is_file():
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._files())
+
+    def trim(self) -> int:
+        """Delete the oldest files while over the limit; returns bytes freed."""
+        entries = sorted(self._files())
+        size = sum(entry[1] for entry in entries)
+        if size <= self.max_bytes:
+            return 0
+        freed = 0
+        for _, file_size, path in entries:
+            if size - freed <= self.max_bytes * LOW_WATERMARK:
+                break
+            path.unlink(missing_ok=True)
+            freed += file_size
+        return freed
+
+
+_compile_cache: CompileCache | None = None
+
+
+def get_compile_cache() -> CompileCache:
+    """Get compile cache singleton."""
+    global _compile_cache
+    if _compile_cache is None:
+        settings = get_settings()
+        _compile_cache = CompileCache(
+            settings.compile_cache_dir or settings.cache_dir / "compile",
+            max_bytes=settings.compile_cache_max_bytes,
+        )
+    return _compile_cache
+
+
+def warm() -> int:
+    """Run every lesson cell that calls torch.compile, filling the cache."""
+    from ..models import CodeExecutionRequest
+    from .content import get_content_service
+    from .execution import ExecutionService
+    from .sandboxes import SandboxPool, create_executor
+
+    content = get_content_service()
+    # Cold compilations can take far longer than the learners' budget
+    service = ExecutionService(max_timeout=600)
+    # Jailed runs can't write to the cache; the lesson cells are trusted
+    service.sandboxes = SandboxPool(create_executor("subprocess"), size=0)
+    failures = 0
+    for module_id in content.get_module_ids():
+        for cell_id, code in content.get_code_cells(module_id) or []:
+            if not COMPILE_CALL.search(code):
+                continue
+            response = service.execute(CodeExecutionRequest(code=code, timeout=600, shared=False))
+            stats = response.compile_cache
+            print(
+                f"{module_id}/{cell_id}: {'ok' if response.success else 'failed'}"
+                f" ({response.execution_time:.1f}s"
+                f"{f', {stats.misses} compiled, {stats.hits} cached' if stats else ''})"
+            )
+            failures += not response.success
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Manage the torch.compile artifact cache")
+    parser.add_argument(
+        "--warm", action="store_true", help="Compile the lesson cells that call torch.compile"
+    )
+    args = parser.parse_args()
+
+    cache = get_compile_cache()
+    failures = warm() if args.warm else 0
+    freed = cache.trim()
+    print(f"{cache.path}: {cache.size() / 1e6:.1f} MB ({freed / 1e6:.1f} MB trimmed)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
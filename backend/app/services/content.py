@@ -1,12 +1,17 @@
 """Content service for loading curriculum and modules."""
 import json
+import re
 from pathlib import Path
 from functools import lru_cache
 
 import frontmatter
 
+from ..concurrency import io_pool
 from ..config import get_settings
-from ..models import Module, ModuleMetadata, Curriculum, Section
+from ..mdx import extract_code_cells
+from ..metrics import cache_requests
+from ..models import Module, ModuleMetadata, Curriculum, Section, LearningPath
+from .prerequisites import PrerequisiteGraph
 
 
 # Section definitions
@@ -26,12 +31,16 @@ SECTIONS = {
     },
 }
 
+DOC_REF_PATTERN = re.compile(r'<DocRef\s+symbol="([^"]+)"')
+
 
 class ContentService:
     """Service for loading and managing curriculum content."""
 
     def __init__(self):
         self.content_dir = get_settings().content_dir
+        self._graph: PrerequisiteGraph | None = None
+        self._graph_metadata: dict[str, ModuleMetadata] = {}
 
     def _get_section_for_module(self, module_order: int) -> tuple[str, str, int]:
         """Get section id, title, and order for a module based on its order."""
@@ -74,11 +83,8 @@ class ContentService:
             print(f"Error parsing module {module_dir}: {e}")
             return None
 
-    def get_curriculum(self) -> Curriculum:
-        """Get the full curriculum structure."""
-        if not self.content_dir.exists():
-            return Curriculum(sections=[], total_modules=0, total_estimated_minutes=0)
-
+    def _load_all_metadata(self) -> list[ModuleMetadata]:
+        """Parse every module directory, sorted by module order."""
         modules: list[ModuleMetadata] = []
 
         # Scan content directory for modules
@@ -90,6 +96,14 @@ class ContentService:
 
         # Sort by order
         modules.sort(key=lambda m: m.order)
+        return modules
+
+    def get_curriculum(self) -> Curriculum:
+        """Get the full curriculum structure."""
+        if not self.content_dir.exists():
+            return Curriculum(sections=[], total_modules=0, total_estimated_minutes=0)
+
+        modules = self._load_all_metadata()
 
         # Group into sections
         sections_dict: dict[str, list[ModuleMetadata]] = {}
@@ -151,6 +165,38 @@ class ContentService:
 
         return Module(metadata=metadata, content=content, exercises=exercises)
 
+    def get_prerequisite_graph(self) -> PrerequisiteGraph:
+        """
+        Get the prerequisite graph, building it on first use.
+
+        Raises PrerequisiteError if the content has unknown prerequisites
+        or a prerequisite cycle.
+        """
+        if self._graph is not None:
+            cache_requests.inc(cache="prerequisite_graph", result="hit")
+            return self._graph
+        cache_requests.inc(cache="prerequisite_graph", result="miss")
+        modules = self._load_all_metadata() if self.content_dir.exists() else []
+        graph = PrerequisiteGraph({m.id: m.prerequisites for m in modules})
+        self._graph_metadata = {m.id: m for m in modules}
+        self._graph = graph
+        return self._graph
+
+    def get_learning_path(self, module_id: str) -> LearningPath | None:
+        """Get every module needed before ``module_id``, in learning order."""
+        graph = self.get_prerequisite_graph()
+        if module_id not in graph:
+            return None
+
+        prerequisites = list(graph.ancestors(module_id))
+        return LearningPath(
+            module_id=module_id,
+            prerequisites=prerequisites,
+            total_estimated_minutes=sum(
+                self._graph_metadata[m].estimated_minutes for m in prerequisites
+            ),
+        )
+
     def get_module_ids(self) -> list[str]:
         """Get list of all module IDs."""
         if not self.content_dir.exists():
@@ -163,6 +209,56 @@ class ContentService:
                     ids.append(item.name)
         return ids
 
+    def get_doc_symbols(self) -> list[str]:
+        """Get every symbol referenced by a <DocRef> in any lesson."""
+        symbols: set[str] = set()
+        for module_id in self.get_module_ids():
+            lesson_file = self.content_dir / module_id / "lesson.mdx"
+            symbols.update(DOC_REF_PATTERN.findall(lesson_file.read_text(encoding="utf-8")))
+        return sorted(symbols)
+
+    def get_code_cells(self, module_id: str) -> list[tuple[str, str]] | None:
+        """Get the (id, code) of every <CodeCell> in a lesson, in order."""
+        lesson_file = self.content_dir / module_id / "lesson.mdx"
+        if not lesson_file.exists():
+            return None
+        return extract_code_cells(lesson_file.read_text(encoding="utf-8"))
+
+    # Async variants: run the disk reads and frontmatter parsing in the
+    # I/O thread pool so they never block the event loop.
+
+    async def aget_curriculum(self) -> Curriculum:
+        """Async version of :meth:`get_curriculum`."""
+        return await io_pool.run(self.get_curriculum)
+
+    async def aget_module(self, module_id: str) -> Module | None:
+        """Async version of :meth:`get_module`."""
+        return await io_pool.run(self.get_module, module_id)
+
+    async def aget_module_ids(self) -> list[str]:
+        """Async version of :meth:`get_module_ids`."""
+        return await io_pool.run(self.get_module_ids)
+
+    async def aget_doc_symbols(self) -> list[str]:
+        """Async version of :meth:`get_doc_symbols`."""
+        return await io_pool.run(self.get_doc_symbols)
+
+    async def aget_code_cells(self, module_id: str) -> list[tuple[str, str]] | None:
+        """Async version of :meth:`get_code_cells`."""
+        return await io_pool.run(self.get_code_cells, module_id)
+
+    async def aget_prerequisite_graph(self) -> PrerequisiteGraph:
+        """Async version of :meth:`get_prerequisite_graph`."""
+        if self._graph is not None:
+            cache_requests.inc(cache="prerequisite_graph", result="hit")
+            return self._graph
+        return await io_pool.run(self.get_prerequisite_graph)
+
+    async def aget_learning_path(self, module_id: str) -> LearningPath | None:
+        """Async version of :meth:`get_learning_path`."""
+        await self.aget_prerequisite_graph()
+        return self.get_learning_path(module_id)
+
 
 @lru_cache
 def get_content_service() -> ContentService:
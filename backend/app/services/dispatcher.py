@@ -0,0 +1,316 @@
+"""
+Dispatcher for remote execution worker agents.
+
+Code execution is CPU-heavy (torch in a subprocess) while the API tier
+mostly waits on I/O, so executions can run on other machines. Worker
+agents (``python -m app.services.worker_agent``) connect to the
+dispatcher over TCP, say how many jobs they run at once, then receive
+jobs and send each result back on the same connection as soon as it is
+done.
+
+Messages are JSON objects, one per line::
+
+    agent -> dispatcher  {"type": "register", "name": ..., "capacity": 4, "token": ...}
+    dispatcher -> agent  {"type": "registered"} or {"type": "rejected", "reason": ...}
+    dispatcher -> agent  {"type": "job", "id": ..., "request": {...}}
+    dispatcher -> agent  {"type": "cancel", "id": ...}
+    agent -> dispatcher  {"type": "result", "id": ..., "response": {...}, "figures": [...]}
+    agent -> dispatcher  {"type": "heartbeat"}
+
+Jobs go to the least loaded worker. A worker that disconnects or stops
+sending heartbeats is dropped and its jobs are retried on another one;
+when no worker can take a job, the caller runs it locally. A cancelled
+job is killed on its worker, which still sends a result (marked
+cancelled) back.
+"""
+import asyncio
+import hmac
+import ipaddress
+import json
+import logging
+import uuid
+
+from ..config import get_settings
+from ..metrics import execution_dispatches, execution_worker_slots
+from ..models import CodeExecutionRequest, CodeExecutionResponse
+from .jobs import CANCELLED_MESSAGE, Run
+
+# Results carry the captured output and figures, well past asyncio's
+# default 64 KiB line limit
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerLost(Exception):
+    """The worker running a job disconnected or stopped responding."""
+
+
+async def read_message(reader: asyncio.StreamReader) -> dict | None:
+    """Next message from the connection, or None once it is closed."""
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+async def send_message(writer: asyncio.StreamWriter, message: dict) -> None:
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+
+class RemoteWorker:
+    """A connected worker agent and the jobs it is running."""
+
+    def __init__(self, name: str, capacity: int, writer: asyncio.StreamWriter):
+        self.name = name
+        self.capacity = capacity
+        self.writer = writer
+        self.jobs: dict[str, asyncio.Future] = {}
+        self.closed = False
+
+    @property
+    def load(self) -> float:
+        return len(self.jobs) / self.capacity
+
+    @property
+    def has_free_slot(self) -> bool:
+        return len(self.jobs) < self.capacity
+
+    async def submit(self, request: CodeExecutionRequest, run: Run | None = None) -> dict:
+        """Send a job and wait for its result message; cancelling ``run`` cancels the job."""
+        if self.closed:
+            raise WorkerLost(f"Worker '{self.name}' is disconnected")
+        job_id = uuid.uuid4().hex
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.jobs[job_id] = future
+        try:
+            message = {"type": "job", "id": job_id, "request": request.model_dump(mode="json")}
+            await send_message(self.writer, message)
+            if run is not None:
+
+                def cancel() -> None:
+                    # Runs may be cancelled from any thread
+                    loop.call_soon_threadsafe(self._send_cancel, job_id)
+
+                if not run.bind(cancel):
+                    self._send_cancel(job_id)
+            return await future
+        except ConnectionError as e:
+            raise WorkerLost(f"Worker '{self.name}' disconnected: {e}") from e
+        finally:
+            if run is not None:
+                run.unbind()
+            self.jobs.pop(job_id, None)
+
+    def _send_cancel(self, job_id: str) -> None:
+        if job_id in self.jobs and not self.closed:
+            # Not drained: it's small, and the job's result is awaited anyway
+            self.writer.write(json.dumps({"type": "cancel", "id": job_id}).encode() + b"\n")
+
+    def resolve(self, message: dict) -> None:
+        future = self.jobs.get(message.get("id"))
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    def close(self, reason: str) -> None:
+        """Fail the running jobs (so they are retried elsewhere) and disconnect."""
+        self.closed = True
+        for future in self.jobs.values():
+            if not future.done():
+                future.set_exception(WorkerLost(f"Worker '{self.name}' {reason}"))
+        self.writer.close()
+
+
+def is_loopback(host: str) -> bool:
+    """Whether ``host`` only accepts connections from this machine."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # a host name, or "" for every interface
+
+
+class Dispatcher:
+    """Accepts worker agent connections and sends executions to them."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        token: str | None = None,
+        heartbeat_timeout: float = 15.0,
+        max_retries: int = 2,
+        local_fallback: bool = True,
+    ):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_retries = max_retries
+        self.local_fallback = local_fallback
+        self.workers: dict[str, RemoteWorker] = {}
+        self._server: asyncio.Server | None = None
+        self._connections: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        """
+        Listen for worker agents (``port`` 0 picks a free port).
+
+        Agents run whatever code they are sent, so without a token the
+        dispatcher only listens on a loopback address.
+        """
+        if not self.token:
+            if not is_loopback(self.host):
+                raise RuntimeError(
+                    f"Refusing to start the dispatcher on {self.host} without a token; "
+                    "set DISPATCHER_TOKEN"
+                )
+            logger.warning(
+                "Execution dispatcher running without a token: any local process can register"
+            )
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port, limit=MAX_MESSAGE_BYTES
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"Execution dispatcher listening on {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        """Disconnect all workers and stop listening."""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for task in self._connections:
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+
+    def pick(self) -> RemoteWorker | None:
+        """
+        Least loaded connected worker. With local fallback, only workers
+        with a free slot count; otherwise busy workers queue the job.
+        """
+        workers = [w for w in self.workers.values() if not w.closed]
+        if self.local_fallback:
+            workers = [w for w in workers if w.has_free_slot]
+        return min(workers, key=lambda w: w.load, default=None)
+
+    async def aexecute(
+        self, request: CodeExecutionRequest, run: Run | None = None
+    ) -> tuple[CodeExecutionResponse, list[dict]] | None:
+        """
+        Run ``request`` on a remote worker, retrying on another one if the
+        worker is lost. Returns the response and the encoded figures, or
+        None when no worker could run it (the caller runs it locally).
+        """
+        for _ in range(self.max_retries + 1):
+            if run is not None and run.cancelled:
+                # Cancelled while its worker was lost; not worth retrying
+                return CodeExecutionResponse(success=False, cancelled=True, error=CANCELLED_MESSAGE), []
+            worker = self.pick()
+            if worker is None:
+                return None
+            try:
+                message = await worker.submit(request, run)
+            except WorkerLost as e:
+                execution_dispatches.inc(target="remote", outcome="worker_lost")
+                print(f"Retrying execution elsewhere: {e}")
+                continue
+            execution_dispatches.inc(target="remote", outcome="ok")
+            response = CodeExecutionResponse.model_validate(message["response"])
+            response.worker = worker.name
+            return response, message.get("figures", [])
+        return None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        worker = None
+        reason = "disconnected"
+        try:
+            message = await asyncio.wait_for(read_message(reader), self.heartbeat_timeout)
+            rejection = self._check_registration(message)
+            if rejection:
+                await send_message(writer, {"type": "rejected", "reason": rejection})
+                return
+
+            worker = RemoteWorker(message["name"], int(message["capacity"]), writer)
+            previous = self.workers.get(worker.name)
+            if previous is not None:
+                # The agent reconnected before its old connection timed out
+                previous.close("reconnected")
+            self.workers[worker.name] = worker
+            await send_message(writer, {"type": "registered"})
+            print(f"Execution worker '{worker.name}' connected ({worker.capacity} slots)")
+
+            while True:
+                message = await asyncio.wait_for(read_message(reader), self.heartbeat_timeout)
+                if message is None:
+                    break
+                if message.get("type") == "result":
+                    worker.resolve(message)
+        except asyncio.TimeoutError:
+            reason = "stopped sending heartbeats"
+        except (ConnectionError, ValueError) as e:
+            reason = f"disconnected: {e}"
+        except asyncio.CancelledError:
+            reason = "was disconnected by the dispatcher"
+        finally:
+            self._connections.discard(task)
+            if worker is None:
+                writer.close()
+            else:
+                if self.workers.get(worker.name) is worker:
+                    del self.workers[worker.name]
+                worker.close(reason)
+                print(f"Execution worker '{worker.name}' {reason}")
+
+    def _check_registration(self, message: dict | None) -> str | None:
+        """Reason to reject a registration message, or None if it is valid."""
+        if not message or message.get("type") != "register":
+            return "expected a register message"
+        if self.token:
+            token = message.get("token")
+            # Constant time, so the token can't be guessed from response times
+            if not isinstance(token, str) or not hmac.compare_digest(
+                token.encode(), self.token.encode()
+            ):
+                return "invalid token"
+        if not message.get("name"):
+            return "missing worker name"
+        if not isinstance(message.get("capacity"), int) or message["capacity"] < 1:
+            return "capacity must be a positive integer"
+        return None
+
+    def slots(self) -> dict[tuple[str, ...], float]:
+        """Busy and free job slots per connected worker."""
+        slots = {}
+        for worker in list(self.workers.values()):
+            slots[(worker.name, "busy")] = len(worker.jobs)
+            slots[(worker.name, "free")] = max(worker.capacity - len(worker.jobs), 0)
+        return slots
+
+
+_dispatcher: Dispatcher | None = None
+
+
+def get_dispatcher() -> Dispatcher:
+    """Get dispatcher singleton (started by the app when ``dispatcher_port`` is set)."""
+    global _dispatcher
+    if _dispatcher is None:
+        settings = get_settings()
+        _dispatcher = Dispatcher(
+            host=settings.dispatcher_host,
+            port=settings.dispatcher_port,
+            token=settings.dispatcher_token,
+            heartbeat_timeout=settings.dispatcher_heartbeat_timeout,
+            max_retries=settings.dispatcher_max_retries,
+            local_fallback=settings.dispatcher_local_fallback,
+        )
+    return _dispatcher
+
+
+execution_worker_slots.set_function(
+    lambda: _dispatcher.slots() if _dispatcher is not None else {}
+)
@@ -1,11 +1,17 @@
 """Documentation proxy service."""
-import re
-from datetime import datetime, timedelta
+import asyncio
 
 import httpx
-from cachetools import TTLCache
 
+from ..concurrency import SingleFlight, io_pool
 from ..config import get_settings
+from ..metrics import cache_requests
+from .docs_cache import DocsCache
+from .docs_extract import DocsExtractor
+from .docs_index import DocsIndex, default_index_path
+
+# Bytes of HTML parsed per step while a docs page downloads
+EXTRACT_CHUNK_SIZE = 65536
 
 
 class DocsService:
@@ -15,8 +21,75 @@ class DocsService:
         settings = get_settings()
         self.base_url = settings.pytorch_docs_base_url
         self.cache_ttl = settings.docs_cache_ttl
-        # Cache for documentation snippets (max 1000 entries, 24h TTL)
-        self._cache: TTLCache = TTLCache(maxsize=1000, ttl=self.cache_ttl)
+        # Persistent cache of remote lookups, shared by all workers on the node
+        self.cache = DocsCache(
+            settings.docs_cache_path or settings.cache_dir / "docs-cache.sqlite3",
+            ttl=self.cache_ttl,
+            negative_ttl=settings.docs_cache_negative_ttl,
+            max_stale=settings.docs_cache_max_stale,
+            max_entries=settings.docs_cache_max_entries,
+        )
+        # Offline index built from the installed torch; the remote
+        # scraper below is only a fallback for symbols it doesn't cover
+        self.index = DocsIndex(
+            settings.docs_index_path or default_index_path(), self.base_url
+        )
+
+        # Long-lived HTTP client shared by all remote lookups
+        self.http2 = settings.docs_http2
+        self.max_connections = settings.docs_max_connections
+        self.keepalive_expiry = settings.docs_keepalive_expiry
+        self._client: httpx.AsyncClient | None = None
+        self._client_loop: asyncio.AbstractEventLoop | None = None
+        self._inflight = SingleFlight()
+        self._refresh_tasks: set[asyncio.Task] = set()
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client used for remote lookups."""
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("HTTP/2 requested for docs but 'h2' is not installed, using HTTP/1.1")
+                http2 = False
+
+        return httpx.AsyncClient(
+            timeout=10.0,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            headers={"User-Agent": "PyTorch-Academy-Docs"},
+        )
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Get the shared client, creating it on first use.
+
+        Connections belong to the event loop they were opened on, so a
+        client is only reused within the same loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = self._create_client()
+            self._client_loop = loop
+        return self._client
+
+    async def start(self) -> None:
+        """Open the shared HTTP client (called from the app lifespan)."""
+        self._get_client()
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client and its pooled connections."""
+        for task in list(self._refresh_tasks):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
 
     def _normalize_symbol(self, symbol: str) -> str:
         """Normalize a PyTorch symbol to URL path."""
@@ -25,42 +98,6 @@ class DocsService:
         # torch.tensor -> generated/torch.tensor.html
         return f"generated/{symbol}.html"
 
-    def _extract_signature(self, html: str, symbol: str) -> str | None:
-        """Extract function/class signature from HTML."""
-        # Look for the signature in dt.sig elements
-        patterns = [
-            rf'<dt[^>]*class="[^"]*sig[^"]*"[^>]*>.*?<span class="sig-name[^"]*">([^<]*{symbol.split(".")[-1]}[^<]*)</span>.*?</dt>',
-            rf'class="sig-prename[^"]*">[^<]*</span>\s*<span class="sig-name[^"]*">({symbol.split(".")[-1]})</span>\s*<span class="sig-paren">\(</span>([^)]*)<span class="sig-paren">\)</span>',
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, html, re.DOTALL | re.IGNORECASE)
-            if match:
-                # Clean up HTML tags
-                sig = re.sub(r"<[^>]+>", "", match.group(0))
-                sig = re.sub(r"\s+", " ", sig).strip()
-                return sig
-
-        return None
-
-    def _extract_description(self, html: str) -> str | None:
-        """Extract first paragraph of description from HTML."""
-        # Look for description in dd elements after the signature
-        pattern = r'<dd[^>]*>.*?<p>([^<]+(?:<[^>]+>[^<]*)*)</p>'
-        match = re.search(pattern, html, re.DOTALL)
-
-        if match:
-            desc = match.group(1)
-            # Clean up HTML tags
-            desc = re.sub(r"<[^>]+>", "", desc)
-            desc = re.sub(r"\s+", " ", desc).strip()
-            # Limit length
-            if len(desc) > 300:
-                desc = desc[:297] + "..."
-            return desc
-
-        return None
-
     async def get_doc_info(self, symbol: str) -> dict | None:
         """
         Get documentation info for a PyTorch symbol.
@@ -71,25 +108,80 @@ class DocsService:
         - description: First paragraph of description
         - url: Link to full documentation
         """
-        # Check cache first
-        if symbol in self._cache:
-            return self._cache[symbol]
+        # Check the offline index first, then the cache
+        indexed = await self.index.lookup(symbol)
+        cache_requests.inc(cache="docs_index", result="hit" if indexed else "miss")
+        if indexed:
+            return indexed
+
+        entry = await io_pool.run(self.cache.get, symbol)
+        if entry is not None:
+            if not entry.fresh:
+                # Serve the stale entry now and refresh it in the background
+                self._schedule_refresh(symbol)
+            return entry.value
+
+        # Concurrent misses for the same symbol share one remote fetch
+        return await self._inflight.do(symbol, lambda: self._fetch_remote(symbol))
+
+    async def get_doc_infos(self, symbols: list[str]) -> dict[str, dict | None]:
+        """Get documentation for several symbols concurrently."""
+        unique = list(dict.fromkeys(symbols))
+        results = await asyncio.gather(*(self.get_doc_info(s) for s in unique))
+        return dict(zip(unique, results))
+
+    async def prefetch(self, symbols: list[str], concurrency: int = 4) -> int:
+        """
+        Warm the index and cache for the given symbols.
 
+        Remote fetches are limited to ``concurrency`` at a time to stay
+        polite to the docs server. Returns how many symbols were found.
+        """
+        # Prefer the offline index over remote fetches for the warm-up
+        await self.index.ensure()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def warm(symbol: str) -> bool:
+            async with semaphore:
+                return await self.get_doc_info(symbol) is not None
+
+        results = await asyncio.gather(*(warm(s) for s in dict.fromkeys(symbols)))
+        return sum(results)
+
+    def _schedule_refresh(self, symbol: str) -> None:
+        """Refresh a stale symbol unless a fetch for it is already running."""
+        if symbol in self._inflight:
+            return
+        task = asyncio.ensure_future(
+            self._inflight.do(symbol, lambda: self._fetch_remote(symbol))
+        )
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _fetch_remote(self, symbol: str) -> dict | None:
+        """
+        Fetch and scrape the documentation page for a symbol.
+
+        Failures are cached too (with a shorter TTL) so a bad symbol
+        doesn't trigger a remote fetch on every request; a failed refresh
+        keeps the stale entry.
+        """
         url_path = self._normalize_symbol(symbol)
         full_url = f"{self.base_url}/{url_path}"
+        result = None
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(full_url)
-
-                if response.status_code != 200:
-                    return None
-
-                html = response.text
-
-                signature = self._extract_signature(html, symbol)
-                description = self._extract_description(html)
-
+            client = self._get_client()
+            async with client.stream("GET", full_url) as response:
+                if response.status_code == 200:
+                    signature, description = await self._extract_streaming(
+                        response, symbol
+                    )
+                else:
+                    # Drain the (small) error body so the connection is reused
+                    await response.aread()
+
+            if response.status_code == 200:
                 result = {
                     "symbol": symbol,
                     "signature": signature,
@@ -97,18 +189,41 @@ class DocsService:
                     "url": full_url,
                 }
 
-                # Cache the result
-                self._cache[symbol] = result
-
-                return result
-
         except Exception as e:
             print(f"Error fetching docs for {symbol}: {e}")
-            return None
 
-    def get_cached_symbols(self) -> list[str]:
+        try:
+            await io_pool.run(self.cache.set, symbol, result)
+        except Exception as e:
+            print(f"Error caching docs for {symbol}: {e}")
+
+        return result
+
+    async def _extract_streaming(
+        self, response: httpx.Response, symbol: str
+    ) -> tuple[str | None, str | None]:
+        """
+        Extract the signature and description while the page downloads.
+
+        Parsing runs in the I/O pool, one chunk at a time, and the download
+        stops as soon as both values are found.
+        """
+        extractor = DocsExtractor(symbol)
+        async for chunk in response.aiter_text(chunk_size=EXTRACT_CHUNK_SIZE):
+            await io_pool.run(extractor.feed, chunk)
+            if extractor.done:
+                break
+        return extractor.signature, extractor.description
+
+    async def get_cached_symbols(self) -> list[str]:
         """Get list of currently cached symbols."""
-        return list(self._cache.keys())
+        return await io_pool.run(self.cache.symbols)
+
+    async def get_cache_stats(self) -> dict:
+        """Get size, age and hit ratio of the docs cache."""
+        stats = await io_pool.run(self.cache.stats)
+        stats["index_symbols"] = len(self.index)
+        return stats
 
 
 # Singleton instance
@@ -0,0 +1,204 @@
+"""Persistent SQLite cache for remote documentation lookups."""
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from ..metrics import cache_requests
+
+
+@dataclass
+class CacheEntry:
+    """A cached lookup. ``value`` is None for a cached failure."""
+
+    symbol: str
+    value: dict | None
+    fetched_at: float
+    fresh: bool
+
+
+class DocsCache:
+    """
+    Documentation cache stored in SQLite, shared by every worker on a node.
+
+    Successful lookups stay fresh for ``ttl`` seconds and failed lookups
+    (negative entries) for ``negative_ttl`` seconds. Stale entries are still
+    returned, flagged as not fresh, so callers can serve them while they
+    refresh; entries older than ``max_stale`` are treated as missing. When
+    refreshing a stale entry fails, it is kept, and the next refresh is held
+    off for ``negative_ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: float,
+        negative_ttl: float,
+        max_stale: float,
+        max_entries: int = 5000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+        # Per-process counters for the hit ratio
+        self.hits = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            # WAL lets readers in other workers proceed while one writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS docs (
+                    symbol TEXT PRIMARY KEY,
+                    payload TEXT,
+                    fetched_at REAL NOT NULL,
+                    retry_after REAL
+                )
+                """
+            )
+            # Caches created before failed refreshes were backed off
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(docs)")}
+            if "retry_after" not in columns:
+                try:
+                    conn.execute("ALTER TABLE docs ADD COLUMN retry_after REAL")
+                except sqlite3.OperationalError:
+                    pass  # added by another worker meanwhile
+            conn.execute("CREATE INDEX IF NOT EXISTS docs_fetched_at ON docs (fetched_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, symbol: str) -> CacheEntry | None:
+        """Get an entry, or None if the symbol is not cached."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT payload, fetched_at, retry_after FROM docs WHERE symbol = ?", (symbol,)
+            ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            cache_requests.inc(cache="docs", result="miss")
+            return None
+
+        payload, fetched_at, retry_after = row
+        now = self._clock()
+        age = now - fetched_at
+        if age > self.max_stale:
+            self.misses += 1
+            cache_requests.inc(cache="docs", result="miss")
+            return None
+
+        value = json.loads(payload) if payload is not None else None
+        expired = age > (self.ttl if value is not None else self.negative_ttl)
+        # Not refreshed again right after a refresh failed
+        fresh = not expired or (retry_after is not None and now < retry_after)
+        if expired:
+            self.stale_hits += 1
+            cache_requests.inc(cache="docs", result="stale")
+        elif value is None:
+            self.negative_hits += 1
+            cache_requests.inc(cache="docs", result="negative")
+        else:
+            self.hits += 1
+            cache_requests.inc(cache="docs", result="hit")
+        return CacheEntry(symbol=symbol, value=value, fetched_at=fetched_at, fresh=fresh)
+
+    def set(self, symbol: str, value: dict | None) -> None:
+        """
+        Store a lookup result; pass None to cache a failure.
+
+        A failure doesn't replace an earlier successful lookup: that entry
+        is kept with its original age (so it still expires after
+        ``max_stale``), and isn't refreshed again for ``negative_ttl``.
+        """
+        with self._lock:
+            conn = self._connect()
+            if value is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO docs (symbol, payload, fetched_at) VALUES (?, ?, ?)",
+                    (symbol, json.dumps(value), self._clock()),
+                )
+            else:
+                now = self._clock()
+                conn.execute(
+                    """
+                    INSERT INTO docs (symbol, payload, fetched_at) VALUES (?, NULL, ?)
+                    ON CONFLICT (symbol) DO UPDATE SET
+                        fetched_at = CASE WHEN payload IS NULL THEN ? ELSE fetched_at END,
+                        retry_after = CASE WHEN payload IS NULL THEN NULL ELSE ? END
+                    """,
+                    (symbol, now, now, now + self.negative_ttl),
+                )
+            # Evict the oldest entries beyond the size limit
+            conn.execute(
+                """
+                DELETE FROM docs WHERE symbol IN (
+                    SELECT symbol FROM docs ORDER BY fetched_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+            conn.commit()
+
+    def symbols(self) -> list[str]:
+        """Symbols with a cached successful lookup."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT symbol FROM docs WHERE payload IS NOT NULL ORDER BY symbol"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self) -> dict:
+        """Size, age and hit ratio of the cache."""
+        with self._lock:
+            conn = self._connect()
+            entries, negative, oldest, newest = conn.execute(
+                """
+                SELECT COUNT(*), COUNT(*) - COUNT(payload), MIN(fetched_at), MAX(fetched_at)
+                FROM docs
+                """
+            ).fetchone()
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+
+        now = self._clock()
+        lookups = self.hits + self.stale_hits + self.negative_hits + self.misses
+        return {
+            "entries": entries,
+            "negative_entries": negative,
+            "size_bytes": page_count * page_size,
+            "oldest_age_seconds": round(now - oldest, 1) if oldest is not None else None,
+            "newest_age_seconds": round(now - newest, 1) if newest is not None else None,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": round(
+                (self.hits + self.stale_hits + self.negative_hits) / lookups, 4
+            )
+            if lookups
+            else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
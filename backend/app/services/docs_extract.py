@@ -0,0 +1,212 @@
+"""
+Incremental extraction of signatures and descriptions from PyTorch docs pages.
+
+Sphinx renders an API entry as::
+
+    <dt class="sig sig-object py" id="torch.nn.Linear">
+      ... <span class="sig-name descname">Linear</span> ( ... ) ...
+    </dt>
+    <dd><p>First paragraph of the description.</p> ...</dd>
+
+The extractor is an ``HTMLParser`` fed in chunks, so its cost is linear in
+the bytes scanned, and it stops as soon as the first matching signature
+and its first paragraph are found instead of reading the whole page.
+"""
+import re
+from html.parser import HTMLParser
+
+MAX_DESCRIPTION_LENGTH = 300
+# Characters handed to the HTML tokenizer at a time
+PARSE_STEP = 4096
+
+# Links Sphinx appends to signatures ("#" anchors, "[source]")
+_SKIPPED_CLASSES = ("headerlink", "viewcode-link")
+_VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "wbr", "col", "area", "source"}
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class DocsExtractor(HTMLParser):
+    """Streaming extractor for the first signature and description of a symbol."""
+
+    def __init__(self, symbol: str):
+        super().__init__(convert_charrefs=True)
+        self.name = symbol.split(".")[-1]
+        self.signature: str | None = None
+        self.description: str | None = None
+        self.bytes_fed = 0
+
+        self._in_sig = False
+        self._sig_depth = 0
+        self._sig_parts: list[str] = []
+        self._sig_name_depth = 0
+        self._sig_name_parts: list[str] = []
+        self._skip_depth = 0
+        self._awaiting_dd = False
+        self._dd_depth = 0
+        self._in_p = False
+        self._p_parts: list[str] = []
+        self._pending = ""
+
+    @property
+    def done(self) -> bool:
+        """Whether both the signature and the description were found."""
+        return self.signature is not None and self.description is not None
+
+    def feed(self, data: str) -> None:
+        """Feed the next chunk of the page; no-op once extraction is done."""
+        if self.done:
+            return
+        self.bytes_fed += len(data)
+
+        if not self._seeking:
+            self._parse(data)
+            return
+
+        # Until the signature is found, jump between '<dt class="sig ...">'
+        # elements with plain substring searches and only hand those to the
+        # parser, instead of tokenizing navigation and unrelated entries.
+        data = self._pending + data
+        self._pending = ""
+        pos = 0
+        while self._seeking:
+            start = data.find("<dt", pos)
+            if start == -1:
+                # Keep a possible "<d" split across chunks
+                self._pending = data[-2:]
+                return
+            end = data.find(">", start)
+            if end == -1:
+                self._pending = data[start:]
+                return
+            if "sig" not in data[start:end]:
+                pos = end
+                continue
+
+            self.reset()
+            close = data.find("</dt>", end)
+            if close == -1:
+                # The signature continues in the next chunk
+                self._parse(data[start:])
+                return
+            super().feed(data[start : close + 5])
+            pos = close + 5
+
+        self._parse(data[pos:])
+
+    def _parse(self, data: str) -> None:
+        """Parse in small steps so the rest of a large chunk is skipped once done."""
+        for start in range(0, len(data), PARSE_STEP):
+            super().feed(data[start : start + PARSE_STEP])
+            if self.done:
+                return
+
+    @property
+    def _seeking(self) -> bool:
+        return self.signature is None and not self._in_sig
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if self.done:
+            return
+        classes = (dict(attrs).get("class") or "").split()
+        void = tag in _VOID_TAGS
+
+        if self._in_sig:
+            if not void:
+                self._sig_depth += 1
+                if self._skip_depth:
+                    self._skip_depth += 1
+                elif any(c in _SKIPPED_CLASSES for c in classes):
+                    self._skip_depth = 1
+                if self._sig_name_depth:
+                    self._sig_name_depth += 1
+                elif tag == "span" and "sig-name" in classes:
+                    self._sig_name_depth = 1
+            return
+
+        if self.signature is None and tag == "dt" and "sig" in classes:
+            self._in_sig = True
+            self._sig_depth = 1
+            self._sig_parts = []
+            self._sig_name_parts = []
+            return
+
+        if self._awaiting_dd and tag == "dd":
+            self._awaiting_dd = False
+            self._dd_depth = 1
+            return
+
+        if self._dd_depth and not void:
+            self._dd_depth += 1
+            if tag == "p" and not self._in_p:
+                self._in_p = True
+                self._p_parts = []
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        # Self-closing tags (<br/>) have no content and no matching end tag
+        pass
+
+    def handle_endtag(self, tag: str) -> None:
+        if self.done:
+            return
+
+        if self._in_sig:
+            self._sig_depth -= 1
+            if self._skip_depth:
+                self._skip_depth -= 1
+            if self._sig_name_depth:
+                self._sig_name_depth -= 1
+            if self._sig_depth == 0 or tag == "dt":
+                self._finish_signature()
+            return
+
+        if self._dd_depth:
+            if tag == "p" and self._in_p:
+                self._in_p = False
+                description = _clean("".join(self._p_parts))
+                if description:
+                    if len(description) > MAX_DESCRIPTION_LENGTH:
+                        description = description[: MAX_DESCRIPTION_LENGTH - 3] + "..."
+                    self.description = description
+                    self._dd_depth = 0
+                    return
+            self._dd_depth -= 1
+            if tag == "dd":
+                # The entry had no paragraph
+                self._dd_depth = 0
+
+    def handle_data(self, data: str) -> None:
+        if self._in_sig:
+            if not self._skip_depth:
+                self._sig_parts.append(data)
+                if self._sig_name_depth:
+                    self._sig_name_parts.append(data)
+        elif self._in_p:
+            self._p_parts.append(data)
+
+    def _finish_signature(self) -> None:
+        self._in_sig = False
+        if self.name in "".join(self._sig_name_parts):
+            self.signature = _clean("".join(self._sig_parts))
+            # The description is the first paragraph of this entry's <dd>
+            self._awaiting_dd = True
+
+
+def extract_doc_summary(
+    html: str, symbol: str, chunk_size: int = 16384
+) -> tuple[str | None, str | None]:
+    """
+    Extract (signature, description) for ``symbol`` from a docs page.
+
+    The page is scanned in ``chunk_size`` pieces and scanning stops as soon
+    as both values are found.
+    """
+    extractor = DocsExtractor(symbol)
+    for start in range(0, len(html), chunk_size):
+        extractor.feed(html[start : start + chunk_size])
+        if extractor.done:
+            break
+    extractor.close()
+    return extractor.signature, extractor.description
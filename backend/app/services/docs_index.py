@@ -0,0 +1,310 @@
+"""
+Offline PyTorch documentation index.
+
+The index is built by introspecting the installed ``torch`` package in a
+separate process (importing torch into the API process would cost seconds
+and hundreds of MB), persisted as JSON and loaded lazily on first lookup.
+
+Build it ahead of time with::
+
+    python -m app.services.docs_index
+"""
+import argparse
+import asyncio
+import importlib
+import inspect
+import json
+import re
+import sys
+from importlib import metadata
+from pathlib import Path
+
+from ..concurrency import io_pool
+from ..config import get_settings
+
+# Namespaces whose public members are indexed
+INDEXED_MODULES = [
+    "torch",
+    "torch.nn",
+    "torch.nn.functional",
+    "torch.nn.init",
+    "torch.nn.utils",
+    "torch.optim",
+    "torch.optim.lr_scheduler",
+    "torch.utils.data",
+    "torch.autograd",
+    "torch.linalg",
+    "torch.fft",
+    "torch.jit",
+    "torch.onnx",
+    "torch.export",
+    "torch.profiler",
+    "torch.distributions",
+]
+
+# Classes whose public methods and attributes are indexed too
+INDEXED_CLASSES = [
+    "torch.Tensor",
+    "torch.nn.Module",
+    "torch.optim.Optimizer",
+    "torch.utils.data.Dataset",
+    "torch.utils.data.DataLoader",
+]
+
+MAX_DESCRIPTION_LENGTH = 300
+
+_RST_ROLE = re.compile(r":[\w:]+:`~?([^`<]*?)(?:\s*<[^>]*>)?`")
+_DOC_SIGNATURE = re.compile(r"^\s*(\w+)\((.*)\)(\s*->\s*.+)?\s*$")
+
+
+def _clean_rst(text: str) -> str:
+    """Turn reStructuredText markup into plain text."""
+    text = _RST_ROLE.sub(lambda m: m.group(1), text)
+    text = text.replace("`", "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _split_docstring(doc: str, name: str) -> tuple[str | None, str | None]:
+    """
+    Split a docstring into (signature line, first paragraph).
+
+    Many torch builtins start their docstring with a signature line such
+    as ``tensor(data, *, dtype=None) -> Tensor``.
+    """
+    paragraphs = [p for p in re.split(r"\n\s*\n", inspect.cleandoc(doc)) if p.strip()]
+    signature = None
+    if paragraphs:
+        first_line, _, rest = paragraphs[0].partition("\n")
+        match = _DOC_SIGNATURE.match(first_line)
+        # Some classes document their constructor as "__init__(...)"
+        if match and match.group(1) in (name, "__init__"):
+            signature = f"{name}({match.group(2)}){match.group(3) or ''}"
+            paragraphs[0] = rest
+            paragraphs = [p for p in paragraphs if p.strip()]
+
+    for paragraph in paragraphs:
+        # Skip directives like ".. warning::" and section headers
+        if paragraph.lstrip().startswith(".."):
+            continue
+        description = _clean_rst(paragraph)
+        if len(description) > MAX_DESCRIPTION_LENGTH:
+            description = description[: MAX_DESCRIPTION_LENGTH - 3] + "..."
+        return signature, description or None
+    return signature, None
+
+
+def _inspect_signature(obj) -> str | None:
+    """Signature from ``inspect`` with annotations dropped for readability."""
+    try:
+        sig = inspect.signature(obj)
+    except (TypeError, ValueError):
+        return None
+    params = [p.replace(annotation=inspect.Parameter.empty) for p in sig.parameters.values()]
+    if inspect.isclass(obj) and params and params[0].name == "self":
+        params = params[1:]
+    sig = sig.replace(parameters=params, return_annotation=inspect.Signature.empty)
+    return str(sig)
+
+
+def describe(symbol: str, obj) -> dict | None:
+    """Build the index entry for one object, or None if it has no docs."""
+    doc = inspect.getdoc(obj) if not isinstance(obj, property) else obj.__doc__
+    name = symbol.rsplit(".", 1)[-1]
+    doc_signature, description = _split_docstring(doc or "", name)
+
+    if doc_signature:
+        signature = f"{symbol.rsplit('.', 1)[0]}.{doc_signature}"
+    else:
+        params = _inspect_signature(obj) if callable(obj) else None
+        signature = f"{symbol}{params}" if params is not None else None
+    if inspect.isclass(obj) and signature:
+        signature = f"class {signature}"
+
+    if not signature and not description:
+        return None
+    return {"signature": signature, "description": description}
+
+
+def _public_members(obj) -> list[str]:
+    names = getattr(obj, "__all__", None) if inspect.ismodule(obj) else None
+    if names is None:
+        names = dir(obj)
+    return sorted({n for n in names if not n.startswith("_")})
+
+
+def build_index(
+    module_names: list[str] = INDEXED_MODULES,
+    class_names: list[str] = INDEXED_CLASSES,
+) -> dict[str, dict]:
+    """Introspect the given modules and classes into ``{symbol: entry}``."""
+    entries: dict[str, dict] = {}
+
+    for module_name in module_names:
+        try:
+            module = importlib.import_module(module_name)
+        except Exception:
+            continue
+        for name in _public_members(module):
+            try:
+                obj = getattr(module, name)
+            except Exception:
+                continue
+            if inspect.ismodule(obj) or not (callable(obj) or inspect.isclass(obj)):
+                continue
+            symbol = f"{module_name}.{name}"
+            entry = describe(symbol, obj)
+            if entry:
+                entries[symbol] = entry
+
+    for class_name in class_names:
+        module_name, _, attr = class_name.rpartition(".")
+        try:
+            cls = getattr(importlib.import_module(module_name), attr)
+        except Exception:
+            continue
+        entry = describe(class_name, cls)
+        if entry:
+            entries[class_name] = entry
+        for name in _public_members(cls):
+            try:
+                obj = inspect.getattr_static(cls, name)
+            except AttributeError:
+                continue
+            if isinstance(obj, (staticmethod, classmethod)):
+                obj = obj.__func__
+            symbol = f"{class_name}.{name}"
+            entry = describe(symbol, obj)
+            if entry:
+                entries[symbol] = entry
+
+    return entries
+
+
+def torch_version() -> str | None:
+    """Installed torch version, read from package metadata without importing it."""
+    try:
+        return metadata.version("torch")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def default_index_path() -> Path:
+    """Index file for the installed torch version."""
+    return get_settings().cache_dir / f"docs-index-{torch_version() or 'none'}.json"
+
+
+class DocsIndex:
+    """Lazily loaded offline index of PyTorch symbols."""
+
+    def __init__(self, path: Path, base_url: str):
+        self.path = path
+        self.base_url = base_url
+        self._entries: dict[str, dict] | None = None
+        self._build_task: asyncio.Task | None = None
+        self._build_failed = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._entries is not None
+
+    def __len__(self) -> int:
+        return len(self._entries or {})
+
+    def load(self) -> bool:
+        """Load the index from disk. Returns False if it does not exist yet."""
+        if self._entries is not None:
+            return True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self._entries = data.get("symbols", {})
+        return True
+
+    def get(self, symbol: str) -> dict | None:
+        """Look up a symbol in the loaded index."""
+        if self._entries is None:
+            return None
+        entry = self._entries.get(symbol)
+        if entry is None:
+            return None
+        return {
+            "symbol": symbol,
+            "signature": entry["signature"],
+            "description": entry["description"],
+            "url": f"{self.base_url}/generated/{symbol}.html",
+        }
+
+    async def lookup(self, symbol: str) -> dict | None:
+        """
+        Look up a symbol, loading the index on first use.
+
+        If no index file exists yet, a build is started in the background
+        and None is returned until it finishes.
+        """
+        if self._entries is None:
+            if not await io_pool.run(self.load):
+                self._schedule_build()
+                return None
+        return self.get(symbol)
+
+    async def ensure(self) -> bool:
+        """Load the index, building it first (and waiting) if needed."""
+        if await io_pool.run(self.load):
+            return True
+        self._schedule_build()
+        if self._build_task is None:
+            return False
+        return await asyncio.shield(self._build_task)
+
+    def _schedule_build(self) -> None:
+        if self._build_task is None and not self._build_failed and torch_version():
+            self._build_task = asyncio.get_running_loop().create_task(self.build())
+
+    async def build(self) -> bool:
+        """Build the index in a subprocess and load it."""
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-m",
+            "app.services.docs_index",
+            "--output",
+            str(self.path),
+            cwd=Path(__file__).parent.parent.parent,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await process.communicate()
+        if process.returncode != 0:
+            self._build_failed = True
+            print(f"Error building docs index: {stderr.decode(errors='replace')[-500:]}")
+            return False
+        return await io_pool.run(self.load)
+
+
+def write_index(path: Path) -> int:
+    """Build the index for the installed torch and write it to ``path``."""
+    import torch
+
+    entries = build_index()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"torch_version": torch.__version__, "symbols": entries}, f)
+    tmp_path.replace(path)
+    return len(entries)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build the offline PyTorch docs index")
+    parser.add_argument("--output", type=Path, default=None, help="Index file to write")
+    args = parser.parse_args()
+
+    path = args.output or default_index_path()
+    count = write_index(path)
+    print(f"Indexed {count} symbols into {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
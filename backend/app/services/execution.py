@@ -1,11 +1,68 @@
 """Code execution service for running Python code with PyTorch."""
+import asyncio
+import hashlib
+import json
+import platform
+import re
 import subprocess
-import tempfile
-import time
 import base64
+from importlib import metadata
 from pathlib import Path
 
-from ..models import CodeExecutionRequest, CodeExecutionResponse
+from cachetools import TTLCache
+
+from ..concurrency import SingleFlight, current_queue_wait, execution_pool, io_pool
+from ..config import get_settings
+from ..metrics import cache_requests, execution_dispatches, execution_timeouts
+from ..models import (
+    CodeExecutionRequest,
+    CodeExecutionResponse,
+    CompileCacheStats,
+    ExecutionProfile,
+)
+from . import phases
+from .artifacts import default_store_path
+from .blobs import get_blob_store
+from .compile_cache import get_compile_cache
+from .dispatcher import get_dispatcher
+from .jobs import CANCELLED_MESSAGE, JobCancelled, Run, get_job_registry, new_job_id
+from .preflight import preflight
+from .sandboxes import SANDBOX_DIR, get_sandbox_pool
+
+# Followed by a JSON object with the captured figures and the profile
+EXTRAS_MARKER = "__EXTRAS__"
+
+# Random draws and seeding calls: code drawing random numbers without
+# seeding prints something different on every run, so it isn't shared
+RANDOM_CALL = re.compile(
+    r"\b(?:torch\.(?:rand\w*|normal|bernoulli|multinomial|poisson)|(?:np|numpy)\.random\."
+    r"|random\.\w+|nn\.init\.)|\.(?:normal_|uniform_|random_|bernoulli_)\("
+)
+SEED_CALL = re.compile(r"\b(?:manual_seed|seed)\s*\(")
+
+
+def runtime_version() -> str:
+    """Python and torch versions, without importing torch in the API process."""
+    try:
+        torch_version = metadata.version("torch")
+    except metadata.PackageNotFoundError:
+        torch_version = "none"
+    return f"python-{platform.python_version()}/torch-{torch_version}"
+
+
+def is_nondeterministic(code: str) -> bool:
+    """Whether the code visibly draws random numbers without seeding first."""
+    return bool(RANDOM_CALL.search(code)) and not SEED_CALL.search(code)
+
+
+def sandbox_preamble(artifacts_dir: Path) -> str:
+    """Script lines making app/sandbox importable and preloading ``academy``."""
+    return (
+        "import sys\n"
+        f"sys.path.insert(0, {str(SANDBOX_DIR)!r})\n"
+        "import academy\n"
+        f"academy.use_store({str(artifacts_dir)!r})\n"
+    )
 
 
 class ExecutionService:
@@ -13,40 +70,211 @@ class ExecutionService:
 
     def __init__(self, max_timeout: int = 30):
         self.max_timeout = max_timeout
+        settings = get_settings()
+        self.max_output_chars = settings.execution_max_output_chars
+        self.startup_grace = settings.execution_startup_grace
+        self.profile_top_n = settings.execution_profile_top_n
+        self.profile_max_events = settings.execution_profile_max_events
+        self.artifacts_dir = default_store_path()
+        self.max_figures = settings.execution_max_figures
+        self.max_figure_bytes = settings.execution_max_figure_bytes
+        self.blob_store = get_blob_store()
+        self.compile_cache = get_compile_cache()
+        self.sandboxes = get_sandbox_pool()
+        self.preflight = settings.execution_preflight
+        self.jobs = get_job_registry()
+
+        # Identical requests arriving together share one execution; the
+        # result is kept briefly for requests arriving just after it
+        self.runtime_version = runtime_version()
+        self._inflight = SingleFlight()
+        # Run of each shared execution in flight, cancelled with its last job
+        self._shared_runs: dict[str, Run] = {}
+        self._recent: TTLCache = TTLCache(
+            maxsize=settings.execution_share_max_entries, ttl=settings.execution_share_ttl
+        )
+
+    def _share_key(self, request: CodeExecutionRequest) -> str | None:
+        """Key of requests that get the same result, or None if it can't be shared."""
+        if not request.shared or is_nondeterministic(request.code):
+            return None
+        payload = request.model_dump(
+            mode="json", exclude={"shared", "job_id", "client_id", "cell_id"}
+        )
+        payload["timeout"] = min(request.timeout, self.max_timeout)
+        payload["runtime"] = self.runtime_version
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    async def aexecute(self, request: CodeExecutionRequest) -> CodeExecutionResponse:
+        """
+        Async version of :meth:`execute`, run as a cancellable job (see
+        ``jobs.py``). Concurrent identical requests are coalesced into one
+        execution, whose result is reused for ``execution_share_ttl`` seconds.
+        """
+        job_id = request.job_id or new_job_id()
+        # Parsing and walking large submissions is CPU-bound
+        rejected = await io_pool.run(self._preflight, request)
+        if rejected is not None:
+            rejected.job_id = job_id
+            return rejected
 
-    def execute(self, request: CodeExecutionRequest) -> CodeExecutionResponse:
-        """Execute Python code and return results."""
+        key = self._share_key(request)
+        if key is not None:
+            response = self._recent.get(key)
+            if response is not None:
+                cache_requests.inc(cache="execution", result="hit")
+                return response.model_copy(update={"job_id": job_id})
+            if key in self._shared_runs and self._shared_runs[key].cancelled:
+                # Every request waiting for that execution was cancelled
+                key = None
+
+        if key is None:
+            run = Run()
+        else:
+            run = self._shared_runs.get(key)
+            cache_requests.inc(cache="execution", result="coalesced" if run else "miss")
+            if run is None:
+                run = self._shared_runs[key] = Run()
+
+        with self.jobs.track(
+            job_id, "execute", run, self._supersede_key(request), request.client_id
+        ) as job:
+            if key is None:
+                response = await self._adispatch(request, run)
+            else:
+                shared = asyncio.ensure_future(
+                    self._inflight.do(key, lambda: self._adispatch_shared(key, request, run))
+                )
+                # Stop waiting when this job is cancelled, even if others keep the run going
+                loop = asyncio.get_running_loop()
+                job.on_cancel = lambda: loop.call_soon_threadsafe(shared.cancel)
+                try:
+                    response = await shared
+                except asyncio.CancelledError:
+                    if not job.cancelled:
+                        raise
+        if job.cancelled:
+            # The run may have gone on for other requests sharing it
+            return CodeExecutionResponse(
+                success=False, cancelled=True, error=CANCELLED_MESSAGE, job_id=job_id
+            )
+        return response.model_copy(update={"job_id": job_id})
+
+    def _supersede_key(self, request: CodeExecutionRequest) -> tuple | None:
+        """Jobs with the same key replace each other: one client re-running a cell."""
+        if request.client_id is None or request.cell_id is None:
+            return None
+        return ("execute", request.client_id, request.cell_id)
+
+    async def _adispatch_shared(
+        self, key: str, request: CodeExecutionRequest, run: Run
+    ) -> CodeExecutionResponse:
+        try:
+            response = await self._adispatch(request, run)
+        finally:
+            del self._shared_runs[key]
+        if not response.cancelled:
+            self._recent[key] = response
+        return response
+
+    async def _adispatch(self, request: CodeExecutionRequest, run: Run) -> CodeExecutionResponse:
+        """
+        Run on a remote worker agent when one can take the job, otherwise
+        in the local execution pool.
+        """
+        remote = await get_dispatcher().aexecute(request, run)
+        if remote is None:
+            execution_dispatches.inc(target="local", outcome="ok")
+            return await execution_pool.run(self._execute_checked, request, run)
+        response, figures = remote
+        response.figures = await io_pool.run(self.blob_store.store_figures, figures)
+        return response
+
+    def execute(self, request: CodeExecutionRequest, run: Run | None = None) -> CodeExecutionResponse:
+        """Execute Python code and return results; cancelling ``run`` kills it."""
+        rejected = self._preflight(request)
+        if rejected is not None:
+            return rejected
+        return self._execute_checked(request, run)
+
+    def _execute_checked(
+        self, request: CodeExecutionRequest, run: Run | None = None
+    ) -> CodeExecutionResponse:
+        """:meth:`execute` for code that already passed the preflight."""
+        response, figures = self.run_job(request, run)
+        response.figures = self.blob_store.store_figures(figures)
+        return response
+
+    def _preflight(self, request: CodeExecutionRequest) -> CodeExecutionResponse | None:
+        """Response for code answered without running it (empty or rejected)."""
+        if not self.preflight:
+            return None
+        result = preflight(request.code, min(request.timeout, self.max_timeout), "execute")
+        if result.ok:
+            return None
+        if result.empty:
+            return CodeExecutionResponse(success=True)
+        return CodeExecutionResponse(
+            success=False,
+            stderr=result.message,
+            error=result.message,
+            diagnostics=result.diagnostics,
+        )
+
+    def run_job(
+        self, request: CodeExecutionRequest, run: Run | None = None
+    ) -> tuple[CodeExecutionResponse, list[dict]]:
+        """
+        Execute Python code, leaving the captured figures encoded instead of
+        storing them (worker agents send them back to the API to store).
+        """
+        # Time budget for the user code; startup and imports don't count
         timeout = min(request.timeout, self.max_timeout)
-        start_time = time.time()
+        timer = phases.PhaseTimer("execute", current_queue_wait())
 
         # Encode user code as base64 to avoid escaping issues
         code_b64 = base64.b64encode(request.code.encode()).decode()
 
-        wrapper_code = f'''
-import sys
+        if request.profile:
+            profiler = (
+                "from _profiling import Profiler\n"
+                f"_profiler = Profiler({self.profile_top_n}, {self.profile_max_events})"
+            )
+        else:
+            profiler = "_profiler = None"
+
+        wrapper_code = phases.PROLOGUE + f'''
 import io
 import base64
-from contextlib import redirect_stdout, redirect_stderr
+import json
+from contextlib import nullcontext, redirect_stdout, redirect_stderr
 
 # Pre-import common libraries
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import numpy as np
+{sandbox_preamble(self.artifacts_dir)}import _figures
+_figures.setup()
 
 _stdout_buffer = io.StringIO()
 _stderr_buffer = io.StringIO()
 
 # Decode user code
 _user_code = base64.b64decode("{code_b64}").decode()
+{profiler}
 
 try:
-    with redirect_stdout(_stdout_buffer), redirect_stderr(_stderr_buffer):
-        exec(_user_code)
+    with redirect_stdout(_stdout_buffer), redirect_stderr(_stderr_buffer), _profiler or nullcontext():
+        # Profiler startup is counted with the imports, not the user code
+{phases.mark("imported", "        ")}{phases.start_budget(timeout, "        ")}        exec(_user_code)
+except _BudgetExceeded:
+    pass
 except Exception as e:
     import traceback
     _stderr_buffer.write(traceback.format_exc())
-
+finally:
+{phases.stop_budget("    ")}{phases.mark("user_code_done")}
 _stdout = _stdout_buffer.getvalue()
 _stderr = _stderr_buffer.getvalue()
 
@@ -56,75 +284,148 @@ print("__STDOUT_END__", end="")
 print("__STDERR_START__", end="")
 print(_stderr, end="")
 print("__STDERR_END__", end="")
-'''
 
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".py", delete=False, encoding="utf-8"
-        ) as f:
-            f.write(wrapper_code)
-            script_path = f.name
+_extras = {{}}
+try:
+    _extras["figures"] = _figures.collect(
+        {request.figure_format!r}, {self.max_figures}, {self.max_figure_bytes}
+    )
+except Exception as e:
+    _extras["figure_error"] = f"{{type(e).__name__}}: {{e}}"
+if _profiler is not None:
+    _extras["profile"] = _profiler.summary()
+import _compilation
+_extras["compile_cache"] = _compilation.cache_stats()
+print("{EXTRAS_MARKER}" + json.dumps(_extras), end="")
+''' + phases.EPILOGUE
 
         try:
-            result = subprocess.run(
-                ["python", script_path],
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                cwd=tempfile.gettempdir(),
-            )
+            timer.spawning()
+            result = self.sandboxes.run(wrapper_code, timeout + self.startup_grace, run)
+            timer.returned()
 
-            execution_time = time.time() - start_time
-            output = result.stdout
+            output, marks = phases.split_timings(result.stdout)
+            timer.add_marks(marks)
+            output, extras = self._parse_extras(output)
+            profile = (
+                ExecutionProfile.model_validate(extras["profile"]) if "profile" in extras else None
+            )
+            figures = extras.get("figures", [])
+            compile_cache = self._record_compile_cache(extras.get("compile_cache"))
 
             # Parse stdout and stderr from output
-            stdout = ""
-            stderr = ""
-
-            if "__STDOUT_START__" in output and "__STDOUT_END__" in output:
-                start = output.index("__STDOUT_START__") + len("__STDOUT_START__")
-                end = output.index("__STDOUT_END__")
-                stdout = output[start:end]
-
-            if "__STDERR_START__" in output and "__STDERR_END__" in output:
-                start = output.index("__STDERR_START__") + len("__STDERR_START__")
-                end = output.index("__STDERR_END__")
-                stderr = output[start:end]
+            stdout, stderr = self._parse_output(output)
 
             # Add any subprocess stderr
             if result.stderr:
                 stderr = result.stderr + stderr
+            if "figure_error" in extras:
+                stderr += f"Could not render figures: {extras['figure_error']}\n"
+
+            stdout = phases.truncate_output(stdout, self.max_output_chars, "execute")
+            stderr = phases.truncate_output(stderr, self.max_output_chars, "execute")
+            timer.parsed()
+            timing = timer.record()
 
+            if timer.timed_out:
+                execution_timeouts.inc(kind="execute")
+                response = CodeExecutionResponse(
+                    success=False,
+                    stdout=stdout,
+                    stderr=stderr,
+                    error=f"Code execution timed out after {timeout} seconds",
+                    execution_time=timer.elapsed,
+                    timing=timing,
+                    profile=profile,
+                    compile_cache=compile_cache,
+                )
             # Check for errors
-            if result.returncode != 0 or stderr.strip():
-                return CodeExecutionResponse(
+            elif result.returncode != 0 or stderr.strip():
+                response = CodeExecutionResponse(
                     success=result.returncode == 0 and not stderr.strip(),
                     stdout=stdout,
                     stderr=stderr,
-                    execution_time=execution_time,
+                    execution_time=timer.elapsed,
                     error=stderr if stderr.strip() else None,
+                    timing=timing,
+                    profile=profile,
+                    compile_cache=compile_cache,
                 )
-
-            return CodeExecutionResponse(
-                success=True,
-                stdout=stdout,
-                stderr=stderr,
-                execution_time=execution_time,
-            )
+            else:
+                response = CodeExecutionResponse(
+                    success=True,
+                    stdout=stdout,
+                    stderr=stderr,
+                    execution_time=timer.elapsed,
+                    timing=timing,
+                    profile=profile,
+                    compile_cache=compile_cache,
+                )
+            return response, figures
 
         except subprocess.TimeoutExpired:
+            # The process didn't even get through startup and the user code in time
+            timer.returned()
+            execution_timeouts.inc(kind="execute")
             return CodeExecutionResponse(
                 success=False,
                 error=f"Code execution timed out after {timeout} seconds",
-                execution_time=timeout,
-            )
+                execution_time=timer.elapsed,
+                timing=timer.record(),
+            ), []
+        except JobCancelled:
+            timer.returned()
+            return CodeExecutionResponse(
+                success=False,
+                cancelled=True,
+                error=CANCELLED_MESSAGE,
+                execution_time=timer.elapsed,
+            ), []
         except Exception as e:
             return CodeExecutionResponse(
                 success=False,
                 error=f"Execution error: {str(e)}",
-                execution_time=time.time() - start_time,
-            )
-        finally:
-            Path(script_path).unlink(missing_ok=True)
+                execution_time=timer.elapsed,
+            ), []
+
+    def _record_compile_cache(self, stats: dict | None) -> CompileCacheStats | None:
+        """Count torch.compile cache lookups; trim the cache after new entries."""
+        if stats is None:
+            return None
+        cache_requests.inc(stats["hits"], cache="compile", result="hit")
+        cache_requests.inc(stats["misses"], cache="compile", result="miss")
+        if stats["misses"]:
+            self.compile_cache.trim()
+        return CompileCacheStats.model_validate(stats)
+
+    def _parse_extras(self, output: str) -> tuple[str, dict]:
+        """Remove the figures and profile from the wrapper output and parse them."""
+        index = output.rfind(EXTRAS_MARKER)
+        if index == -1:
+            return output, {}
+        try:
+            extras = json.loads(output[index + len(EXTRAS_MARKER):])
+        except ValueError as e:
+            print(f"Error parsing execution extras: {e}")
+            extras = {}
+        return output[:index], extras
+
+    def _parse_output(self, output: str) -> tuple[str, str]:
+        """Split the wrapper output into user stdout and stderr."""
+        stdout = ""
+        stderr = ""
+
+        if "__STDOUT_START__" in output and "__STDOUT_END__" in output:
+            start = output.index("__STDOUT_START__") + len("__STDOUT_START__")
+            end = output.index("__STDOUT_END__")
+            stdout = output[start:end]
+
+        if "__STDERR_START__" in output and "__STDERR_END__" in output:
+            start = output.index("__STDERR_START__") + len("__STDERR_START__")
+            end = output.index("__STDERR_END__")
+            stderr = output[start:end]
+
+        return stdout, stderr
 
 
 _execution_service: ExecutionService | None = None
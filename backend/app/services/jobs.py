@@ -0,0 +1,230 @@
+"""
+Cancellation of running executions and validations.
+
+Every request to /api/execute and /api/validate is a job with an id
+(sent by the client or generated), returned in the response. A job is
+cancelled when:
+
+- its client disconnects before the response is sent;
+- the client asks for it (``POST /api/jobs/{job_id}/cancel``);
+- the same client starts another job for the same cell or exercise,
+  which supersedes it (a learner pressing Run again).
+
+Cancelling kills the sandbox's whole process tree (DataLoader workers
+included), so its execution slot is free again right away instead of
+when the code would have finished or timed out.
+
+Job ids belong to the client that sent them: a job started with a
+``client_id`` can only be cancelled or replaced with the same one, so
+knowing another client's job id is not enough to stop its runs.
+
+Identical executions can share one sandbox run (see
+``ExecutionService.aexecute``); the run is only killed once every job
+waiting for it was cancelled.
+"""
+import asyncio
+import threading
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import Awaitable, Callable, Hashable
+
+from ..metrics import execution_cancellations
+
+# How often the connection of a waiting client is checked
+DISCONNECT_POLL_INTERVAL = 0.25  # seconds
+CANCELLED_MESSAGE = "Execution cancelled"
+
+
+class JobCancelled(Exception):
+    """The run was cancelled before or while the code ran."""
+
+
+class Run:
+    """
+    One run of code in a sandbox (or on a remote worker), which may be
+    cancelled from any thread while it is queued or running.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kill: Callable[[], None] | None = None
+        self.cancelled = False
+        # Jobs waiting for this run (changed by the JobRegistry)
+        self.holders = 0
+
+    def bind(self, kill: Callable[[], None]) -> bool:
+        """
+        Set how to stop the run once it started. Returns False if it was
+        cancelled already, in which case the caller stops it itself.
+        """
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._kill = kill
+            return True
+
+    def unbind(self) -> None:
+        """The run finished; there is nothing left to kill."""
+        with self._lock:
+            self._kill = None
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            kill, self._kill = self._kill, None
+        if kill is not None:
+            kill()
+
+
+class Job:
+    """A request waiting for a run."""
+
+    def __init__(
+        self,
+        job_id: str,
+        kind: str,
+        run: Run,
+        supersede_key: Hashable | None,
+        client_id: str | None = None,
+    ):
+        self.id = job_id
+        self.client_id = client_id
+        self.kind = kind
+        self.run = run
+        self.supersede_key = supersede_key
+        self.cancelled = False
+        self.done = False  # closed or cancelled
+        # Called (in the cancelling thread) when the job is cancelled
+        self.on_cancel: Callable[[], None] | None = None
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+class JobRegistry:
+    """The jobs in progress, by id and by the cell or exercise they run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # By (client_id, job_id)
+        self._jobs: dict[tuple[str | None, str], Job] = {}
+        self._latest: dict[Hashable, Job] = {}
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __contains__(self, job_id: str) -> bool:
+        """Whether a job with this id is in progress, for any client."""
+        return any(job.id == job_id for job in list(self._jobs.values()))
+
+    def open(
+        self,
+        job_id: str | None,
+        kind: str,
+        run: Run,
+        supersede_key: Hashable | None = None,
+        client_id: str | None = None,
+    ) -> Job:
+        """
+        Register a job of ``client_id`` waiting for ``run``. An older job
+        of the same client with the same id, or with the same
+        ``supersede_key`` (which should include the client), is cancelled.
+        """
+        job = Job(job_id or new_job_id(), kind, run, supersede_key, client_id)
+        with self._lock:
+            older = [self._jobs.get((client_id, job.id))]
+            if supersede_key is not None:
+                older.append(self._latest.get(supersede_key))
+            self._jobs[client_id, job.id] = job
+            if supersede_key is not None:
+                self._latest[supersede_key] = job
+            run.holders += 1
+        for previous in {o for o in older if o is not None}:
+            self._cancel(previous, "superseded")
+        return job
+
+    def close(self, job: Job) -> None:
+        """The job got its response (or was abandoned); forget it."""
+        with self._lock:
+            self._remove(job)
+
+    def cancel(self, job_id: str, reason: str = "client", client_id: str | None = None) -> bool:
+        """Cancel a job of ``client_id`` in progress; False if it has none with that id."""
+        with self._lock:
+            job = self._jobs.get((client_id, job_id))
+        if job is None:
+            return False
+        self._cancel(job, reason)
+        return True
+
+    def _remove(self, job: Job) -> bool:
+        """Unregister ``job`` (lock held); False if it was done already."""
+        if job.done:
+            return False
+        job.done = True
+        if self._jobs.get((job.client_id, job.id)) is job:
+            del self._jobs[job.client_id, job.id]
+        if job.supersede_key is not None and self._latest.get(job.supersede_key) is job:
+            del self._latest[job.supersede_key]
+        job.run.holders -= 1
+        return True
+
+    def _cancel(self, job: Job, reason: str) -> None:
+        with self._lock:
+            if not self._remove(job):
+                return
+            job.cancelled = True
+            last_holder = job.run.holders == 0
+        execution_cancellations.inc(kind=job.kind, reason=reason)
+        if last_holder:
+            job.run.cancel()
+        if job.on_cancel is not None:
+            job.on_cancel()
+
+    @contextmanager
+    def track(
+        self,
+        job_id: str | None,
+        kind: str,
+        run: Run,
+        supersede_key: Hashable | None = None,
+        client_id: str | None = None,
+    ):
+        """:meth:`open` a job for the duration of the block."""
+        job = self.open(job_id, kind, run, supersede_key, client_id)
+        try:
+            yield job
+        finally:
+            self.close(job)
+
+    @asynccontextmanager
+    async def cancel_on_disconnect(
+        self,
+        is_disconnected: Callable[[], Awaitable[bool]],
+        job_id: str,
+        client_id: str | None = None,
+    ):
+        """Cancel ``job_id`` if the client goes away while the block runs."""
+
+        async def watch() -> None:
+            while not await is_disconnected():
+                await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+            self.cancel(job_id, "disconnect", client_id)
+
+        watcher = asyncio.create_task(watch())
+        try:
+            yield
+        finally:
+            watcher.cancel()
+
+
+_job_registry: JobRegistry | None = None
+
+
+def get_job_registry() -> JobRegistry:
+    """Get job registry singleton."""
+    global _job_registry
+    if _job_registry is None:
+        _job_registry = JobRegistry()
+    return _job_registry
@@ -0,0 +1,175 @@
+"""
+Phase timings and time budget for code run in a subprocess.
+
+The generated script records ``time.monotonic()`` marks as it goes (once
+the interpreter is up, after the imports, after the user code, after the
+tests) and prints them after a marker at the very end of its output. The
+parent strips the marker and turns the marks into an
+:class:`~app.models.ExecutionTiming`, also recorded in the
+``execution_phase_seconds`` histogram. Monotonic time is shared between
+processes on the same host, so marks from the child can be compared with
+the parent's own.
+
+Only the learner's code runs against the time budget: an interval timer is
+armed in the worker right before the user code and disarmed after it (and
+after the tests, for validations). The subprocess timeout in the parent is
+the budget plus a startup grace, a backstop for code stuck where the timer
+signal can't interrupt it.
+"""
+import json
+import time
+
+from ..metrics import execution_phase_duration, execution_truncations
+from ..models import ExecutionTiming
+
+TIMING_MARKER = "__TIMINGS__"
+
+_EMIT_MARKS = f'print("{TIMING_MARKER}" + _phase_json.dumps(_phase_marks), end="", flush=True)'
+
+# First lines of the script: the "started" mark is taken before any import.
+# A SIGALRM from the budget timer raises _BudgetExceeded, a BaseException so
+# that ``except Exception`` in learner code or tests doesn't swallow it; if
+# nothing handles it, the marks (flagged "timed_out") are still printed.
+PROLOGUE = f'''import time as _phase_time
+_phase_marks = {{"started": _phase_time.monotonic()}}
+import json as _phase_json
+import signal as _phase_signal
+import sys as _phase_sys
+
+
+class _BudgetExceeded(BaseException):
+    pass
+
+
+def _phase_on_alarm(signum, frame):
+    _phase_marks["timed_out"] = _phase_time.monotonic()
+    raise _BudgetExceeded()
+
+
+def _phase_excepthook(kind, value, tb):
+    if issubclass(kind, _BudgetExceeded):
+        {_EMIT_MARKS}
+    else:
+        _phase_sys.__excepthook__(kind, value, tb)
+
+
+_phase_signal.signal(_phase_signal.SIGALRM, _phase_on_alarm)
+_phase_sys.excepthook = _phase_excepthook
+'''
+
+EPILOGUE = "\n" + _EMIT_MARKS + "\n"
+
+
+def mark(name: str, indent: str = "") -> str:
+    """Script line recording the ``name`` mark."""
+    return f'{indent}_phase_marks["{name}"] = _phase_time.monotonic()\n'
+
+
+def start_budget(seconds: float, indent: str = "") -> str:
+    """Script line arming the time budget for the learner's code."""
+    return f"{indent}_phase_signal.setitimer(_phase_signal.ITIMER_REAL, {float(seconds)!r})\n"
+
+
+def stop_budget(indent: str = "") -> str:
+    """Script line disarming the time budget."""
+    return f"{indent}_phase_signal.setitimer(_phase_signal.ITIMER_REAL, 0)\n"
+
+
+def split_timings(output: str) -> tuple[str, dict[str, float]]:
+    """Remove the timing marker from the script output and return its marks."""
+    index = output.rfind(TIMING_MARKER)
+    if index == -1:
+        return output, {}
+    try:
+        marks = json.loads(output[index + len(TIMING_MARKER):])
+    except ValueError:
+        return output, {}
+    return output[:index], marks
+
+
+def _span(start: float | None, end: float | None) -> float | None:
+    if start is None or end is None:
+        return None
+    return round(max(end - start, 0.0), 6)
+
+
+class PhaseTimer:
+    """Collects the phases of one execution or validation and records them."""
+
+    def __init__(self, kind: str, queue_wait: float | None = None):
+        self.kind = kind
+        self.queue_wait = queue_wait
+        self.marks: dict[str, float] = {}
+        self.created_at = time.monotonic()
+        self.spawned_at: float | None = None
+        self.returned_at: float | None = None
+        self.result_parse: float | None = None
+
+    def spawning(self) -> None:
+        """Call right before the script is handed to its process (started or pre-warmed)."""
+        self.spawned_at = time.monotonic()
+
+    def returned(self) -> None:
+        """Call as soon as the subprocess has exited (or was killed)."""
+        self.returned_at = time.monotonic()
+
+    def parsed(self) -> None:
+        """Call once the subprocess output has been parsed."""
+        if self.returned_at is not None:
+            self.result_parse = time.monotonic() - self.returned_at
+
+    def add_marks(self, marks: dict[str, float]) -> None:
+        """Add the marks printed by the script."""
+        self.marks.update(marks)
+
+    @property
+    def timed_out(self) -> bool:
+        """Whether the learner's code ran past its time budget."""
+        return "timed_out" in self.marks
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the timer was created, excluding the queue wait."""
+        return (self.returned_at or time.monotonic()) - self.created_at
+
+    def timing(self) -> ExecutionTiming:
+        """Phase durations from the collected marks."""
+        marks = self.marks
+        started = marks.get("started")
+        imported = marks.get("imported")
+        user_done = marks.get("user_code_done")
+        tests_done = marks.get("tests_done")
+        timed_out = marks.get("timed_out")
+        if timed_out is not None:
+            if user_done is None or timed_out < user_done:
+                user_done = timed_out  # stopped in the user code
+            elif tests_done is None:
+                tests_done = timed_out  # stopped in the tests
+        last_mark = max(marks.values()) if marks else None
+        return ExecutionTiming(
+            queue=round(self.queue_wait, 6) if self.queue_wait is not None else None,
+            startup=_span(self.spawned_at, started),
+            imports=_span(started, imported),
+            user_code=_span(imported, user_done),
+            tests=_span(user_done, tests_done) if tests_done is not None else None,
+            teardown=_span(last_mark, self.returned_at),
+            total=round((self.queue_wait or 0.0) + self.elapsed, 6),
+        )
+
+    def record(self) -> ExecutionTiming:
+        """Observe every measured phase in the histogram and return the timing."""
+        timing = self.timing()
+        phases = timing.model_dump(exclude={"total"}, exclude_none=True)
+        if self.result_parse is not None:
+            phases["result_parse"] = self.result_parse
+        for phase, seconds in phases.items():
+            execution_phase_duration.observe(seconds, kind=self.kind, phase=phase)
+        return timing
+
+
+def truncate_output(text: str, limit: int, kind: str) -> str:
+    """Cut ``text`` to ``limit`` characters, noting it in the output and the metrics."""
+    if limit <= 0 or len(text) <= limit:
+        return text
+    execution_truncations.inc(kind=kind)
+    return text[:limit] + f"\n... [output truncated: {len(text) - limit} more characters]\n"
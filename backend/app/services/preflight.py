@@ -0,0 +1,308 @@
+"""
+Pre-flight checks of submitted code, run in the API process.
+
+Code that can't work is answered without taking a sandbox: empty code,
+syntax errors (with line and column, formatted like Python's own),
+imports and calls outside the execution policy, and loops that can only
+end at the time limit (a ``while True`` is only flagged when nothing in
+its body can raise, since an exception is a legitimate way out). The
+policy spares a sandbox for the obvious cases; it is not the security
+boundary (the jail executor is), since code can always reach a module in
+ways the AST doesn't show.
+"""
+import ast
+import math
+import traceback
+from dataclasses import dataclass, field
+
+from ..metrics import execution_preflight_checks
+from ..models import CodeDiagnostic
+
+# Modules (and their submodules) executed code may not import: processes,
+# raw sockets and network clients, native calls and the signals and
+# limits the time budget relies on
+FORBIDDEN_MODULES = {
+    "subprocess", "pty", "socket", "ctypes", "signal", "resource", "ftplib", "smtplib",
+    "telnetlib", "http.client", "urllib.request", "requests", "httpx",
+}
+FORBIDDEN_CALLS = {
+    "os.system", "os.popen", "os.fork", "os.forkpty", "os.kill", "os.killpg",
+    "os.setuid", "os.setgid", "os.chroot",
+}
+FORBIDDEN_CALL_PREFIXES = ("os.exec", "os.spawn", "os.posix_spawn")
+# Calls ending a loop (or the whole program)
+EXIT_CALLS = {"sys.exit", "exit", "quit", "os._exit"}
+# Upper bound on CPython loop iterations per second; range loops longer
+# than the time limit allows at that pace can't finish
+ITERATIONS_PER_SECOND = 100_000_000
+
+
+@dataclass
+class Preflight:
+    """Outcome of the checks: empty code, or the problems found (if any)."""
+
+    empty: bool = False
+    diagnostics: list[CodeDiagnostic] = field(default_factory=list)
+    message: str = ""  # what the learner sees, like the error of a real run
+
+    @property
+    def ok(self) -> bool:
+        return not self.empty and not self.diagnostics
+
+
+def _module_forbidden(name: str) -> bool:
+    parts = name.split(".")
+    return any(".".join(parts[:i]) in FORBIDDEN_MODULES for i in range(1, len(parts) + 1))
+
+
+def _call_forbidden(name: str) -> bool:
+    return name in FORBIDDEN_CALLS or name.startswith(FORBIDDEN_CALL_PREFIXES)
+
+
+def _constant_int(node: ast.AST) -> int | None:
+    """Value of an integer constant expression like ``10**9`` or ``2 * 1000``."""
+    if isinstance(node, ast.Constant) and type(node.value) is int:
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = _constant_int(node.operand)
+        return -value if value is not None else None
+    if isinstance(node, ast.BinOp):
+        left, right = _constant_int(node.left), _constant_int(node.right)
+        if left is None or right is None:
+            return None
+        if isinstance(node.op, ast.Add):
+            return left + right
+        if isinstance(node.op, ast.Sub):
+            return left - right
+        if isinstance(node.op, ast.Mult):
+            return left * right
+        if isinstance(node.op, ast.FloorDiv) and right:
+            return left // right
+        # Bounded so that checking the code can't take long itself
+        if isinstance(node.op, ast.Pow) and 0 <= right <= 64 and abs(left) <= 1_000_000:
+            return left**right
+    return None
+
+
+def _exits(node: ast.AST, in_inner_loop: bool = False) -> bool:
+    """Whether ``node`` can leave the loop it is in (break, return, raise, exit call...)."""
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+        return False  # runs in another scope
+    if isinstance(node, ast.Break):
+        return not in_inner_loop
+    if isinstance(node, (ast.Return, ast.Raise, ast.Yield, ast.YieldFrom, ast.Await)):
+        return True
+    if isinstance(node, ast.Call) and _dotted_name(node.func) in EXIT_CALLS:
+        return True
+    if isinstance(node, (ast.For, ast.AsyncFor, ast.While)):
+        # A break in an inner loop's body only ends that loop
+        header = [node.test] if isinstance(node, ast.While) else [node.iter]
+        return any(_exits(child, in_inner_loop) for child in header + node.orelse) or any(
+            _exits(child, True) for child in node.body
+        )
+    return any(_exits(child, in_inner_loop) for child in ast.iter_child_nodes(node))
+
+
+def _loop_exits(body: list[ast.stmt]) -> bool:
+    return any(_exits(statement) for statement in body)
+
+
+# Nodes that run arbitrary code or check a condition, so they may raise
+# (``next(it)`` ending a ``while True`` with StopIteration, an assert...)
+_MAY_RAISE = (ast.Call, ast.Assert, ast.Subscript, ast.Attribute, ast.With, ast.Import, ast.ImportFrom)
+
+
+def _may_raise(node: ast.AST) -> bool:
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+        return False  # runs in another scope
+    if isinstance(node, _MAY_RAISE):
+        return True
+    return any(_may_raise(child) for child in ast.iter_child_nodes(node))
+
+
+def _dotted_name(node: ast.AST) -> str | None:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+class _PolicyVisitor(ast.NodeVisitor):
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.diagnostics: list[CodeDiagnostic] = []
+        # Local name -> what it refers to ("sp" -> "subprocess", "system" -> "os.system")
+        self.aliases: dict[str, str] = {}
+        # Iterations of the enclosing range loops, where known
+        self.loop_iterations = [1]
+
+    def _report(self, node: ast.AST, kind: str, message: str) -> None:
+        self.diagnostics.append(
+            CodeDiagnostic(
+                kind=kind, message=message, line=node.lineno, column=node.col_offset + 1
+            )
+        )
+
+    def _resolve(self, node: ast.AST) -> str | None:
+        name = _dotted_name(node)
+        if name is None:
+            return None
+        base, _, rest = name.partition(".")
+        base = self.aliases.get(base, base)
+        return f"{base}.{rest}" if rest else base
+
+    def _check_import(self, node: ast.AST, module: str) -> None:
+        if _module_forbidden(module):
+            self._report(node, "policy", f"importing '{module}' is not allowed in the sandbox")
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self._check_import(node, alias.name)
+            if alias.asname:
+                self.aliases[alias.asname] = alias.name
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.level or not node.module:
+            return
+        self._check_import(node, node.module)
+        for alias in node.names:
+            qualified = f"{node.module}.{alias.name}"
+            if not _module_forbidden(node.module):
+                # ``from urllib import request`` imports a forbidden submodule
+                self._check_import(node, qualified)
+            self.aliases[alias.asname or alias.name] = qualified
+
+    def visit_Call(self, node: ast.Call) -> None:
+        name = self._resolve(node.func)
+        argument = node.args[0] if node.args else None
+        if name and _call_forbidden(name):
+            self._report(node, "policy", f"calling '{name}' is not allowed in the sandbox")
+        elif name in ("__import__", "importlib.import_module") and isinstance(argument, ast.Constant):
+            if isinstance(argument.value, str):
+                self._check_import(node, argument.value)
+        elif name == "time.sleep" and isinstance(argument, ast.Constant):
+            if isinstance(argument.value, (int, float)) and argument.value >= self.timeout:
+                self._report(
+                    node,
+                    "long_running",
+                    f"time.sleep({argument.value}) can't finish within the {self.timeout:g}s time limit",
+                )
+        self.generic_visit(node)
+
+    def visit_While(self, node: ast.While) -> None:
+        test = node.test
+        if (
+            isinstance(test, ast.Constant)
+            and test.value
+            and not _loop_exits(node.body)
+            and not any(_may_raise(statement) for statement in node.body)
+        ):
+            self._report(
+                node,
+                "long_running",
+                "this loop has no break, return or raise and nothing in it can fail, "
+                f"so it only stops at the {self.timeout:g}s time limit",
+            )
+        self.generic_visit(node)
+
+    def visit_For(self, node: ast.For) -> None:
+        self.visit(node.iter)
+        iterations = self._iterations(node.iter)
+        if iterations is None or _loop_exits(node.body):
+            iterations = 1
+        outer = self.loop_iterations[-1]
+        # Capped so that the count can still be formatted as a float
+        total = min(outer * iterations, 10**300)
+        if iterations == math.inf:
+            self._report(node, "long_running", "this loop over an endless iterator never stops")
+            total = 1
+        elif total > self.timeout * ITERATIONS_PER_SECOND:
+            self._report(
+                node,
+                "long_running",
+                f"this loop runs about {total:.1e} iterations"
+                f"{' (counting the loops around it)' if outer > 1 else ''}, more than can "
+                f"finish within the {self.timeout:g}s time limit",
+            )
+            total = 1
+        # Loops inside multiply their own iterations by this loop's
+        self.loop_iterations.append(total)
+        for statement in node.body:
+            self.visit(statement)
+        self.loop_iterations.pop()
+        for statement in node.orelse:
+            self.visit(statement)
+
+    def _iterations(self, node: ast.AST) -> float | None:
+        """Length of ``range(...)`` with constant bounds, inf for ``itertools.count()``."""
+        if not isinstance(node, ast.Call):
+            return None
+        name = self._resolve(node.func)
+        if name == "itertools.count":
+            return math.inf
+        if name != "range" or not 1 <= len(node.args) <= 3 or node.keywords:
+            return None
+        bounds = [_constant_int(arg) for arg in node.args]
+        if any(bound is None for bound in bounds):
+            return None
+        start, stop, step = (0, bounds[0], 1) if len(bounds) == 1 else (*bounds, 1)[:3]
+        if not step:
+            return None
+        return max(0, -((start - stop) // step))
+
+
+def _rejected(kind: str, message: str) -> Preflight:
+    """A diagnostic without a position in the code."""
+    diagnostic = CodeDiagnostic(kind=kind, message=message)
+    return Preflight(diagnostics=[diagnostic], message=message + "\n")
+
+
+def check(code: str, timeout: float) -> Preflight:
+    """Check code before it is run with a time limit of ``timeout`` seconds."""
+    try:
+        tree = ast.parse(code, "<string>")
+        # Some errors ('return' outside function, misplaced break) only show up when compiling
+        compile(tree, "<string>", "exec", dont_inherit=True)
+    except SyntaxError as e:
+        diagnostic = CodeDiagnostic(
+            kind="syntax",
+            message=f"{type(e).__name__}: {e.msg}",
+            line=e.lineno,
+            column=e.offset,
+        )
+        message = "".join(traceback.format_exception_only(type(e), e))
+        return Preflight(diagnostics=[diagnostic], message=message)
+    except ValueError as e:
+        # e.g. null bytes in the source
+        return _rejected("syntax", f"SyntaxError: {e}")
+    except (RecursionError, MemoryError) as e:
+        # Expressions nested too deeply for the parser or the compiler
+        return _rejected("syntax", f"{type(e).__name__}: the code is nested too deeply to compile")
+
+    if not tree.body:
+        return Preflight(empty=True)
+
+    visitor = _PolicyVisitor(timeout)
+    try:
+        visitor.visit(tree)
+    except RecursionError:
+        return _rejected("policy", "the code is nested too deeply to be checked")
+    message = "".join(f"line {d.line}: {d.message}\n" for d in visitor.diagnostics)
+    return Preflight(diagnostics=visitor.diagnostics, message=message)
+
+
+def preflight(code: str, timeout: float, kind: str) -> Preflight:
+    """:func:`check`, counting the outcome in the metrics."""
+    result = check(code, timeout)
+    if result.empty:
+        outcome = "empty"
+    elif result.diagnostics:
+        outcome = result.diagnostics[0].kind
+    else:
+        outcome = "passed"
+    execution_preflight_checks.inc(kind=kind, outcome=outcome)
+    return result
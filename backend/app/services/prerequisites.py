@@ -0,0 +1,154 @@
+"""Prerequisite graph for curriculum modules."""
+import heapq
+from collections.abc import Iterable, Mapping
+
+
+class PrerequisiteError(ValueError):
+    """Raised when module prerequisites do not form a valid DAG."""
+
+
+class PrerequisiteGraph:
+    """
+    Directed acyclic graph of module prerequisites.
+
+    Built once from the frontmatter of every module. The topological order
+    and the transitive closure in both directions are precomputed, so
+    queries like "everything needed before X" or "what X unlocks" are
+    dictionary lookups.
+    """
+
+    def __init__(self, prerequisites: Mapping[str, Iterable[str]]):
+        """
+        Build the graph.
+
+        Args:
+            prerequisites: Mapping of module id to its direct prerequisites.
+                Iteration order is used to break ties in the topological
+                order, so pass modules sorted by their curriculum order.
+
+        Raises:
+            PrerequisiteError: If a prerequisite references an unknown module
+                or the prerequisites contain a cycle.
+        """
+        self._position = {module_id: i for i, module_id in enumerate(prerequisites)}
+        self._prerequisites: dict[str, tuple[str, ...]] = {}
+        self._dependents: dict[str, list[str]] = {m: [] for m in self._position}
+
+        for module_id, prereqs in prerequisites.items():
+            unique = tuple(dict.fromkeys(prereqs))
+            for prereq in unique:
+                if prereq not in self._position:
+                    raise PrerequisiteError(
+                        f"Module '{module_id}' has unknown prerequisite '{prereq}'"
+                    )
+                self._dependents[prereq].append(module_id)
+            self._prerequisites[module_id] = unique
+
+        self._order = self._topological_order()
+        self._index = {module_id: i for i, module_id in enumerate(self._order)}
+
+        # Transitive closure, walking the topological order so every
+        # prerequisite's closure is complete before it is needed.
+        ancestors: dict[str, set[str]] = {}
+        for module_id in self._order:
+            closure: set[str] = set()
+            for prereq in self._prerequisites[module_id]:
+                closure.add(prereq)
+                closure |= ancestors[prereq]
+            ancestors[module_id] = closure
+
+        descendants: dict[str, list[str]] = {m: [] for m in self._order}
+        for module_id in self._order:
+            for ancestor in ancestors[module_id]:
+                descendants[ancestor].append(module_id)
+
+        by_order = self._index.__getitem__
+        self._ancestors = {
+            m: tuple(sorted(closure, key=by_order)) for m, closure in ancestors.items()
+        }
+        self._ancestor_sets = {m: frozenset(c) for m, c in ancestors.items()}
+        self._descendants = {m: tuple(d) for m, d in descendants.items()}
+        self._direct_dependents = {
+            m: tuple(sorted(d, key=by_order)) for m, d in self._dependents.items()
+        }
+
+    def _topological_order(self) -> list[str]:
+        """Kahn's algorithm, breaking ties by the original module order."""
+        in_degree = {m: len(p) for m, p in self._prerequisites.items()}
+        ready = [self._position[m] for m, degree in in_degree.items() if degree == 0]
+        heapq.heapify(ready)
+        ids = list(self._position)
+
+        order: list[str] = []
+        while ready:
+            module_id = ids[heapq.heappop(ready)]
+            order.append(module_id)
+            for dependent in self._dependents[module_id]:
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    heapq.heappush(ready, self._position[dependent])
+
+        if len(order) != len(ids):
+            raise PrerequisiteError(
+                "Prerequisite cycle detected: " + " -> ".join(self._find_cycle(in_degree))
+            )
+        return order
+
+    def _find_cycle(self, in_degree: dict[str, int]) -> list[str]:
+        """Return one cycle among the modules Kahn's algorithm could not order."""
+        remaining = {m for m, degree in in_degree.items() if degree > 0}
+        # Every remaining node has a remaining prerequisite, so walking
+        # prerequisites must eventually revisit a node.
+        node = min(remaining, key=self._position.__getitem__)
+        path: list[str] = []
+        seen: dict[str, int] = {}
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = next(p for p in self._prerequisites[node] if p in remaining)
+        # Reverse into "prerequisite -> dependent" direction, starting from
+        # the earliest module for a stable message.
+        cycle = path[seen[node]:][::-1]
+        start = cycle.index(min(cycle, key=self._position.__getitem__))
+        cycle = cycle[start:] + cycle[:start]
+        return cycle + [cycle[0]]
+
+    def __contains__(self, module_id: object) -> bool:
+        return module_id in self._position
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    @property
+    def order(self) -> list[str]:
+        """All modules in a valid learning order."""
+        return list(self._order)
+
+    def prerequisites(self, module_id: str) -> tuple[str, ...]:
+        """Direct prerequisites of a module."""
+        return self._prerequisites[module_id]
+
+    def ancestors(self, module_id: str) -> tuple[str, ...]:
+        """Every module needed before ``module_id``, in learning order."""
+        return self._ancestors[module_id]
+
+    def descendants(self, module_id: str) -> tuple[str, ...]:
+        """Every module that directly or indirectly requires ``module_id``."""
+        return self._descendants[module_id]
+
+    def dependents(self, module_id: str) -> tuple[str, ...]:
+        """Modules that list ``module_id`` as a direct prerequisite."""
+        return self._direct_dependents[module_id]
+
+    def requires(self, module_id: str, prereq: str) -> bool:
+        """Whether ``prereq`` is needed (directly or not) before ``module_id``."""
+        return prereq in self._ancestor_sets[module_id]
+
+    def available(self, completed: Iterable[str]) -> list[str]:
+        """Modules not yet completed whose prerequisites are all completed."""
+        done = set(completed)
+        return [
+            m
+            for m in self._order
+            if m not in done and all(p in done for p in self._prerequisites[m])
+        ]
@@ -0,0 +1,300 @@
+"""
+Executor backends and the pool of pre-warmed sandboxes.
+
+An executor decides how a sandbox interpreter is launched: as a plain
+subprocess, or jailed in Linux namespaces (no network, its own PID, IPC,
+hostname and mount namespaces, through ``unshare``) with a read-only
+filesystem, resource limits and a seccomp filter applied inside
+(``app/sandbox/_jail.py``).
+
+Starting an interpreter and importing torch takes seconds, and the jail
+adds its own setup, so the pool keeps ``sandbox_pool_size`` sandboxes
+started ahead of time (``app/sandbox/_warm.py``): each has already done
+its imports and waits for a script on stdin. A sandbox runs one job and
+exits; taking one starts its replacement, which warms up while the job
+runs. Running every job in a fresh process is how sandboxes are reset.
+
+Each sandbox leads its own process group, so killing it (on timeout or
+when its job is cancelled) also kills the processes it started.
+"""
+import json
+import os
+import signal
+import site
+import subprocess
+import sys
+import tempfile
+import threading
+from collections import deque
+from pathlib import Path
+
+from ..config import get_settings
+from ..metrics import cache_requests
+from .artifacts import default_store_path
+from .compile_cache import get_compile_cache
+from .jobs import JobCancelled, Run
+
+SANDBOX_DIR = Path(__file__).parent.parent / "sandbox"
+WARM_SCRIPT = SANDBOX_DIR / "_warm.py"
+BACKEND_DIR = SANDBOX_DIR.parent.parent
+
+# Host environment variables sandboxes inherit; everything else (secrets
+# like the dispatcher token) stays in the API process
+SANDBOX_ENV_VARS = (
+    "PATH", "HOME", "LANG", "LC_ALL", "TMPDIR",
+    "MPLCONFIGDIR", "XDG_CONFIG_HOME", "XDG_CACHE_HOME",
+)
+
+# Same variables as app/sandbox/_jail.py and _dataloader.py (which can't
+# import the app)
+JAIL_ENV_VAR = "ACADEMY_SANDBOX_JAIL"
+DATALOADER_ENV_VAR = "ACADEMY_DATALOADER_MAX_WORKERS"
+
+# New user (mapped to root inside), network, PID, mount, IPC and UTS
+# namespaces; the sandbox is killed along with the unshare process
+UNSHARE_COMMAND = [
+    "unshare", "--user", "--map-root-user", "--net", "--pid", "--fork", "--kill-child",
+    "--mount", "--mount-proc", "--ipc", "--uts",
+]
+
+
+def kill_process_tree(process: subprocess.Popen) -> None:
+    """SIGKILL a sandbox and every process it started (its process group)."""
+    if process.returncode is not None:
+        return  # already reaped; the group id may belong to someone else now
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class SubprocessExecutor:
+    """Runs sandboxes as plain child processes, without isolation."""
+
+    name = "subprocess"
+
+    def __init__(self, env: dict[str, str] | None = None):
+        self.env = env
+
+    def command(self, script: Path, *args: str) -> list[str]:
+        return ["python", str(script), *args]
+
+    def popen(self, script: Path, *args: str, stderr=subprocess.PIPE) -> subprocess.Popen:
+        """Start ``script`` in a sandbox, talking over stdin and stdout."""
+        return subprocess.Popen(
+            self.command(script, *args),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            text=True,
+            cwd=tempfile.gettempdir(),
+            env=self.env,
+            start_new_session=True,
+        )
+
+
+class JailExecutor(SubprocessExecutor):
+    """
+    Runs sandboxes in Linux namespaces on a read-only filesystem, with
+    rlimits and a seccomp filter. The ``hidden`` directories look empty;
+    the ``read_only`` directories stay visible even if under them or
+    ``/tmp`` (which the jail replaces). ``overlays`` maps paths in the jail
+    to host directories shown there copy-on-write: the sandbox can write
+    to them, but its changes stay private.
+    """
+
+    name = "jail"
+
+    def __init__(
+        self,
+        env: dict[str, str] | None = None,
+        max_file_bytes: int = 0,
+        memory_bytes: int = 0,
+        shm_bytes: int = 0,
+        tmp_bytes: int = 0,
+        read_only: list[str] | None = None,
+        overlays: dict[str, str] | None = None,
+        hidden: list[str] | None = None,
+        seccomp: bool = True,
+    ):
+        limits = {
+            "max_file_bytes": max_file_bytes,
+            "memory_bytes": memory_bytes,
+            "shm_bytes": shm_bytes,
+            "tmp_bytes": tmp_bytes,
+            "read_only": read_only or [],
+            "overlays": overlays or {},
+            "hidden": hidden or [],
+            "seccomp": seccomp,
+        }
+        super().__init__({**(env or {}), JAIL_ENV_VAR: json.dumps(limits)})
+
+    def command(self, script: Path, *args: str) -> list[str]:
+        return UNSHARE_COMMAND + super().command(script, *args)
+
+
+class Sandbox:
+    """A started interpreter waiting for one script on stdin."""
+
+    def __init__(self, process: subprocess.Popen):
+        self.process = process
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, script: str, timeout: float) -> subprocess.CompletedProcess:
+        """Run ``script``; raises ``subprocess.TimeoutExpired`` after killing it."""
+        try:
+            stdout, stderr = self.process.communicate(script, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.close()
+            raise
+        return subprocess.CompletedProcess(self.process.args, self.process.returncode, stdout, stderr)
+
+    def kill(self) -> None:
+        """Kill the process tree; safe from any thread while :meth:`run` waits."""
+        kill_process_tree(self.process)
+
+    def close(self) -> None:
+        """Kill the process tree and wait for the sandbox to exit."""
+        self.kill()
+        self.process.communicate()
+
+
+class SandboxPool:
+    """Sandboxes started ahead of time, handed out one job each."""
+
+    def __init__(self, executor: SubprocessExecutor, size: int):
+        self.executor = executor
+        self.size = size
+        self._ready: deque[Sandbox] = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._ready)
+
+    def _spawn(self) -> Sandbox:
+        return Sandbox(self.executor.popen(WARM_SCRIPT))
+
+    def fill(self) -> None:
+        """Start sandboxes until ``size`` are ready (they warm up in the background)."""
+        with self._lock:
+            try:
+                while not self._closed and len(self._ready) < self.size:
+                    self._ready.append(self._spawn())
+            except OSError as e:
+                print(f"Error starting {self.executor.name} sandbox: {e}")
+
+    def acquire(self) -> Sandbox:
+        """A ready sandbox, or a freshly started one if none is left."""
+        sandbox = None
+        with self._lock:
+            while self._ready and sandbox is None:
+                candidate = self._ready.popleft()
+                # Skip sandboxes that died while waiting (killed, crashed on import)
+                sandbox = candidate if candidate.alive else None
+        if self.size:
+            cache_requests.inc(cache="sandbox_pool", result="hit" if sandbox else "miss")
+        if sandbox is None:
+            sandbox = self._spawn()
+        # The replacement warms up while this job runs
+        self.fill()
+        return sandbox
+
+    def run(
+        self, script: str, timeout: float, run: Run | None = None
+    ) -> subprocess.CompletedProcess:
+        """
+        Run a script in a sandbox of the pool. Cancelling ``run`` kills the
+        sandbox; raises :class:`JobCancelled` if it was cancelled.
+        """
+        if run is None:
+            return self.acquire().run(script, timeout)
+        if run.cancelled:
+            # Cancelled while waiting for an execution slot
+            raise JobCancelled()
+        sandbox = self.acquire()
+        if not run.bind(sandbox.kill):
+            sandbox.close()
+            raise JobCancelled()
+        try:
+            result = sandbox.run(script, timeout)
+        finally:
+            run.unbind()
+        if run.cancelled:
+            raise JobCancelled()
+        return result
+
+    def close(self) -> None:
+        """Stop the waiting sandboxes; no more are started."""
+        with self._lock:
+            self._closed = True
+            sandboxes = list(self._ready)
+            self._ready.clear()
+        for sandbox in sandboxes:
+            sandbox.close()
+
+
+def _matplotlib_dirs() -> list[str]:
+    """
+    Where matplotlib keeps its config and font cache, found the way it
+    does without importing it. It warns on stderr (failing the job) when
+    they aren't writable.
+    """
+    if os.environ.get("MPLCONFIGDIR"):
+        return [os.environ["MPLCONFIGDIR"]]
+    config = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return [os.path.join(config, "matplotlib"), os.path.join(cache, "matplotlib")]
+
+
+def create_executor(backend: str | None = None) -> SubprocessExecutor:
+    """The executor ``backend`` (by default the one in ``execution_backend``)."""
+    settings = get_settings()
+    compile_cache = get_compile_cache()
+    env = {
+        **{name: os.environ[name] for name in SANDBOX_ENV_VARS if name in os.environ},
+        **compile_cache.env(),
+        DATALOADER_ENV_VAR: str(settings.execution_max_dataloader_workers),
+    }
+    if (backend or settings.execution_backend) == "jail":
+        # Jobs load from the compile cache, but what they write is dropped
+        # with the sandbox, so one job can't plant artifacts for the next;
+        # the same goes for matplotlib's font cache
+        overlays = compile_cache.jail_overlays()
+        overlays.update((directory, directory) for directory in _matplotlib_dirs())
+        for directory in overlays.values():
+            Path(directory).mkdir(parents=True, exist_ok=True)
+        # The app and where its .env is read from; the interpreter and the
+        # artifact store are put back if they live there
+        hidden = sorted({str(BACKEND_DIR), os.getcwd()} - {"/"})
+        read_only = [
+            str(SANDBOX_DIR),
+            *dict.fromkeys([sys.prefix, sys.base_prefix, *site.getsitepackages()]),
+            str(default_store_path()),
+        ]
+        return JailExecutor(
+            env,
+            max_file_bytes=settings.sandbox_max_file_bytes,
+            memory_bytes=settings.sandbox_memory_bytes,
+            shm_bytes=settings.sandbox_shm_bytes,
+            tmp_bytes=settings.sandbox_tmp_bytes,
+            read_only=read_only,
+            overlays=overlays,
+            hidden=hidden,
+            seccomp=settings.sandbox_seccomp,
+        )
+    return SubprocessExecutor(env)
+
+
+_sandbox_pool: SandboxPool | None = None
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """Get sandbox pool singleton (filled at startup by the app)."""
+    global _sandbox_pool
+    if _sandbox_pool is None:
+        _sandbox_pool = SandboxPool(create_executor(), get_settings().sandbox_pool_size)
+    return _sandbox_pool
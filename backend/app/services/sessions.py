@@ -0,0 +1,327 @@
+"""
+Incremental lesson execution.
+
+A session keeps one Python process per learner and lesson
+(``app/sandbox/_session.py``) whose namespace persists between cell
+runs, so torch is imported once and cells build on each other like in a
+notebook. After an edit, the cell graph (``cell_graph.py``) tells which
+cells must run again: the edited cell, the cells downstream of it, and
+any earlier cell whose bindings are missing or were overwritten in the
+namespace since. Everything else keeps its previous result.
+"""
+import json
+import select
+import subprocess
+import threading
+import time
+import uuid
+
+from ..config import get_settings
+from ..models import CellRunResponse, CellRunResult, SessionCell
+from . import phases
+from .artifacts import default_store_path
+from .blobs import get_blob_store
+from .cell_graph import CellGraph
+from .preflight import preflight
+from .sandboxes import SANDBOX_DIR, get_sandbox_pool, kill_process_tree
+
+SESSION_SCRIPT = SANDBOX_DIR / "_session.py"
+
+
+class SessionError(Exception):
+    """The session process died or stopped answering."""
+
+
+class LessonSession:
+    """A lesson's cells, their dependency graph and the process running them."""
+
+    def __init__(self, module_id: str, cells: list[tuple[str, str]]):
+        settings = get_settings()
+        self.id = uuid.uuid4().hex
+        self.module_id = module_id
+        self.graph = CellGraph(cells)
+        self.startup_timeout = settings.execution_startup_grace
+        self.max_timeout = settings.session_max_timeout
+        self.max_output_chars = settings.execution_max_output_chars
+        self.max_figures = settings.execution_max_figures
+        self.max_figure_bytes = settings.execution_max_figure_bytes
+        self.preflight = settings.execution_preflight
+        self.artifacts_dir = default_store_path()
+        self.blob_store = get_blob_store()
+        self.last_used = time.monotonic()
+
+        self.lock = threading.Lock()
+        # Set once the manager dropped the session; it never starts again
+        self.closed = False
+        self._process: subprocess.Popen | None = None
+        # Cells whose code (as of their last run) is reflected in the namespace
+        self.executed: set[int] = set()
+        # Name -> cell that bound it last in the namespace
+        self.bound_by: dict[str, int] = {}
+        self.stale: set[int] = set()
+
+    def cells(self) -> list[SessionCell]:
+        return [
+            SessionCell(
+                id=cell_id,
+                defines=sorted(symbols.defines),
+                uses=sorted(symbols.uses),
+                depends_on=[self.graph.ids[i] for i in sorted(self.graph.dependencies(index))],
+                syntax_error=symbols.syntax_error,
+            )
+            for index, (cell_id, symbols) in enumerate(zip(self.graph.ids, self.graph.symbols))
+        ]
+
+    def _start(self) -> None:
+        # Sessions run under the same executor backend as executions
+        executor = get_sandbox_pool().executor
+        self._process = executor.popen(
+            SESSION_SCRIPT, str(self.artifacts_dir), stderr=subprocess.DEVNULL
+        )
+        self._receive(self.startup_timeout)
+
+    def _receive(self, timeout: float) -> dict:
+        ready, _, _ = select.select([self._process.stdout], [], [], timeout)
+        line = self._process.stdout.readline() if ready else ""
+        if not line:
+            self.close()
+            raise SessionError("The session stopped responding and was restarted")
+        return json.loads(line)
+
+    def close(self) -> None:
+        """Stop the process; the namespace is lost."""
+        if self._process is not None:
+            kill_process_tree(self._process)
+            self._process.wait()
+            self._process = None
+        # Every cell that ran has to run again in a new process
+        self.stale |= self.executed
+        self.executed.clear()
+        self.bound_by.clear()
+
+    def _plan(self, targets: set[int]) -> list[int]:
+        """
+        ``targets`` plus the earlier cells they need: a cell whose binding of
+        a name the targets read never ran, or was overwritten in the
+        namespace by another cell since.
+        """
+        plan = set(targets)
+        changed = True
+        while changed:
+            changed = False
+            for index in sorted(plan):
+                for name in self.graph.symbols[index].uses:
+                    definer = self.graph.definer(index, name)
+                    if definer is None or definer in plan:
+                        continue
+                    # Other planned cells before this one rebinding the name
+                    shadowed = any(
+                        p < index and name in self.graph.symbols[p].defines for p in plan
+                    )
+                    if definer not in self.executed or self.bound_by.get(name) != definer or shadowed:
+                        plan.add(definer)
+                        changed = True
+        return sorted(plan)
+
+    def run(self, cell_id: str, code: str | None, timeout: int, run_downstream: bool) -> CellRunResponse:
+        """Run a cell (with new code, if given) and the cells it affects."""
+        with self.lock:
+            if self.closed:
+                raise SessionError("The session was closed")
+            self.last_used = time.monotonic()
+            index = self.graph.index(cell_id)
+            timeout = min(timeout, self.max_timeout)
+
+            downstream = []
+            if code is not None and code != self.graph.codes[index]:
+                downstream = self.graph.update(index, code)
+                # Their results (and bindings) came from the old code
+                self.stale.update(i for i in downstream if i in self.executed)
+                self.executed.difference_update(downstream)
+                self.executed.discard(index)
+            targets = {index} | (set(downstream) if run_downstream else set())
+
+            results = []
+            for planned in self._plan(targets):
+                result = self._run_cell(planned, timeout)
+                results.append(result)
+                if not result.success:
+                    # Later cells would run against incomplete state
+                    break
+            return CellRunResponse(
+                results=results, stale=[self.graph.ids[i] for i in sorted(self.stale)]
+            )
+
+    def _preflight(self, index: int, timeout: int) -> CellRunResult | None:
+        """Result for a cell rejected without running it (same policy as executions)."""
+        if not self.preflight:
+            return None
+        result = preflight(self.graph.codes[index], timeout, "session")
+        if not result.diagnostics:
+            return None
+        self.executed.discard(index)
+        return CellRunResult(
+            cell_id=self.graph.ids[index],
+            success=False,
+            stderr=result.message,
+            error=result.message,
+            diagnostics=result.diagnostics,
+        )
+
+    def _run_cell(self, index: int, timeout: int) -> CellRunResult:
+        cell_id = self.graph.ids[index]
+        rejected = self._preflight(index, timeout)
+        if rejected is not None:
+            return rejected
+        request = {
+            "code": self.graph.codes[index],
+            "timeout": timeout,
+            "figure_format": "png",
+            "max_figures": self.max_figures,
+            "max_figure_bytes": self.max_figure_bytes,
+        }
+        try:
+            if self._process is None or self._process.poll() is not None:
+                self.close()
+                self._start()
+            self._process.stdin.write(json.dumps(request) + "\n")
+            self._process.stdin.flush()
+            reply = self._receive(timeout + self.startup_timeout)
+        except (SessionError, OSError) as e:
+            self.close()
+            return CellRunResult(cell_id=cell_id, success=False, error=str(e))
+
+        # Whatever the cell bound (even partially, on error) is in the namespace now
+        for name in self.graph.symbols[index].defines:
+            self.bound_by[name] = index
+        stdout = phases.truncate_output(reply["stdout"], self.max_output_chars, "session")
+        stderr = phases.truncate_output(reply["stderr"], self.max_output_chars, "session")
+        figures = self.blob_store.store_figures(reply["figures"])
+
+        if reply["timed_out"]:
+            error = f"Cell timed out after {timeout} seconds"
+        else:
+            error = stderr if stderr.strip() else None
+        success = error is None
+        if success:
+            self.executed.add(index)
+            self.stale.discard(index)
+        else:
+            self.executed.discard(index)
+        return CellRunResult(
+            cell_id=cell_id,
+            success=success,
+            stdout=stdout,
+            stderr=stderr,
+            error=error,
+            execution_time=reply["execution_time"],
+            figures=figures,
+        )
+
+
+class SessionManager:
+    """Open sessions, bounded in number and closed after sitting idle."""
+
+    def __init__(self, max_sessions: int, idle_timeout: float):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions: dict[str, LessonSession] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, module_id: str, cells: list[tuple[str, str]]) -> LessonSession:
+        """
+        Open a session (its process starts on the first run).
+
+        Room is made by closing the least recently used sessions that
+        aren't running a cell. Busy ones are never waited for, so the
+        count may go past ``max_sessions`` until they finish. Closing
+        waits for the processes to exit: call this off the event loop.
+        """
+        session = LessonSession(module_id, cells)
+        with self._lock:
+            evicted = self._take_idle()
+            excess = len(self._sessions) + 1 - self.max_sessions
+            for oldest in sorted(self._sessions.values(), key=lambda s: s.last_used):
+                if excess <= 0:
+                    break
+                if self._take(oldest):
+                    evicted.append(oldest)
+                    excess -= 1
+            self._sessions[session.id] = session
+        self._close_taken(evicted)
+        return session
+
+    def get(self, session_id: str) -> LessonSession | None:
+        """The open session, after closing idle ones (off the event loop, like create)."""
+        with self._lock:
+            idle = self._take_idle()
+            session = self._sessions.get(session_id)
+        self._close_taken(idle)
+        return session
+
+    def close(self, session_id: str) -> bool:
+        # Waits for a running cell without holding up create() and get()
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        with session.lock:
+            session.closed = True
+            session.close()
+        return True
+
+    def close_all(self) -> None:
+        with self._lock:
+            for session_id in list(self._sessions):
+                self._close(session_id)
+
+    def _close(self, session_id: str) -> bool:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        with session.lock:
+            session.closed = True
+            session.close()
+        return True
+
+    def _take(self, session: LessonSession) -> bool:
+        """
+        Remove ``session`` (manager lock held) unless it is running a cell;
+        its lock stays held until :meth:`_close_taken`, so no run can start.
+        """
+        if not session.lock.acquire(blocking=False):
+            return False
+        del self._sessions[session.id]
+        return True
+
+    def _take_idle(self) -> list[LessonSession]:
+        now = time.monotonic()
+        return [
+            session
+            for session in list(self._sessions.values())
+            if now - session.last_used > self.idle_timeout and self._take(session)
+        ]
+
+    @staticmethod
+    def _close_taken(sessions: list[LessonSession]) -> None:
+        for session in sessions:
+            try:
+                session.closed = True
+                session.close()
+            finally:
+                session.lock.release()
+
+
+_session_manager: SessionManager | None = None
+
+
+def get_session_manager() -> SessionManager:
+    """Get session manager singleton."""
+    global _session_manager
+    if _session_manager is None:
+        settings = get_settings()
+        _session_manager = SessionManager(settings.session_max_count, settings.session_idle_timeout)
+    return _session_manager
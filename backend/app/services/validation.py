@@ -1,16 +1,24 @@
 """Validation service for exercises."""
 import subprocess
-import tempfile
-import time
-from pathlib import Path
+import textwrap
 
+from ..concurrency import current_queue_wait, execution_pool, io_pool
+from ..config import get_settings
+from ..metrics import execution_timeouts
 from ..models import (
+    Module,
     ValidationRequest,
     ValidationResponse,
     ValidationResult,
     ValidationType,
 )
+from . import phases
+from .artifacts import default_store_path
 from .content import get_content_service
+from .execution import sandbox_preamble
+from .jobs import JobCancelled, Run, get_job_registry, new_job_id
+from .preflight import preflight
+from .sandboxes import get_sandbox_pool
 
 
 class ValidationService:
@@ -18,12 +26,78 @@ class ValidationService:
 
     def __init__(self, timeout: int = 10):
         self.timeout = timeout
+        settings = get_settings()
+        self.max_output_chars = settings.execution_max_output_chars
+        self.startup_grace = settings.execution_startup_grace
+        self.artifacts_dir = default_store_path()
+        self.sandboxes = get_sandbox_pool()
+        self.preflight = settings.execution_preflight
         self.content_service = get_content_service()
+        self.jobs = get_job_registry()
 
     def validate(self, request: ValidationRequest) -> ValidationResponse:
         """Validate user code against exercise tests."""
+        rejected = self._preflight(request.code)
+        if rejected is not None:
+            return rejected
         # Get exercise definition
         module = self.content_service.get_module(request.module_id)
+        return self._validate_module(request, module)
+
+    async def avalidate(self, request: ValidationRequest) -> ValidationResponse:
+        """
+        Async version of :meth:`validate`, run as a cancellable job (see
+        ``jobs.py``).
+
+        The preflight and the exercise loading run in the I/O pool and the
+        code runs in the execution pool, keeping the event loop free while
+        tests run. Code that can't run is answered before taking a sandbox.
+        """
+        job_id = request.job_id or new_job_id()
+        rejected = await io_pool.run(self._preflight, request.code)
+        if rejected is not None:
+            rejected.job_id = job_id
+            return rejected
+        run = Run()
+        with self.jobs.track(
+            job_id, "validate", run, self._supersede_key(request), request.client_id
+        ):
+            module = await self.content_service.aget_module(request.module_id)
+            response = await execution_pool.run(self._validate_module, request, module, run)
+        response.job_id = job_id
+        return response
+
+    def _supersede_key(self, request: ValidationRequest) -> tuple | None:
+        """Jobs with the same key replace each other: one client re-checking an exercise."""
+        if request.client_id is None:
+            return None
+        return ("validate", request.client_id, request.module_id, request.exercise_id)
+
+    def _preflight(self, code: str) -> ValidationResponse | None:
+        """Response for code answered without running it (empty or rejected)."""
+        if not self.preflight:
+            return None
+        result = preflight(code, self.timeout, "validate")
+        if result.ok:
+            return None
+        if result.empty:
+            return ValidationResponse(
+                result=ValidationResult.ERROR, error_message="No code to validate"
+            )
+        return ValidationResponse(
+            result=ValidationResult.ERROR,
+            error_message=result.message,
+            stderr=result.message,
+            diagnostics=result.diagnostics,
+        )
+
+    def _validate_module(
+        self, request: ValidationRequest, module: Module | None, run: Run | None = None
+    ) -> ValidationResponse:
+        """
+        Validate user code against an exercise of an already loaded module;
+        cancelling ``run`` kills the sandbox.
+        """
         if not module:
             return ValidationResponse(
                 result=ValidationResult.ERROR,
@@ -42,10 +116,10 @@ class ValidationService:
         tests = validation.get("tests", [])
 
         if validation_type == "assert":
-            return self._validate_with_asserts(request.code, tests)
+            return self._validate_with_asserts(request.code, tests, run)
         elif validation_type == "output":
             expected = validation.get("expected_output", "")
-            return self._validate_output(request.code, expected)
+            return self._validate_output(request.code, expected, run)
         else:
             return ValidationResponse(
                 result=ValidationResult.ERROR,
@@ -53,18 +127,22 @@ class ValidationService:
             )
 
     def _validate_with_asserts(
-        self, code: str, tests: list[str]
+        self, code: str, tests: list[str], run: Run | None = None
     ) -> ValidationResponse:
         """Run code and then run assertion tests."""
-        # Build test script
-        test_code = f"""
+        return self._execute_code(self._build_test_script(code, tests), len(tests), run=run)
+
+    def _build_test_script(self, code: str, tests: list[str]) -> str:
+        """Build the script that runs user code followed by each test."""
+        test_code = phases.PROLOGUE + f"""
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-
+{sandbox_preamble(self.artifacts_dir)}{phases.mark("imported")}{phases.start_budget(self.timeout)}
 # User code
 {code}
 
+{phases.mark("user_code_done")}
 # Tests
 _passed = 0
 _failed = []
@@ -72,31 +150,61 @@ _total = {len(tests)}
 
 """
         for i, test in enumerate(tests):
+            # Tests may span several lines (e.g. a "with" block)
+            body = textwrap.indent(test, "    ")
             test_code += f"""
 try:
-    {test}
+{body}
     _passed += 1
 except AssertionError as e:
-    _failed.append(("Test {i+1}", str(e) if str(e) else "{test}"))
+    _failed.append(("Test {i+1}", str(e) if str(e) else {test!r}))
 except Exception as e:
     _failed.append(("Test {i+1}", f"Error: {{type(e).__name__}}: {{e}}"))
 """
 
-        test_code += """
+        test_code += phases.mark("tests_done") + phases.stop_budget() + """
 print(f"PASSED:{_passed}/{_total}")
 if _failed:
     print("FAILURES:")
     for name, msg in _failed:
         print(f"  {name}: {msg}")
-"""
+""" + phases.EPILOGUE
+        return test_code
+
+    def _parse_test_output(self, stdout: str) -> tuple[int, str]:
+        """Parse (passed tests, failure feedback) from the test script output."""
+        passed = 0
+        feedback = ""
+
+        for line in stdout.split("\n"):
+            if line.startswith("PASSED:"):
+                parts = line.replace("PASSED:", "").split("/")
+                if len(parts) == 2:
+                    passed = int(parts[0])
+            elif line.startswith("FAILURES:") or line.startswith("  "):
+                feedback += line + "\n"
 
-        return self._execute_code(test_code, len(tests))
+        return passed, feedback
 
-    def _validate_output(self, code: str, expected: str) -> ValidationResponse:
+    def _validate_output(
+        self, code: str, expected: str, run: Run | None = None
+    ) -> ValidationResponse:
         """Validate that code output matches expected output."""
-        result = self._execute_code(code, 1, check_output=True)
+        script = (
+            phases.PROLOGUE
+            + phases.mark("imported")
+            + phases.start_budget(self.timeout)
+            + code
+            + "\n"
+            + phases.mark("user_code_done")
+            + phases.stop_budget()
+            + phases.EPILOGUE
+        )
+        result = self._execute_code(script, 1, check_output=True, run=run)
 
-        if result.result == ValidationResult.ERROR:
+        if result.result in (
+            ValidationResult.ERROR, ValidationResult.TIMEOUT, ValidationResult.CANCELLED
+        ):
             return result
 
         # Compare output (strip whitespace)
@@ -110,6 +218,7 @@ if _failed:
                 total_tests=1,
                 feedback="Output matches expected result!",
                 stdout=result.stdout,
+                timing=result.timing,
             )
         else:
             return ValidationResponse(
@@ -118,32 +227,43 @@ if _failed:
                 total_tests=1,
                 feedback=f"Output doesn't match.\nExpected:\n{expected}\n\nGot:\n{actual}",
                 stdout=result.stdout,
+                timing=result.timing,
             )
 
     def _execute_code(
-        self, code: str, total_tests: int, check_output: bool = False
+        self, code: str, total_tests: int, check_output: bool = False, run: Run | None = None
     ) -> ValidationResponse:
-        """Execute code in a subprocess with timeout."""
-        start_time = time.time()
+        """
+        Execute code in a pre-warmed sandbox with timeout.
 
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".py", delete=False
-        ) as f:
-            f.write(code)
-            script_path = f.name
+        ``self.timeout`` is the budget for the user code and tests; the
+        process gets an extra startup grace for interpreter boot and imports.
+        """
+        timer = phases.PhaseTimer("validate", current_queue_wait())
 
         try:
-            result = subprocess.run(
-                ["python", script_path],
-                capture_output=True,
-                text=True,
-                timeout=self.timeout,
-                cwd=tempfile.gettempdir(),
-            )
+            timer.spawning()
+            result = self.sandboxes.run(code, self.timeout + self.startup_grace, run)
+            timer.returned()
+
+            stdout, marks = phases.split_timings(result.stdout)
+            timer.add_marks(marks)
+            # Test results are at the end of stdout, so parse before truncating
+            passed, feedback = self._parse_test_output(stdout)
+            stdout = phases.truncate_output(stdout, self.max_output_chars, "validate")
+            stderr = phases.truncate_output(result.stderr, self.max_output_chars, "validate")
+            timer.parsed()
+            timing = timer.record()
 
-            execution_time = time.time() - start_time
-            stdout = result.stdout
-            stderr = result.stderr
+            if timer.timed_out:
+                execution_timeouts.inc(kind="validate")
+                return ValidationResponse(
+                    result=ValidationResult.TIMEOUT,
+                    total_tests=total_tests,
+                    error_message=f"Code execution timed out after {self.timeout} seconds",
+                    stdout=stdout,
+                    timing=timing,
+                )
 
             if result.returncode != 0:
                 return ValidationResponse(
@@ -152,6 +272,7 @@ if _failed:
                     error_message=stderr or "Execution failed",
                     stdout=stdout,
                     stderr=stderr,
+                    timing=timing,
                 )
 
             if check_output:
@@ -161,20 +282,9 @@ if _failed:
                     total_tests=1,
                     stdout=stdout,
                     stderr=stderr,
+                    timing=timing,
                 )
 
-            # Parse test results from output
-            passed = 0
-            feedback = ""
-
-            for line in stdout.split("\n"):
-                if line.startswith("PASSED:"):
-                    parts = line.replace("PASSED:", "").split("/")
-                    if len(parts) == 2:
-                        passed = int(parts[0])
-                elif line.startswith("FAILURES:") or line.startswith("  "):
-                    feedback += line + "\n"
-
             if passed == total_tests:
                 return ValidationResponse(
                     result=ValidationResult.PASSED,
@@ -183,6 +293,7 @@ if _failed:
                     feedback="All tests passed!",
                     stdout=stdout,
                     stderr=stderr,
+                    timing=timing,
                 )
             else:
                 return ValidationResponse(
@@ -192,13 +303,24 @@ if _failed:
                     feedback=feedback.strip() or "Some tests failed",
                     stdout=stdout,
                     stderr=stderr,
+                    timing=timing,
                 )
 
         except subprocess.TimeoutExpired:
+            # Stuck before the budget timer could fire (startup or native code)
+            timer.returned()
+            execution_timeouts.inc(kind="validate")
             return ValidationResponse(
                 result=ValidationResult.TIMEOUT,
                 total_tests=total_tests,
                 error_message=f"Code execution timed out after {self.timeout} seconds",
+                timing=timer.record(),
+            )
+        except JobCancelled:
+            return ValidationResponse(
+                result=ValidationResult.CANCELLED,
+                total_tests=total_tests,
+                error_message="Validation cancelled",
             )
         except Exception as e:
             return ValidationResponse(
@@ -206,9 +328,6 @@ if _failed:
                 total_tests=total_tests,
                 error_message=f"Execution error: {str(e)}",
             )
-        finally:
-            # Clean up temp file
-            Path(script_path).unlink(missing_ok=True)
 
 
 def get_validation_service() -> ValidationService:
@@ -0,0 +1,165 @@
+"""
+Execution worker agent.
+
+Runs code executions for the API's dispatcher (see ``dispatcher.py``),
+so the CPU-heavy work can be scaled on other machines::
+
+    python -m app.services.worker_agent --connect api-host:8765 --capacity 4
+
+Several agents can share one machine, each with its own ``--name``. An
+agent reconnects with backoff whenever the connection to the dispatcher
+is lost.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+
+from ..concurrency import BlockingPool
+from ..config import get_settings
+from ..models import CodeExecutionRequest, CodeExecutionResponse
+from .dispatcher import MAX_MESSAGE_BYTES, read_message, send_message
+from .execution import ExecutionService
+from .jobs import Run
+from .sandboxes import get_sandbox_pool
+
+HEARTBEAT_INTERVAL = 5.0  # seconds, well under the dispatcher's heartbeat timeout
+MAX_RECONNECT_DELAY = 30.0  # seconds
+
+
+class AgentRejected(Exception):
+    """The dispatcher refused the registration (bad token or message)."""
+
+
+class WorkerAgent:
+    """Connects to a dispatcher and runs up to ``capacity`` jobs at a time."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        name: str,
+        capacity: int,
+        token: str | None = None,
+        service: ExecutionService | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.name = name
+        self.capacity = capacity
+        self.token = token
+        self.service = service or ExecutionService()
+        self.pool = BlockingPool("agent", capacity)
+        # Runs of the jobs in progress, by job id, for cancel messages
+        self.runs: dict[str, Run] = {}
+
+    async def run(self) -> None:
+        """Serve jobs forever, reconnecting when the dispatcher goes away."""
+        delay = 1.0
+        while True:
+            try:
+                await self.serve()
+                delay = 1.0
+            except (ConnectionError, OSError, ValueError) as e:
+                print(f"Dispatcher connection failed: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    async def serve(self) -> None:
+        """Register with the dispatcher and run jobs until the connection closes."""
+        reader, writer = await asyncio.open_connection(
+            self.host, self.port, limit=MAX_MESSAGE_BYTES
+        )
+        jobs: set[asyncio.Task] = set()
+        heartbeat = None
+        try:
+            await send_message(
+                writer,
+                {"type": "register", "name": self.name, "capacity": self.capacity, "token": self.token},
+            )
+            reply = await read_message(reader)
+            if not reply or reply.get("type") != "registered":
+                raise AgentRejected((reply or {}).get("reason", "connection closed"))
+            print(f"Registered with {self.host}:{self.port} as '{self.name}' ({self.capacity} slots)")
+
+            heartbeat = asyncio.create_task(self._heartbeat(writer))
+            while (message := await read_message(reader)) is not None:
+                if message.get("type") == "job":
+                    run = self.runs[message["id"]] = Run()
+                    task = asyncio.create_task(self._run_job(writer, message, run))
+                    jobs.add(task)
+                    task.add_done_callback(jobs.discard)
+                elif message.get("type") == "cancel":
+                    run = self.runs.get(message.get("id"))
+                    if run is not None:
+                        run.cancel()
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            for task in jobs:
+                task.cancel()
+            # The dispatcher retries these jobs elsewhere; free their sandboxes
+            for run in list(self.runs.values()):
+                run.cancel()
+            writer.close()
+
+    async def _heartbeat(self, writer: asyncio.StreamWriter) -> None:
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            await send_message(writer, {"type": "heartbeat"})
+
+    async def _run_job(self, writer: asyncio.StreamWriter, message: dict, run: Run) -> None:
+        try:
+            request = CodeExecutionRequest.model_validate(message["request"])
+            response, figures = await self.pool.run(self.service.run_job, request, run)
+        except Exception as e:
+            response = CodeExecutionResponse(success=False, error=f"Execution error: {str(e)}")
+            figures = []
+        finally:
+            self.runs.pop(message["id"], None)
+        await send_message(
+            writer,
+            {
+                "type": "result",
+                "id": message["id"],
+                "response": response.model_dump(mode="json"),
+                "figures": figures,
+            },
+        )
+
+
+def main() -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Run code executions for a remote API")
+    parser.add_argument(
+        "--connect",
+        default=f"127.0.0.1:{settings.dispatcher_port}",
+        help="Dispatcher address (host:port)",
+    )
+    parser.add_argument("--name", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument(
+        "--capacity", type=int, default=os.cpu_count() or 1, help="Jobs run at the same time"
+    )
+    parser.add_argument("--token", default=settings.dispatcher_token)
+    args = parser.parse_args()
+
+    host, _, port = args.connect.rpartition(":")
+    agent = WorkerAgent(host or "127.0.0.1", int(port), args.name, args.capacity, args.token)
+    # Sandboxes warm up while the agent registers
+    sandboxes = get_sandbox_pool()
+    sandboxes.fill()
+    try:
+        asyncio.run(agent.run())
+    except AgentRejected as e:
+        print(f"Registration rejected: {e}")
+        return 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sandboxes.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Benchmark docs page extraction over the saved page corpus.
+
+For every page in ``docs_corpus/`` this records the extraction time, how
+much of the page had to be scanned, and whether the result matches
+``expected.json``.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.docs_extraction
+    python -m benchmarks.docs_extraction --output results.json
+    python -m benchmarks.docs_extraction --save torch.nn.Conv2d page.html
+"""
+import argparse
+import gzip
+import json
+import shutil
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from app.services.docs_extract import DocsExtractor, extract_doc_summary
+
+CORPUS_DIR = Path(__file__).parent / "docs_corpus"
+EXPECTED_FILE = CORPUS_DIR / "expected.json"
+
+
+def load_corpus() -> dict[str, str]:
+    """Load every saved page, keyed by symbol."""
+    return {
+        path.name.removesuffix(".html.gz"): gzip.open(path, "rt", encoding="utf-8").read()
+        for path in sorted(CORPUS_DIR.glob("*.html.gz"))
+    }
+
+
+def load_expected() -> dict[str, dict]:
+    return json.loads(EXPECTED_FILE.read_text(encoding="utf-8"))
+
+
+def scanned_bytes(html: str, symbol: str, chunk_size: int) -> int:
+    """How many characters were fed before extraction finished."""
+    extractor = DocsExtractor(symbol)
+    for start in range(0, len(html), chunk_size):
+        extractor.feed(html[start : start + chunk_size])
+        if extractor.done:
+            break
+    return extractor.bytes_fed
+
+
+def run(repeat: int, chunk_size: int) -> list[dict]:
+    """Benchmark every corpus page."""
+    expected = load_expected()
+    results = []
+    for symbol, html in load_corpus().items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            signature, description = extract_doc_summary(html, symbol, chunk_size)
+            timings.append(time.perf_counter() - start)
+
+        want = expected.get(symbol)
+        results.append(
+            {
+                "symbol": symbol,
+                "page_bytes": len(html),
+                "scanned_bytes": scanned_bytes(html, symbol, chunk_size),
+                "median_ms": round(statistics.median(timings) * 1000, 3),
+                "max_ms": round(max(timings) * 1000, 3),
+                "correct": want is not None
+                and want == {"signature": signature, "description": description},
+            }
+        )
+    return results
+
+
+def save_page(symbol: str, source: Path) -> None:
+    """Add a saved docs page to the corpus and record its current extraction."""
+    target = CORPUS_DIR / f"{symbol}.html.gz"
+    with open(source, "rb") as src, gzip.open(target, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+
+    html = source.read_text(encoding="utf-8")
+    signature, description = extract_doc_summary(html, symbol)
+    expected = load_expected()
+    expected[symbol] = {"signature": signature, "description": description}
+    EXPECTED_FILE.write_text(
+        json.dumps(dict(sorted(expected.items())), indent=2, ensure_ascii=False) + "\n",
+        encoding="utf-8",
+    )
+    print(f"Saved {target.name}; review the recorded values in expected.json:")
+    print(f"  signature:   {signature}")
+    print(f"  description: {description}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--save", nargs=2, metavar=("SYMBOL", "HTML_FILE"))
+    args = parser.parse_args()
+
+    if args.save:
+        save_page(args.save[0], Path(args.save[1]))
+        return 0
+
+    results = run(args.repeat, args.chunk_size)
+    print(f"{'symbol':<32} {'page KB':>8} {'scanned':>8} {'median ms':>10} {'max ms':>8}  ok")
+    for r in results:
+        print(
+            f"{r['symbol']:<32} {r['page_bytes'] / 1024:>8.1f} "
+            f"{r['scanned_bytes'] / r['page_bytes']:>8.0%} "
+            f"{r['median_ms']:>10.3f} {r['max_ms']:>8.3f}  {'✓' if r['correct'] else '✗'}"
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+    return 0 if all(r["correct"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,356 @@
+"""
+End-to-end load test for the API.
+
+Virtual learners (a closed loop of ``concurrency`` clients) replay a mix of
+requests built from the course content: curriculum and module page loads,
+lesson cells sent to ``/api/execute`` and exercise submissions sent to
+``/api/validate``. Each concurrency level reports throughput, p50/p95/p99
+latency and the error rate, overall and per endpoint.
+
+The app runs in-process by default (through ``httpx.ASGITransport``, with
+its lifespan), so client and server share one event loop; use ``--spawn``
+to start a local uvicorn instance, or ``--url`` to target a running one.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.load
+    python -m benchmarks.load --concurrency 1,8,32 --duration 20 --spawn
+    python -m benchmarks.load --save-baseline      # record benchmarks/baselines/load.json
+    python -m benchmarks.load --compare            # fail if slower than the baseline
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+
+from app.mdx import extract_code_cells
+from app.services.content import get_content_service
+
+BASELINE_FILE = Path(__file__).parent / "baselines" / "load.json"
+VERIFY_CONTENT_SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "verify-content.py"
+
+# Share of requests per endpoint, roughly what a learner does on a lesson page
+DEFAULT_MIX = {"curriculum": 0.2, "module": 0.35, "execute": 0.3, "validate": 0.15}
+
+
+
+@dataclass
+class Request:
+    """One request of the workload."""
+
+    endpoint: str
+    method: str
+    path: str
+    body: dict | None = None
+
+
+def _complete_starter():
+    """
+    ``complete_starter`` from scripts/verify-content.py, which splices an
+    exercise's solution into the holes of its starterCode (the script
+    only imports torch in its worker processes).
+    """
+    spec = importlib.util.spec_from_file_location("verify_content", VERIFY_CONTENT_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.complete_starter
+
+
+def build_workload() -> dict[str, list[Request]]:
+    """Requests per endpoint, taken from the real lessons and exercises."""
+    content = get_content_service()
+    complete_starter = _complete_starter()
+    workload: dict[str, list[Request]] = defaultdict(list)
+    workload["curriculum"].append(Request("curriculum", "GET", "/api/curriculum"))
+
+    for module_id in content.get_module_ids():
+        module = content.get_module(module_id)
+        if module is None:
+            continue
+        workload["module"].append(Request("module", "GET", f"/api/modules/{module_id}"))
+
+        for _, code in extract_code_cells(module.content):
+            workload["execute"].append(Request("execute", "POST", "/api/execute", {"code": code, "timeout": 10}))
+
+        for exercise_id, exercise in module.exercises.items():
+            # A finished submission: the starter with the solution filled in
+            code = complete_starter(exercise.get("starterCode", ""), exercise.get("solution", ""))
+            workload["validate"].append(
+                Request(
+                    "validate",
+                    "POST",
+                    "/api/validate",
+                    {
+                        "module_id": module_id,
+                        "exercise_id": exercise_id,
+                        "code": code,
+                    },
+                )
+            )
+
+    return dict(workload)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (which must be sorted)."""
+    if not values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(values) + 0.5))
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(samples: list[tuple[str, float, bool]], elapsed: float) -> dict:
+    """Throughput, latency percentiles (ms) and error rate of some samples."""
+    latencies = sorted(latency for _, latency, _ in samples)
+    errors = sum(not ok for _, _, ok in samples)
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+    }
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    workload: dict[str, list[Request]],
+    mix: dict[str, float],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> dict:
+    """Drive ``concurrency`` virtual learners for ``duration`` seconds."""
+    endpoints = [e for e in mix if workload.get(e)]
+    weights = [mix[e] for e in endpoints]
+    samples: list[tuple[str, float, bool]] = []
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def learner(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < stop_at:
+            endpoint = rng.choices(endpoints, weights)[0]
+            request = rng.choice(workload[endpoint])
+            start = time.perf_counter()
+            try:
+                response = await client.request(request.method, request.path, json=request.body)
+                # Failed validations and user code errors are normal answers
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            # Requests started during the warm-up are not measured
+            if start >= measure_from:
+                samples.append((endpoint, time.perf_counter() - start, ok))
+
+    await asyncio.gather(*(learner(i) for i in range(concurrency)))
+    # Requests in flight at the deadline are awaited and counted
+    elapsed = time.perf_counter() - measure_from
+
+    by_endpoint = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample[0]].append(sample)
+    return {
+        "concurrency": concurrency,
+        **summarize(samples, elapsed),
+        "endpoints": {e: summarize(s, elapsed) for e, s in sorted(by_endpoint.items())},
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def open_client(url: str | None, spawn: bool, timeout: float):
+    """HTTP client for the target: in-process app, spawned uvicorn or a URL."""
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+            yield client
+        return
+
+    if spawn:
+        port = _free_port()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=Path(__file__).parent.parent,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+                for _ in range(100):
+                    try:
+                        await client.get("/health")
+                        break
+                    except httpx.TransportError:
+                        await asyncio.sleep(0.1)
+                else:
+                    raise RuntimeError("uvicorn did not start")
+                yield client
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+        return
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark", timeout=timeout
+        ) as client:
+            yield client
+
+
+def target_name(args: argparse.Namespace) -> str:
+    return "url" if args.url else "uvicorn" if args.spawn else "in-process"
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    """Regressions against the baseline for the same concurrency levels."""
+    regressions = []
+    levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    for level in results:
+        base = levels.get(level["concurrency"])
+        if base is None:
+            continue
+        name = f"c={level['concurrency']}"
+        if level["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']} ms -> {level['p95_ms']} ms")
+        if level["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {base['throughput_rps']} -> {level['throughput_rps']} req/s"
+            )
+        if level["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{name}: error rate {base['error_rate']} -> {level['error_rate']}")
+    return regressions
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, value.split(",")):
+        endpoint, _, weight = part.partition("=")
+        if endpoint not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown endpoint '{endpoint}'")
+        mix[endpoint] = float(weight)
+    return mix
+
+
+async def run(args: argparse.Namespace) -> list[dict]:
+    workload = build_workload()
+    print(
+        "Workload: "
+        + ", ".join(f"{len(workload.get(e, []))} {e}" for e in DEFAULT_MIX)
+        + f" requests; target: {target_name(args)}"
+    )
+    results = []
+    async with open_client(args.url, args.spawn, args.timeout) as client:
+        for concurrency in args.concurrency:
+            level = await run_level(
+                client, workload, args.mix, concurrency, args.duration, args.warmup, args.seed
+            )
+            results.append(level)
+            print(
+                f"c={concurrency:<4} {level['throughput_rps']:>8.2f} req/s  "
+                f"p50 {level['p50_ms']:>8.1f}  p95 {level['p95_ms']:>8.1f}  "
+                f"p99 {level['p99_ms']:>8.1f} ms  errors {level['error_rate']:.2%}"
+            )
+            for endpoint, stats in level["endpoints"].items():
+                print(
+                    f"    {endpoint:<11} {stats['requests']:>6}  "
+                    f"p50 {stats['p50_ms']:>8.1f}  p95 {stats['p95_ms']:>8.1f}  "
+                    f"p99 {stats['p99_ms']:>8.1f} ms  errors {stats['error_rate']:.2%}"
+                )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--concurrency",
+        type=lambda v: [int(c) for c in v.split(",")],
+        default=[1, 4, 16],
+        help="Comma-separated concurrency levels",
+    )
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds per level")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=dict(DEFAULT_MIX),
+        help="Endpoint weights, e.g. execute=0.5,validate=0.1",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout (s)")
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--spawn", action="store_true", help="Start a local uvicorn instance")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="Fail on regressions vs the baseline")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="Allowed p95/throughput change (fraction)"
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    report = {
+        "target": target_name(args),
+        "cpu_count": os.cpu_count(),
+        "duration": args.duration,
+        "mix": args.mix,
+        "levels": results,
+    }
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    if args.save_baseline:
+        baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        baselines[report["target"]] = report
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baselines, indent=2) + "\n", encoding="utf-8")
+        print(f"Saved baseline for '{report['target']}' to {args.baseline}")
+
+    if args.compare:
+        baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        baseline = baselines.get(report["target"])
+        if baseline is None:
+            print(f"No '{report['target']}' baseline in {args.baseline}")
+            return 1
+        if baseline.get("cpu_count") != report["cpu_count"]:
+            print(
+                f"Warning: baseline was recorded with {baseline.get('cpu_count')} CPUs, "
+                f"this machine has {report['cpu_count']}"
+            )
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Micro-benchmarks for backend hot paths, with stored baselines.
+
+Each benchmark times one internal operation in isolation (content parsing,
+response serialization, validation script building and output parsing,
+docs extraction, execution output parsing). Timings are divided by a fixed
+pure-Python reference workload measured in the same run, so baselines
+recorded on one machine can be checked on another.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.micro
+    python -m benchmarks.micro --filter validation
+    python -m benchmarks.micro --save-baseline     # record benchmarks/baselines/micro.json
+    python -m benchmarks.micro --compare           # fail on regressions
+
+``tests/test_benchmarks.py`` runs the same comparison under pytest (with
+``pytest -m benchmark``; the default run deselects it).
+"""
+import argparse
+import gzip
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+BASELINE_FILE = Path(__file__).parent / "baselines" / "micro.json"
+CORPUS_DIR = Path(__file__).parent / "docs_corpus"
+
+# Allowed slowdown relative to the baseline before a benchmark fails
+DEFAULT_TOLERANCE = 0.5
+
+# Module with the most content and exercises, used for the per-module paths
+SAMPLE_MODULE = "18-attention-transformers"
+
+BENCHMARKS: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    """Register a setup function returning the callable to time."""
+
+    def register(setup: Callable[[], Callable[[], object]]):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+@benchmark("content.get_curriculum")
+def _content_curriculum():
+    from app.services.content import ContentService
+
+    return ContentService().get_curriculum
+
+
+@benchmark("content.get_module")
+def _content_module():
+    from app.services.content import ContentService
+
+    service = ContentService()
+    return lambda: service.get_module(SAMPLE_MODULE)
+
+
+@benchmark("models.module_serialization")
+def _module_serialization():
+    from app.services.content import ContentService
+
+    module = ContentService().get_module(SAMPLE_MODULE)
+    return module.model_dump_json
+
+
+def _largest_exercise() -> tuple[str, list[str]]:
+    from app.services.content import ContentService
+
+    service = ContentService()
+    exercises = [
+        exercise
+        for module_id in service.get_module_ids()
+        for exercise in service.get_module(module_id).exercises.values()
+    ]
+    exercise = max(exercises, key=lambda e: len(e["validation"].get("tests", [])))
+    return exercise["starterCode"] + "\n" + exercise["solution"], exercise["validation"]["tests"]
+
+
+@benchmark("validation.build_test_script")
+def _validation_build():
+    from app.services.validation import ValidationService
+
+    service = ValidationService()
+    code, tests = _largest_exercise()
+    return lambda: service._build_test_script(code, tests)
+
+
+@benchmark("validation.parse_test_output")
+def _validation_parse():
+    from app.services.validation import ValidationService
+
+    service = ValidationService()
+    # User prints followed by the test summary of a partially failing run
+    stdout = "".join(f"epoch {i}: loss={1 / (i + 1):.4f}\n" for i in range(200))
+    stdout += "PASSED:3/5\nFAILURES:\n"
+    stdout += "  Test 2: Shape incorreto: esperado (3, 4), obtido (4, 3)\n"
+    stdout += "  Test 5: Error: NameError: name 'y' is not defined\n"
+    return lambda: service._parse_test_output(stdout)
+
+
+def _corpus_page(symbol: str) -> str:
+    return gzip.open(CORPUS_DIR / f"{symbol}.html.gz", "rt", encoding="utf-8").read()
+
+
+@benchmark("docs.extract.module_page")
+def _docs_module_page():
+    from app.services.docs_extract import extract_doc_summary
+
+    html = _corpus_page("torch.nn.Module")
+    return lambda: extract_doc_summary(html, "torch.nn.Module")
+
+
+@benchmark("docs.extract.unclosed_paragraphs")
+def _docs_unclosed():
+    from app.services.docs_extract import extract_doc_summary
+
+    html = _corpus_page("torch.Tensor.view")
+    return lambda: extract_doc_summary(html, "torch.Tensor.view")
+
+
+@benchmark("execution.parse_output")
+def _execution_parse():
+    from app.services.execution import ExecutionService
+
+    service = ExecutionService()
+    stdout = "tensor([[0.1234, 0.5678, 0.9012]])\n" * 2000
+    output = f"__STDOUT_START__{stdout}__STDOUT_END____STDERR_START__warning\n__STDERR_END__"
+    return lambda: service._parse_output(output)
+
+
+def _reference() -> int:
+    """Fixed pure-Python workload used to normalize timings across machines."""
+    total = 0
+    for i in range(2000):
+        total += len(str(i * i).zfill(8).replace("0", ""))
+    return total
+
+
+def measure(func: Callable[[], object], rounds: int = 7, min_time: float = 0.05) -> float:
+    """Best time per call in seconds, timeit-style."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - start >= min_time:
+            break
+        loops *= 2
+
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+
+def measure_reference() -> float:
+    return measure(_reference)
+
+
+def run(names: list[str] | None = None) -> dict:
+    """Time the given benchmarks (all by default) and the reference workload."""
+    reference = measure_reference()
+    results = {}
+    for name in names or sorted(BENCHMARKS):
+        seconds = measure(BENCHMARKS[name]())
+        results[name] = {
+            "us": round(seconds * 1e6, 3),
+            "relative": round(seconds / reference, 5),
+        }
+    return {"reference_us": round(reference * 1e6, 3), "benchmarks": results}
+
+
+def load_baseline(path: Path = BASELINE_FILE) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def slowdown(result: dict, baseline: dict) -> float:
+    """How many times slower than the baseline, after normalization."""
+    return result["relative"] / baseline["relative"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filter", default="", help="Only run benchmarks containing this text")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="Fail on regressions vs the baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    names = [name for name in sorted(BENCHMARKS) if args.filter in name]
+    report = run(names)
+    baseline = load_baseline(args.baseline).get("benchmarks", {})
+
+    print(f"reference workload: {report['reference_us']:.1f} us")
+    print(f"{'benchmark':<36} {'us/call':>12} {'vs baseline':>12}")
+    regressions = []
+    for name, result in report["benchmarks"].items():
+        change = ""
+        if name in baseline:
+            ratio = slowdown(result, baseline[name])
+            change = f"{ratio:.2f}x"
+            if ratio > 1 + args.tolerance:
+                regressions.append(name)
+                change += " !"
+        print(f"{name:<36} {result['us']:>12.2f} {change:>12}")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    if args.save_baseline:
+        saved = load_baseline(args.baseline)
+        saved["reference_us"] = report["reference_us"]
+        saved.setdefault("benchmarks", {}).update(report["benchmarks"])
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(saved, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Saved baseline to {args.baseline}")
+
+    if args.compare and regressions:
+        print(f"Slower than the baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,11 @@
 """Tests for the API endpoints."""
+from types import SimpleNamespace
+
 import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.services.content import get_content_service
 
 client = TestClient(app)
 
@@ -62,6 +65,13 @@ def test_validate_exercise_module_not_found():
     data = response.json()
     assert data["result"] == "error"
     assert "not found" in data["error_message"].lower()
+    assert data["job_id"]
+
+
+def test_cancel_unknown_job():
+    """Test cancelling a job that isn't running."""
+    response = client.post("/api/jobs/nonexistent/cancel")
+    assert response.status_code == 404
 
 
 def test_docs_cached_symbols():
@@ -71,3 +81,72 @@ def test_docs_cached_symbols():
     data = response.json()
     assert "cached_symbols" in data
     assert isinstance(data["cached_symbols"], list)
+    assert "hit_ratio" in data["stats"]
+
+
+def test_module_prerequisites():
+    """Test transitive prerequisites endpoint."""
+    response = client.get("/api/modules/18-attention-transformers/prerequisites")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["module_id"] == "18-attention-transformers"
+    prereqs = data["prerequisites"]
+    assert "17-rnns-lstm" in prereqs
+    assert "01-tensors" in prereqs
+    assert prereqs.index("01-tensors") < prereqs.index("17-rnns-lstm")
+    assert data["total_estimated_minutes"] > 0
+
+
+def test_module_prerequisites_not_found():
+    """Test prerequisites of a non-existent module."""
+    response = client.get("/api/modules/nonexistent-module/prerequisites")
+    assert response.status_code == 404
+
+
+def test_invalid_prerequisites_are_named(monkeypatch):
+    """Test that a prerequisite cycle in the content is a 409 naming the modules."""
+    service = get_content_service()
+    modules = [
+        SimpleNamespace(id="a", prerequisites=["b"]),
+        SimpleNamespace(id="b", prerequisites=["a"]),
+    ]
+    monkeypatch.setattr(service, "_graph", None)
+    monkeypatch.setattr(service, "_load_all_metadata", lambda: modules)
+
+    for url in ("/api/modules/a/prerequisites", "/api/modules/a/unlocks", "/api/learning-path/next"):
+        response = client.get(url)
+        assert response.status_code == 409
+        assert response.json()["detail"] == (
+            "Invalid module prerequisites: Prerequisite cycle detected: a -> b -> a"
+        )
+
+
+def test_module_unlocks():
+    """Test direct dependents endpoint."""
+    response = client.get("/api/modules/17-rnns-lstm/unlocks")
+    assert response.status_code == 200
+    assert response.json() == ["18-attention-transformers"]
+
+
+def test_next_modules():
+    """Test next available modules endpoint."""
+    response = client.get("/api/learning-path/next")
+    assert response.status_code == 200
+    assert response.json() == ["01-tensors"]
+
+    response = client.get("/api/learning-path/next?completed=01-tensors")
+    assert response.status_code == 200
+    assert response.json() == ["02-tensor-operations"]
+
+
+def test_docs_batch_validation():
+    """Test batch docs endpoint rejects an empty symbol list."""
+    response = client.post("/api/docs/pytorch-batch", json={"symbols": []})
+    assert response.status_code == 422
+
+
+def test_doc_symbols_from_content():
+    """Test DocRef symbols are collected from lessons."""
+    symbols = get_content_service().get_doc_symbols()
+    assert "torch.nn.Linear" in symbols
+    assert symbols == sorted(set(symbols))
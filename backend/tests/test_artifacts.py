@@ -0,0 +1,57 @@
+"""Tests for the read-only artifact store."""
+import numpy as np
+import pytest
+import torch
+
+from app.sandbox import academy
+from app.services.artifacts import ArtifactStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ArtifactStore(tmp_path)
+    store.add_tensors(
+        "points",
+        {"inputs": torch.arange(12.0).reshape(6, 2), "targets": torch.arange(6)},
+        kind="dataset",
+        description="six points",
+    )
+    store.add_array("table", np.arange(10, dtype=np.float32), description="a row")
+    academy.use_store(tmp_path)
+    yield store
+    academy.use_store(tmp_path / "missing")
+
+
+def test_manifest_records_files_and_checksums(store):
+    """Every artifact is listed with its file, size and checksum."""
+    manifest = store.manifest()
+    assert set(manifest) == {"points", "table"}
+    assert manifest["points"]["format"] == "torch"
+    assert manifest["table"]["format"] == "numpy"
+    assert all(len(entry["sha256"]) == 64 for entry in manifest.values())
+    assert store.verify() == []
+
+    (store.path / "table.npy").write_bytes(b"corrupted")
+    assert store.verify() == ["table"]
+
+
+def test_academy_maps_artifacts_copy_on_write(store):
+    """Workers get mapped tensors; writes stay private to the process."""
+    assert academy.artifacts() == {"points": "six points", "table": "a row"}
+    dataset = academy.dataset("points")
+    assert len(dataset) == 6
+    assert dataset[5][1].item() == 5
+
+    data = academy.load("points")
+    data["inputs"][0, 0] = 100.0
+    academy.use_store(store.path)
+    assert academy.load("points")["inputs"][0, 0].item() == 0.0
+
+    table = academy.load("table")
+    assert isinstance(table, np.memmap)
+    assert not table.flags.writeable
+
+
+def test_unknown_artifact_lists_available_names(store):
+    with pytest.raises(KeyError, match="points, table"):
+        academy.load("imagenet")
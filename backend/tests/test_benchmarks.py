@@ -0,0 +1,36 @@
+"""Regression gate for the micro-benchmarks in benchmarks/micro.py."""
+import os
+
+import pytest
+
+from benchmarks import micro
+
+pytestmark = pytest.mark.benchmark
+
+TOLERANCE = float(os.environ.get("BENCHMARK_TOLERANCE", micro.DEFAULT_TOLERANCE))
+BASELINE = micro.load_baseline().get("benchmarks", {})
+
+
+@pytest.fixture(scope="module")
+def reference() -> float:
+    return micro.measure_reference()
+
+
+@pytest.mark.parametrize("name", sorted(micro.BENCHMARKS))
+def test_hot_path_not_slower_than_baseline(name, reference):
+    """Each hot path stays within the tolerance of its stored baseline."""
+    if name not in BASELINE:
+        pytest.skip(f"no baseline for {name}; run python -m benchmarks.micro --save-baseline")
+
+    func = micro.BENCHMARKS[name]()
+    ratio = micro.measure(func) / reference / BASELINE[name]["relative"]
+    if ratio > 1 + TOLERANCE:
+        # Re-measure once (with a fresh reference) before failing on noise
+        ratio = min(
+            ratio,
+            micro.measure(func) / micro.measure_reference() / BASELINE[name]["relative"],
+        )
+    assert ratio <= 1 + TOLERANCE, (
+        f"{name} is {ratio:.2f}x its baseline (tolerance {TOLERANCE:.0%}); if the "
+        f"slowdown is intended, run python -m benchmarks.micro --save-baseline"
+    )
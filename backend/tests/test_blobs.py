@@ -0,0 +1,56 @@
+"""Tests for the content-addressed blob store and its endpoint."""
+import os
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import blobs
+from app.services.blobs import BlobStore
+
+
+def test_put_deduplicates_by_content(tmp_path):
+    """The same bytes are stored once under their hash."""
+    store = BlobStore(tmp_path, max_bytes=1_000)
+    first = store.put(b"figure", "png")
+    assert store.put(b"figure", "png") == first
+    assert store.put(b"other", "png") != first
+    assert store.get_path(first).read_bytes() == b"figure"
+    assert store.stats() == {"blobs": 2, "bytes": len(b"figure") + len(b"other")}
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    """Going over the limit evicts the oldest blobs down to the watermark."""
+    store = BlobStore(tmp_path, max_bytes=250)
+    old, recent = (store.put(bytes([i]) * 100, "png") for i in range(2))
+    os.utime(store.get_path(old), (0, 0))
+    os.utime(store.get_path(recent), (0, 0))
+    # Storing the same figure again marks it as recently used
+    store.put(bytes([1]) * 100, "png")
+
+    store.put(bytes([2]) * 100, "png")
+    assert store.get_path(old) is None
+    assert store.get_path(recent) is not None
+    assert store.stats() == {"blobs": 2, "bytes": 200}
+
+
+def test_get_path_rejects_malformed_ids(tmp_path):
+    store = BlobStore(tmp_path, max_bytes=1_000)
+    assert store.get_path("../config.py") is None
+    assert store.get_path("0" * 64 + ".png") is None
+
+
+def test_blob_endpoint_serves_immutable_content(tmp_path, monkeypatch):
+    """Blobs are served with their media type and a long-lived cache header."""
+    store = BlobStore(tmp_path, max_bytes=1_000)
+    monkeypatch.setattr(blobs, "_blob_store", store)
+    blob_id = store.put(b"<svg/>", "svg")
+    client = TestClient(app)
+
+    response = client.get(f"/api/blobs/{blob_id}")
+    assert response.status_code == 200
+    assert response.content == b"<svg/>"
+    assert response.headers["content-type"].startswith("image/svg+xml")
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["etag"] == f'"{blob_id}"'
+
+    assert client.get("/api/blobs/" + "0" * 64 + ".png").status_code == 404
@@ -0,0 +1,31 @@
+"""Tests for the shared torch.compile artifact cache."""
+import os
+
+from app.services.compile_cache import COMPILE_CALL, CompileCache
+
+
+def test_env_points_inductor_at_a_per_version_directory(tmp_path):
+    cache = CompileCache(tmp_path, max_bytes=1_000)
+    env = cache.env()
+    assert env["TORCHINDUCTOR_FX_GRAPH_CACHE"] == "1"
+    assert env["TORCHINDUCTOR_CACHE_DIR"].startswith(str(cache.version_path))
+    assert cache.version_path.parent == tmp_path
+
+
+def test_trim_deletes_oldest_files_down_to_the_watermark(tmp_path):
+    cache = CompileCache(tmp_path, max_bytes=1_000)
+    directory = cache.version_path / "inductor" / "fxgraph"
+    directory.mkdir(parents=True)
+    for i in range(4):
+        path = directory / f"entry{i}"
+        path.write_bytes(b"x" * 300)
+        os.utime(path, (i, i))
+
+    assert cache.trim() == 600
+    assert sorted(p.name for p in directory.iterdir()) == ["entry2", "entry3"]
+    assert cache.trim() == 0
+
+
+def test_compile_call_ignores_comments():
+    assert COMPILE_CALL.search("model = torch.compile(model)")
+    assert not COMPILE_CALL.search("# compiled_model = torch.compile(model)")
@@ -0,0 +1,53 @@
+"""Tests for the blocking-work helpers."""
+import asyncio
+import threading
+import time
+
+from app.concurrency import BlockingPool, LoopLagMonitor
+
+
+async def test_blocking_pool_runs_off_loop():
+    """Calls run in a worker thread and their result is returned."""
+    pool = BlockingPool("test", max_workers=2)
+    main_thread = threading.get_ident()
+
+    result = await pool.run(lambda x: (x * 2, threading.get_ident()), 21)
+
+    assert result[0] == 42
+    assert result[1] != main_thread
+    assert pool.pending == 0
+    pool.shutdown()
+
+
+async def test_blocking_pool_keeps_loop_responsive():
+    """The loop keeps ticking while a blocking call is in flight."""
+    pool = BlockingPool("test", max_workers=1)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await pool.run(time.sleep, 0.2)
+    task.cancel()
+
+    assert ticks >= 5
+    pool.shutdown()
+
+
+async def test_loop_lag_monitor_detects_blocking():
+    """Blocking the loop is recorded as lag."""
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+    monitor.start()
+    await asyncio.sleep(0.02)
+
+    time.sleep(0.15)  # Block the event loop
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    stats = monitor.stats()
+    assert stats["slow_count"] >= 1
+    assert stats["max_lag_seconds"] >= 0.1
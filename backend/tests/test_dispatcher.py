@@ -0,0 +1,123 @@
+"""Tests for remote worker agents and the execution dispatcher."""
+import asyncio
+import threading
+
+import pytest
+
+from app.models import CodeExecutionRequest, CodeExecutionResponse
+from app.services.dispatcher import Dispatcher, read_message, send_message
+from app.services.execution import ExecutionService
+from app.services.worker_agent import AgentRejected, WorkerAgent
+
+
+class EchoService:
+    """Stands in for ExecutionService: echoes the code, optionally blocking."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.release.set()
+
+    def run_job(self, request, run=None):
+        self.release.wait(5)
+        return CodeExecutionResponse(success=True, stdout=request.code), []
+
+
+@pytest.fixture
+async def dispatcher():
+    dispatcher = Dispatcher(port=0, token="secret")
+    await dispatcher.start()
+    yield dispatcher
+    await dispatcher.stop()
+
+
+async def start_agent(dispatcher, name, capacity=1, service=None):
+    agent = WorkerAgent(
+        "127.0.0.1", dispatcher.port, name, capacity, "secret", service or EchoService()
+    )
+    task = asyncio.create_task(agent.serve())
+    while name not in dispatcher.workers:
+        await asyncio.sleep(0.01)
+    return task
+
+
+async def test_jobs_go_to_least_loaded_worker(dispatcher):
+    """Busy workers are skipped; with every slot taken the job runs locally."""
+    assert await dispatcher.aexecute(CodeExecutionRequest(code="x")) is None
+
+    busy = EchoService()
+    busy.release.clear()
+    agents = [
+        await start_agent(dispatcher, "busy", service=busy),
+        await start_agent(dispatcher, "idle", capacity=2),
+    ]
+    blocked = asyncio.create_task(dispatcher.aexecute(CodeExecutionRequest(code="slow")))
+    while not dispatcher.workers["busy"].jobs and not dispatcher.workers["idle"].jobs:
+        await asyncio.sleep(0.01)
+
+    response, figures = await dispatcher.aexecute(CodeExecutionRequest(code="fast"))
+    assert response.stdout == "fast"
+    assert response.worker in {"busy", "idle"}
+    assert figures == []
+    assert dispatcher.slots()[("busy", "busy")] + dispatcher.slots()[("idle", "busy")] == 1
+
+    busy.release.set()
+    response, _ = await blocked
+    assert response.stdout == "slow"
+    for agent in agents:
+        agent.cancel()
+
+
+async def test_lost_worker_jobs_are_retried(dispatcher):
+    """A worker dropping its connection mid-job doesn't fail the execution."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", dispatcher.port)
+    await send_message(
+        writer, {"type": "register", "name": "flaky", "capacity": 8, "token": "secret"}
+    )
+    assert (await read_message(reader))["type"] == "registered"
+    agent = await start_agent(dispatcher, "steady")
+
+    async def crash_on_first_job():
+        await read_message(reader)
+        writer.close()
+
+    crash = asyncio.create_task(crash_on_first_job())
+    response, _ = await dispatcher.aexecute(CodeExecutionRequest(code="print(1)"))
+    await crash
+    assert response.worker == "steady"
+    assert response.stdout == "print(1)"
+    assert "flaky" not in dispatcher.workers
+    agent.cancel()
+
+
+async def test_registration_requires_token(dispatcher):
+    agent = WorkerAgent("127.0.0.1", dispatcher.port, "intruder", 1, "wrong", EchoService())
+    with pytest.raises(AgentRejected, match="invalid token"):
+        await agent.serve()
+    assert dispatcher.workers == {}
+
+
+async def test_tokenless_dispatcher_stays_on_loopback(caplog):
+    with pytest.raises(RuntimeError, match="without a token"):
+        await Dispatcher(host="0.0.0.0", port=0).start()
+
+    dispatcher = Dispatcher(host="127.0.0.1", port=0)
+    await dispatcher.start()
+    await dispatcher.stop()
+    assert "without a token" in caplog.text
+
+
+async def test_remote_execution_end_to_end(dispatcher, monkeypatch):
+    """A real agent runs the code; the API stores its figures and reports the worker."""
+    from app.services import execution
+
+    monkeypatch.setattr(execution, "get_dispatcher", lambda: dispatcher)
+    agent = await start_agent(dispatcher, "node-1", service=ExecutionService())
+
+    response = await ExecutionService().aexecute(
+        CodeExecutionRequest(code="print(torch.ones(3).sum().item())")
+    )
+    assert response.success, response.stderr
+    assert response.stdout == "3.0\n"
+    assert response.worker == "node-1"
+    assert response.timing.user_code is not None
+    agent.cancel()
@@ -0,0 +1,240 @@
+"""Tests for the documentation proxy service against a local stub server."""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.docs import DocsService
+from app.services.docs_cache import DocsCache
+from app.services.docs_index import DocsIndex
+
+STUB_PAGE = """
+<dl class="py class">
+<dt class="sig sig-object py" id="torch.nn.Linear">
+<em class="property">class </em><span class="sig-prename descclassname">torch.nn.</span><span class="sig-name descname">Linear</span><span class="sig-paren">(</span>in_features, out_features<span class="sig-paren">)</span></dt>
+<dd><p>Applies an affine linear transformation to the incoming data.</p></dd>
+</dl>
+"""
+
+
+class StubDocsHandler(BaseHTTPRequestHandler):
+    """Serves a fixed docs page for torch.nn.Linear and 404 otherwise."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.connections.add(self.client_address)
+        time.sleep(server.delay)
+
+        if self.path.endswith("/torch.nn.Linear.html"):
+            status, body = 200, STUB_PAGE.encode()
+        else:
+            status, body = 404, b"not found"
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubDocsHandler)
+    server.requests = []
+    server.connections = set()
+    server.lock = threading.Lock()
+    server.delay = 0.0
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+async def docs_service(stub_server, tmp_path):
+    # Empty offline index so every lookup goes to the stub server
+    index_path = tmp_path / "index.json"
+    index_path.write_text(json.dumps({"symbols": {}}))
+
+    service = DocsService()
+    service.base_url = f"http://127.0.0.1:{stub_server.server_port}/docs"
+    service.index = DocsIndex(index_path, service.base_url)
+    service.cache = make_cache(tmp_path)
+    yield service
+    # On the loop the test ran (and opened the client) on
+    await service.aclose()
+    service.cache.close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cache(tmp_path, clock=time.time) -> DocsCache:
+    return DocsCache(
+        tmp_path / "docs-cache.sqlite3",
+        ttl=100,
+        negative_ttl=10,
+        max_stale=1000,
+        max_entries=3,
+        clock=clock,
+    )
+
+
+async def test_remote_lookup(docs_service):
+    """Pages are fetched, scraped and cached."""
+    info = await docs_service.get_doc_info("torch.nn.Linear")
+    await docs_service.aclose()
+
+    assert info["signature"].startswith("class torch.nn.Linear(")
+    assert info["description"] == "Applies an affine linear transformation to the incoming data."
+    assert await docs_service.get_cached_symbols() == ["torch.nn.Linear"]
+
+
+async def test_concurrent_misses_are_coalesced(docs_service, stub_server):
+    """Concurrent lookups for one symbol trigger a single remote fetch."""
+    stub_server.delay = 0.2
+
+    results = await asyncio.gather(
+        *(docs_service.get_doc_info("torch.nn.Linear") for _ in range(20))
+    )
+    await docs_service.aclose()
+
+    assert len(stub_server.requests) == 1
+    assert all(r == results[0] for r in results)
+
+
+async def test_connections_are_reused(docs_service, stub_server):
+    """Sequential misses reuse one keep-alive connection."""
+    for symbol in ["torch.a", "torch.b", "torch.c"]:
+        assert await docs_service.get_doc_info(symbol) is None
+    await docs_service.aclose()
+
+    assert len(stub_server.requests) == 3
+    assert len(stub_server.connections) == 1
+
+
+async def test_failed_lookups_are_cached(docs_service, stub_server):
+    """A missing symbol is fetched once, then answered from the negative cache."""
+    assert await docs_service.get_doc_info("torch.missing") is None
+    assert await docs_service.get_doc_info("torch.missing") is None
+    await docs_service.aclose()
+
+    assert len(stub_server.requests) == 1
+    stats = await docs_service.get_cache_stats()
+    assert stats["negative_entries"] == 1
+    assert stats["negative_hits"] == 1
+
+
+async def test_stale_entries_are_served_while_refreshing(docs_service, stub_server, tmp_path):
+    """A stale entry is returned immediately and refreshed in the background."""
+    clock = FakeClock()
+    docs_service.cache = make_cache(tmp_path, clock)
+    docs_service.cache.set("torch.nn.Linear", {"symbol": "torch.nn.Linear", "signature": "old"})
+    clock.now += 500  # Past the TTL, within max_stale
+    stub_server.delay = 0.1
+
+    info = await docs_service.get_doc_info("torch.nn.Linear")
+    assert info["signature"] == "old"
+    assert len(stub_server.requests) == 0
+
+    await asyncio.gather(*docs_service._refresh_tasks)
+    await docs_service.aclose()
+    assert len(stub_server.requests) == 1
+    entry = docs_service.cache.get("torch.nn.Linear")
+    assert entry.fresh
+    assert entry.value["signature"].startswith("class torch.nn.Linear(")
+
+
+async def test_failed_refresh_keeps_the_stale_entry(docs_service, stub_server, tmp_path):
+    """
+    A refresh that fails doesn't turn a cached page into "not found"; the
+    next one waits for the negative TTL, and the entry still ages out.
+    """
+    clock = FakeClock()
+    docs_service.cache = make_cache(tmp_path, clock)
+    old = {"symbol": "torch.gone", "signature": "old"}
+    docs_service.cache.set("torch.gone", old)
+    fetched_at = clock.now
+    clock.now += 500
+
+    assert await docs_service.get_doc_info("torch.gone") == old
+    await asyncio.gather(*docs_service._refresh_tasks)
+    assert await docs_service.get_doc_info("torch.gone") == old
+    assert not docs_service._refresh_tasks
+
+    assert len(stub_server.requests) == 1  # answered 404
+    entry = docs_service.cache.get("torch.gone")
+    assert entry.value == old and entry.fresh and entry.fetched_at == fetched_at
+    clock.now += 11  # Past the negative TTL: retried
+    assert not docs_service.cache.get("torch.gone").fresh
+    clock.now += 500  # Past max_stale since the successful fetch
+    assert docs_service.cache.get("torch.gone") is None
+
+
+def test_cache_persists_and_expires(tmp_path):
+    """Entries survive a new cache instance and age out after max_stale."""
+    clock = FakeClock()
+    cache = make_cache(tmp_path, clock)
+    cache.set("torch.a", {"symbol": "torch.a"})
+    cache.close()
+
+    reopened = make_cache(tmp_path, clock)
+    assert reopened.get("torch.a").value == {"symbol": "torch.a"}
+    clock.now += 2000
+    assert reopened.get("torch.a") is None
+    reopened.close()
+
+
+def test_cache_evicts_oldest(tmp_path):
+    """The oldest entries are evicted beyond max_entries."""
+    clock = FakeClock()
+    cache = make_cache(tmp_path, clock)
+    for symbol in ["torch.a", "torch.b", "torch.c", "torch.d"]:
+        clock.now += 1
+        cache.set(symbol, {"symbol": symbol})
+
+    assert cache.symbols() == ["torch.b", "torch.c", "torch.d"]
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["oldest_age_seconds"] == 2.0
+    cache.close()
+
+
+async def test_batch_lookup(docs_service, stub_server):
+    """A batch resolves each unique symbol once, with None for misses."""
+    docs = await docs_service.get_doc_infos(
+        ["torch.nn.Linear", "torch.missing", "torch.nn.Linear"]
+    )
+    await docs_service.aclose()
+
+    assert list(docs) == ["torch.nn.Linear", "torch.missing"]
+    assert docs["torch.nn.Linear"]["symbol"] == "torch.nn.Linear"
+    assert docs["torch.missing"] is None
+    assert len(stub_server.requests) == 2
+
+
+async def test_prefetch_warms_cache(docs_service, stub_server):
+    """Prefetched symbols are served from the cache afterwards."""
+    found = await docs_service.prefetch(["torch.nn.Linear", "torch.missing"])
+    assert found == 1
+
+    await docs_service.get_doc_info("torch.nn.Linear")
+    await docs_service.aclose()
+    assert len(stub_server.requests) == 2
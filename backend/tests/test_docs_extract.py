@@ -0,0 +1,50 @@
+"""Tests for incremental docs page extraction."""
+import pytest
+
+from app.services.docs_extract import DocsExtractor, extract_doc_summary
+from benchmarks.docs_extraction import load_corpus, load_expected
+
+PAGE = """
+<nav><dl><dt>Not a signature</dt><dd><p>Navigation</p></dd></dl></nav>
+<dl class="py function">
+<dt class="sig sig-object py" id="torch.other"><span class="sig-name descname">other</span>()</dt>
+<dd><p>Another function.</p></dd>
+</dl>
+<dl class="py class">
+<dt class="sig sig-object py" id="torch.nn.Linear">
+<em class="property">class </em><span class="sig-prename descclassname">torch.nn.</span><span class="sig-name descname">Linear</span><span class="sig-paren">(</span>in_features, out_features<span class="sig-paren">)</span><a class="reference internal" href="#"><span class="viewcode-link">[source]</span></a><a class="headerlink" href="#torch.nn.Linear">#</a></dt>
+<dd><p>Applies an <em>affine</em> linear transformation &amp; more.</p>
+<p>Second paragraph.</p></dd>
+</dl>
+"""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 16384])
+def test_extracts_matching_entry(chunk_size):
+    """The matching entry is found regardless of how the page is chunked."""
+    signature, description = extract_doc_summary(PAGE, "torch.nn.Linear", chunk_size)
+    assert signature == "class torch.nn.Linear(in_features, out_features)"
+    assert description == "Applies an affine linear transformation & more."
+
+
+def test_missing_symbol():
+    """Pages without the symbol yield nothing."""
+    assert extract_doc_summary(PAGE, "torch.nn.Conv2d") == (None, None)
+
+
+def test_stops_after_first_match():
+    """Further chunks are ignored once the entry is found."""
+    extractor = DocsExtractor("torch.nn.Linear")
+    extractor.feed(PAGE + "<p>" * 100_000)
+    assert extractor.done
+    extractor.feed("<dl>" * 100_000)
+    assert extractor.bytes_fed == len(PAGE) + 300_000
+
+
+@pytest.mark.parametrize("chunk_size", [4096, 65536])
+def test_corpus(chunk_size):
+    """Every saved page in the benchmark corpus extracts as expected."""
+    expected = load_expected()
+    for symbol, html in load_corpus().items():
+        signature, description = extract_doc_summary(html, symbol, chunk_size)
+        assert {"signature": signature, "description": description} == expected[symbol]
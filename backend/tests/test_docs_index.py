@@ -0,0 +1,95 @@
+"""Tests for the offline PyTorch docs index."""
+import json
+
+from app.services.docs import DocsService
+from app.services.docs_index import DocsIndex, build_index, describe
+
+
+def sample_function(x, scale: float = 1.0) -> float:
+    """
+    Scale a value.
+
+    Multiplies :attr:`x` by ``scale``. See :func:`~torch.mul`.
+    """
+    return x * scale
+
+
+class SampleLayer:
+    """Applies a sample transformation to the incoming data."""
+
+    def __init__(self, in_features: int, bias: bool = True):
+        self.in_features = in_features
+
+
+def builtin_like():
+    """
+    builtin_like(data, *, dtype=None) -> Tensor
+
+    Constructs a tensor from :attr:`data`.
+
+    .. warning::
+
+        Not a real builtin.
+    """
+
+
+def test_describe_function_uses_inspect_signature():
+    """Annotations are dropped and the first paragraph is cleaned up."""
+    entry = describe("mod.sample_function", sample_function)
+    assert entry["signature"] == "mod.sample_function(x, scale=1.0)"
+    assert entry["description"] == "Scale a value."
+
+
+def test_describe_class():
+    """Classes get a ``class`` prefix and no ``self`` parameter."""
+    entry = describe("mod.SampleLayer", SampleLayer)
+    assert entry["signature"] == "class mod.SampleLayer(in_features, bias=True)"
+    assert entry["description"] == "Applies a sample transformation to the incoming data."
+
+
+def test_describe_docstring_signature():
+    """Signature lines at the top of torch-style docstrings are used."""
+    entry = describe("torch.builtin_like", builtin_like)
+    assert entry["signature"] == "torch.builtin_like(data, *, dtype=None) -> Tensor"
+    assert entry["description"] == "Constructs a tensor from data."
+
+
+def test_build_index_from_module():
+    """Public callables of a module are indexed."""
+    entries = build_index(["json"], [])
+    assert "json.dumps" in entries
+    assert not any(symbol.startswith("json._") for symbol in entries)
+
+
+async def test_docs_service_answers_from_index(tmp_path, monkeypatch):
+    """Indexed symbols are served without touching the network."""
+    path = tmp_path / "index.json"
+    path.write_text(
+        json.dumps(
+            {
+                "symbols": {
+                    "torch.nn.Linear": {
+                        "signature": "class torch.nn.Linear(in_features, out_features)",
+                        "description": "Applies an affine linear transformation.",
+                    }
+                }
+            }
+        )
+    )
+
+    service = DocsService()
+    service.index = DocsIndex(path, "https://docs.example")
+
+    async def no_network(*args, **kwargs):
+        raise AssertionError("remote docs should not be fetched")
+
+    monkeypatch.setattr("httpx.AsyncClient.get", no_network)
+
+    info = await service.get_doc_info("torch.nn.Linear")
+    await service.aclose()
+    assert info == {
+        "symbol": "torch.nn.Linear",
+        "signature": "class torch.nn.Linear(in_features, out_features)",
+        "description": "Applies an affine linear transformation.",
+        "url": "https://docs.example/generated/torch.nn.Linear.html",
+    }
@@ -0,0 +1,163 @@
+"""Tests for the execution service."""
+import asyncio
+import sys
+
+import pytest
+import torch
+from torch.utils._python_dispatch import _get_current_dispatch_mode
+
+from app.models import CodeExecutionRequest, CodeExecutionResponse
+from app.sandbox._profiling import Profiler
+from app.services.artifacts import ArtifactStore
+from app.services.blobs import BlobStore
+from app.services.execution import ExecutionService
+
+
+def test_profile_mode_returns_operator_table():
+    """Profiled code gets its operators ranked by self CPU time."""
+    service = ExecutionService()
+    response = service.execute(
+        CodeExecutionRequest(
+            code="x = torch.randn(300, 300)\ny = x @ x\nprint(y.shape)", profile=True
+        )
+    )
+    assert response.success, response.stderr
+    assert response.stdout == "torch.Size([300, 300])\n"
+    profile = response.profile
+    assert profile is not None
+    names = [op.name for op in profile.operators]
+    assert "aten::mm" in names
+    # Each op is counted once, not again for the operator counter's re-dispatch
+    assert next(op for op in profile.operators if op.name == "aten::mm").calls == 1
+    assert profile.self_cpu_time_total_us > 0
+    assert profile.peak_tensor_memory_bytes >= 2 * 300 * 300 * 4
+    assert not profile.events_truncated
+
+
+def test_profile_stops_after_max_events():
+    """The profiler stops recording after the operator call limit."""
+    service = ExecutionService()
+    service.profile_max_events = 50
+    response = service.execute(
+        CodeExecutionRequest(code="for _ in range(200):\n    x = torch.ones(3) + 1", profile=True)
+    )
+    assert response.success, response.stderr
+    assert response.profile.events_truncated
+    # Counting stops with the profiler
+    assert 50 < response.profile.event_count < 200
+    add = next(op for op in response.profile.operators if op.name == "aten::add")
+    assert add.calls <= 50
+
+
+def test_operator_counter_leaves_after_max_events():
+    """Ops after the limit run without the counting dispatch mode."""
+    hook = sys.getprofile()
+    with Profiler(max_events=5) as profiler:
+        torch.ones(1) + 1
+        assert _get_current_dispatch_mode() is profiler._limit
+        for _ in range(20):
+            torch.ones(1) + 1
+        assert profiler.stopped
+        assert _get_current_dispatch_mode() is None
+    assert profiler._limit.calls < 10
+    assert sys.getprofile() is hook
+
+
+def test_no_profile_by_default():
+    """Plain executions don't pay for the profiler."""
+    response = ExecutionService().execute(CodeExecutionRequest(code="print(1)"))
+    assert response.success
+    assert response.profile is None
+
+
+def test_academy_helper_is_preloaded(tmp_path):
+    """Executed code can load store artifacts without importing anything."""
+    ArtifactStore(tmp_path).add_tensors(
+        "weights", {"weight": torch.ones(2, 3)}, kind="weights"
+    )
+    service = ExecutionService()
+    service.artifacts_dir = tmp_path
+    response = service.execute(
+        CodeExecutionRequest(
+            code="layer = nn.Linear(3, 2, bias=False)\n"
+            "layer.load_state_dict(academy.load('weights'))\n"
+            "print(layer.weight.sum().item())"
+        )
+    )
+    assert response.success, response.stderr
+    assert response.stdout == "6.0\n"
+
+
+def test_figures_are_stored_once_by_content(tmp_path):
+    """A plot comes back as a blob URL; the same plot maps to the same blob."""
+    pytest.importorskip("matplotlib")
+    service = ExecutionService()
+    service.blob_store = BlobStore(tmp_path, max_bytes=10_000_000)
+    code = "import matplotlib.pyplot as plt\nplt.plot([1, 2, 3])\nplt.show()"
+
+    first = service.execute(CodeExecutionRequest(code=code))
+    second = service.execute(CodeExecutionRequest(code=code))
+    assert first.success, first.stderr
+    assert first.stderr == ""
+    assert len(first.figures) == 1
+    assert first.figures[0].media_type == "image/png"
+    assert first.figures[0].url == f"/api/blobs/{first.figures[0].id}"
+    assert second.figures == first.figures
+    assert service.blob_store.stats()["blobs"] == 1
+
+
+def test_dataloader_workers_are_capped_and_forked():
+    """num_workers above the limit is lowered, and the workers start without warnings."""
+    code = (
+        "from torch.utils.data import DataLoader\n"
+        "loader = DataLoader(list(range(8)), batch_size=2, num_workers=16)\n"
+        "print(loader.num_workers, loader.multiprocessing_context.get_start_method())\n"
+        "print(sum(int(batch.sum()) for batch in loader))\n"
+    )
+    response = ExecutionService().execute(CodeExecutionRequest(code=code, shared=False))
+    assert response.success, response.stderr
+    assert response.stdout == "2 fork\n28\n"
+
+
+def test_dataloader_worker_cap_is_per_sandbox():
+    """Loaders iterated at the same time share the cap; later ones load in-process."""
+    code = (
+        "from torch.utils.data import DataLoader\n"
+        "loaders = [DataLoader(list(range(8)), batch_size=2, num_workers=2) for _ in range(3)]\n"
+        "iterators = [iter(loader) for loader in loaders]\n"
+        "print([loader.num_workers for loader in loaders])\n"
+        "print(sum(int(batch.sum()) for batch in iterators[2]))\n"
+        "del iterators\n"
+        "print(sum(int(batch.sum()) for batch in loaders[2]), loaders[2].num_workers)\n"
+    )
+    response = ExecutionService().execute(CodeExecutionRequest(code=code, shared=False))
+    assert response.success, response.stderr
+    assert response.stdout == "[2, 0, 0]\n28\n28 2\n"
+
+
+async def test_identical_requests_share_one_execution(monkeypatch):
+    """Concurrent and just-later identical requests reuse one run; unseeded RNG doesn't."""
+    service = ExecutionService()
+    runs = []
+
+    async def fake_dispatch(request, run):
+        runs.append(request.code)
+        await asyncio.sleep(0.05)
+        return CodeExecutionResponse(success=True, stdout=f"run {len(runs)}")
+
+    monkeypatch.setattr(service, "_adispatch", fake_dispatch)
+    request = CodeExecutionRequest(code="print(torch.ones(2))")
+    responses = await asyncio.gather(*(service.aexecute(request) for _ in range(5)))
+    assert runs == [request.code]
+    assert {response.stdout for response in responses} == {"run 1"}
+    assert (await service.aexecute(request)).stdout == "run 1"
+
+    # Different timeout, opted out, or visibly random: each runs on its own
+    await service.aexecute(CodeExecutionRequest(code=request.code, timeout=5))
+    await service.aexecute(CodeExecutionRequest(code=request.code, shared=False))
+    await service.aexecute(CodeExecutionRequest(code="print(torch.randn(2))"))
+    assert len(runs) == 4
+
+    seeded = CodeExecutionRequest(code="torch.manual_seed(0)\nprint(torch.randn(2))")
+    await asyncio.gather(service.aexecute(seeded), service.aexecute(seeded))
+    assert len(runs) == 5
@@ -0,0 +1,143 @@
+"""Tests for cancelling executions and validations."""
+import asyncio
+import time
+from pathlib import Path
+
+from app.models import CodeExecutionRequest, CodeExecutionResponse
+from app.services.execution import ExecutionService
+from app.services.jobs import JobRegistry, Run
+
+SLEEP = "import time\ntime.sleep(20)\n"
+
+
+def _gone(pid: int) -> bool:
+    try:
+        return Path(f"/proc/{pid}/stat").read_text().split()[2] in "ZX"
+    except FileNotFoundError:
+        return True
+
+
+async def test_cancel_kills_the_sandbox_process_tree(tmp_path):
+    """The sandbox and the processes it forked die right away."""
+    service = ExecutionService(max_timeout=30)
+    pid_file = tmp_path / "child.pid"
+    code = (
+        "import multiprocessing, pathlib, time\n"
+        "child = multiprocessing.get_context('fork').Process(target=time.sleep, args=(20,))\n"
+        "child.start()\n"
+        f"pathlib.Path({str(pid_file)!r}).write_text(str(child.pid))\n"
+        "time.sleep(20)\n"
+    )
+    request = CodeExecutionRequest(code=code, timeout=30, job_id="tree")
+
+    started = time.monotonic()
+    task = asyncio.create_task(service.aexecute(request))
+    while not pid_file.exists() or not pid_file.read_text():
+        await asyncio.sleep(0.05)
+    service.jobs.cancel("tree")
+    response = await task
+
+    assert response.cancelled and not response.success
+    assert response.job_id == "tree"
+    assert time.monotonic() - started < 10
+    child = int(pid_file.read_text())
+    for _ in range(50):
+        if _gone(child):
+            break
+        await asyncio.sleep(0.02)
+    assert _gone(child)
+    assert "tree" not in service.jobs
+
+
+async def test_rerunning_a_cell_supersedes_the_older_job():
+    """A client's new run of a cell cancels its previous one; other clients are unaffected."""
+    service = ExecutionService(max_timeout=30)
+
+    def request(code: str, client: str, job: str) -> CodeExecutionRequest:
+        return CodeExecutionRequest(
+            code=code, timeout=30, client_id=client, cell_id="cell-1", job_id=job
+        )
+
+    older = asyncio.create_task(service.aexecute(request(SLEEP, "a", "old")))
+    other = asyncio.create_task(service.aexecute(request(SLEEP, "b", "other")))
+    while "old" not in service.jobs or "other" not in service.jobs:
+        await asyncio.sleep(0.01)
+    newer = await service.aexecute(request("print('again')", "a", "new"))
+
+    assert newer.success and newer.stdout == "again\n"
+    assert (await older).cancelled
+    assert not other.done()
+    service.jobs.cancel("other", client_id="b")
+    assert (await other).cancelled
+
+
+async def test_shared_run_is_killed_only_when_every_job_cancelled(monkeypatch):
+    """Coalesced identical requests share a run; one client leaving doesn't stop it."""
+    service = ExecutionService(max_timeout=30)
+    runs = []
+
+    async def fake_dispatch(request, run):
+        runs.append(run)
+        # Runs until the first job is gone
+        while "first" in service.jobs and not run.cancelled:
+            await asyncio.sleep(0.01)
+        return CodeExecutionResponse(success=True, stdout="1\n")
+
+    monkeypatch.setattr(service, "_adispatch", fake_dispatch)
+    request = CodeExecutionRequest(code="print(1)")
+    first = asyncio.create_task(service.aexecute(request.model_copy(update={"job_id": "first"})))
+    second = asyncio.create_task(service.aexecute(request.model_copy(update={"job_id": "second"})))
+    while len(service.jobs) < 2:
+        await asyncio.sleep(0.01)
+    service.jobs.cancel("first")
+
+    assert (await first).cancelled
+    response = await second
+    assert response.success and response.job_id == "second"
+    assert len(runs) == 1 and not runs[0].cancelled
+
+
+def test_registry_cancels_runs_once_unheld():
+    registry = JobRegistry()
+    run = Run()
+    killed = []
+    run.bind(lambda: killed.append(True))
+    first = registry.open("a", "execute", run)
+    registry.open("b", "execute", run, supersede_key=("c", "cell"))
+
+    assert registry.cancel("a") and first.cancelled
+    assert not run.cancelled
+    # A newer job for the same cell supersedes the last holder
+    registry.open("c", "execute", Run(), supersede_key=("c", "cell"))
+    assert run.cancelled and killed == [True]
+    assert not registry.cancel("b") and not registry.cancel("unknown")
+    # Runs cancelled before they start are not bound
+    assert not run.bind(lambda: None)
+
+
+def test_jobs_are_scoped_to_their_client():
+    """Another client can't cancel or replace a job, even knowing its id."""
+    registry = JobRegistry()
+    job = registry.open("job", "execute", Run(), client_id="a")
+
+    assert not registry.cancel("job") and not registry.cancel("job", client_id="b")
+    other = registry.open("job", "execute", Run(), client_id="b")
+    assert not job.cancelled and not other.cancelled
+    assert registry.cancel("job", client_id="a") and job.cancelled
+    assert not other.cancelled
+
+
+async def test_disconnect_cancels_the_job():
+    registry = JobRegistry()
+    run = Run()
+    polls = []
+
+    async def is_disconnected() -> bool:
+        polls.append(True)
+        return len(polls) > 1
+
+    with registry.track("job", "validate", run):
+        async with registry.cancel_on_disconnect(is_disconnected, "job"):
+            while not run.cancelled:
+                await asyncio.sleep(0.05)
+    assert "job" not in registry
@@ -0,0 +1,80 @@
+"""Tests for the Prometheus metrics."""
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.metrics import Registry, execution_phase_duration, execution_truncations
+from app.models import ValidationResult
+from app.services import phases
+from app.services.validation import ValidationService
+
+client = TestClient(app)
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Buckets are cumulative and end with +Inf, _sum and _count."""
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency", labels=("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.5, route="/a")
+    histogram.observe(5.0, route="/a")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.55' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+
+
+def test_counter_and_gauge_function():
+    """Counters get a _total suffix; function gauges are read at render time."""
+    registry = Registry()
+    counter = registry.counter("lookups", "Lookups", labels=("result",))
+    counter.inc(result="hit")
+    counter.inc(2, result="hit")
+    gauge = registry.gauge("queue", "Queue", labels=("pool",))
+    gauge.set_function(lambda: {("io",): 3})
+
+    text = registry.render()
+    assert "# TYPE lookups_total counter" in text.splitlines()
+    assert 'lookups_total{result="hit"} 3' in text
+    assert 'queue{pool="io"} 3' in text
+
+
+def test_metrics_endpoint_reports_route_latency():
+    """Requests are labelled by route template, not by raw path."""
+    client.get("/api/modules/01-tensors")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/api/modules/{module_id}",status="200"}'
+        in body
+    )
+    assert 'pool_max_workers{pool="execution"}' in body
+    assert 'cache_entries{cache="docs"}' in body
+
+
+def test_validation_records_phases_and_strips_marker():
+    """Phase marks are recorded and never shown to the learner."""
+    before = execution_phase_duration.count(kind="validate", phase="user_code")
+    response = ValidationService()._validate_with_asserts(
+        "x = torch.ones(2)\nprint('hello')", ["assert x.sum() == 2"]
+    )
+    assert response.result == ValidationResult.PASSED
+    assert phases.TIMING_MARKER not in response.stdout
+    assert "hello" in response.stdout
+    assert execution_phase_duration.count(kind="validate", phase="user_code") == before + 1
+    assert execution_phase_duration.count(kind="validate", phase="tests") == before + 1
+
+
+def test_truncate_output_counts_truncations():
+    """Long output is cut with a note and counted."""
+    before = execution_truncations.get(kind="execute")
+    text = phases.truncate_output("x" * 50, 10, "execute")
+    assert text.startswith("x" * 10)
+    assert "40 more characters" in text
+    assert execution_truncations.get(kind="execute") == before + 1
+    assert phases.truncate_output("short", 10, "execute") == "short"
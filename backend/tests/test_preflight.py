@@ -0,0 +1,77 @@
+"""Tests for the pre-flight checks of submitted code."""
+from app.metrics import execution_preflight_checks
+from app.models import CodeExecutionRequest, ValidationRequest, ValidationResult
+from app.services.execution import ExecutionService
+from app.services.preflight import check
+from app.services.validation import ValidationService
+
+
+def kinds(code: str, timeout: float = 10) -> list[tuple[str, int]]:
+    return [(d.kind, d.line) for d in check(code, timeout).diagnostics]
+
+
+def test_syntax_error_has_line_column_and_python_message():
+    result = check("x = 1\ny = (2,\n", 10)
+    diagnostic = result.diagnostics[0]
+    assert (diagnostic.kind, diagnostic.line, diagnostic.column) == ("syntax", 2, 5)
+    assert result.message.endswith("SyntaxError: '(' was never closed\n")
+    assert kinds("for x in y:\n    pass\nreturn x") == [("syntax", 3)]
+
+
+def test_forbidden_imports_and_calls_through_aliases():
+    assert kinds("import subprocess as sp") == [("policy", 1)]
+    assert kinds("from urllib import request") == [("policy", 1)]
+    assert kinds("__import__('socket')") == [("policy", 1)]
+    assert kinds("from os import system as run\nrun('ls')") == [("policy", 2)]
+    assert kinds("import os\nprint(os.path.join('a', 'b'))") == []
+
+
+def test_loops_that_only_stop_at_the_time_limit():
+    assert kinds("while True:\n    x = 1") == [("long_running", 1)]
+    # The break only ends the inner loop
+    assert kinds("while True:\n    for i in items:\n        break") == [("long_running", 1)]
+    assert kinds("while True:\n    if done():\n        break") == []
+    assert kinds("def gen():\n    while True:\n        yield 1") == []
+    # Calls and asserts can end the loop with an exception
+    assert kinds("try:\n    while True:\n        print(next(it))\nexcept StopIteration: pass") == []
+    assert kinds("while True:\n    x += 1\n    assert x < 5") == []
+    assert kinds("while True:\n    def f():\n        g()") == [("long_running", 1)]
+    assert kinds("for i in range(1000):\n    for j in range(10**7):\n        pass") == [
+        ("long_running", 2)
+    ]
+    assert kinds("for i in range(10**6):\n    pass") == []
+    assert kinds("import time\ntime.sleep(5)", timeout=3) == [("long_running", 2)]
+
+
+def test_code_too_deep_to_compile_or_check_is_a_diagnostic():
+    assert kinds("x = 1" + " + 1" * 300_000) == [("syntax", None)]
+    assert kinds("x = " + "-" * 200_000 + "1") == [("syntax", None)]
+    # Compiles, but is nested deeper than the checks recurse
+    assert kinds("x = " + "-" * 500 + "1") == [("policy", None)]
+
+
+def test_execution_is_answered_without_a_sandbox():
+    service = ExecutionService()
+    rejected = service.execute(CodeExecutionRequest(code="import subprocess"))
+    empty = service.execute(CodeExecutionRequest(code="# nothing yet\n"))
+
+    assert not rejected.success and rejected.timing is None
+    assert rejected.diagnostics[0].kind == "policy"
+    assert "subprocess" in rejected.error
+    assert empty.success and empty.stdout == "" and empty.timing is None
+
+
+async def test_async_execution_is_checked_once():
+    passed = execution_preflight_checks.get(kind="execute", outcome="passed")
+    response = await ExecutionService().aexecute(CodeExecutionRequest(code="print(1)", shared=False))
+    assert response.success, response.stderr
+    assert execution_preflight_checks.get(kind="execute", outcome="passed") == passed + 1
+
+
+async def test_validation_is_answered_without_a_sandbox():
+    response = await ValidationService().avalidate(
+        ValidationRequest(module_id="any", exercise_id="any", code="def f(:\n    pass")
+    )
+    assert response.result == ValidationResult.ERROR
+    assert response.diagnostics[0].line == 1
+    assert "SyntaxError" in response.error_message
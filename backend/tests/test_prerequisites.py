@@ -0,0 +1,58 @@
+"""Tests for the prerequisite graph."""
+import pytest
+
+from app.services.prerequisites import PrerequisiteError, PrerequisiteGraph
+
+
+def make_graph() -> PrerequisiteGraph:
+    return PrerequisiteGraph(
+        {
+            "a": [],
+            "b": ["a"],
+            "c": ["a"],
+            "d": ["b", "c"],
+            "e": ["d"],
+        }
+    )
+
+
+def test_topological_order():
+    """Modules come after all their prerequisites, ties broken by input order."""
+    assert make_graph().order == ["a", "b", "c", "d", "e"]
+
+
+def test_topological_order_reorders_forward_references():
+    """A module listed before its prerequisite is moved after it."""
+    graph = PrerequisiteGraph({"late": ["early"], "early": []})
+    assert graph.order == ["early", "late"]
+
+
+def test_ancestors_and_descendants():
+    """Transitive closure in both directions."""
+    graph = make_graph()
+    assert graph.ancestors("e") == ("a", "b", "c", "d")
+    assert graph.ancestors("a") == ()
+    assert graph.descendants("b") == ("d", "e")
+    assert graph.requires("e", "a")
+    assert not graph.requires("b", "c")
+
+
+def test_dependents_and_available():
+    """Direct unlocks and the next available modules."""
+    graph = make_graph()
+    assert graph.dependents("a") == ("b", "c")
+    assert graph.available([]) == ["a"]
+    assert graph.available(["a", "b"]) == ["c"]
+    assert graph.available(["a", "b", "c"]) == ["d"]
+
+
+def test_unknown_prerequisite():
+    """Referencing a missing module is rejected."""
+    with pytest.raises(PrerequisiteError, match="unknown prerequisite 'missing'"):
+        PrerequisiteGraph({"a": ["missing"]})
+
+
+def test_cycle_detection():
+    """Cycles are rejected with the offending path."""
+    with pytest.raises(PrerequisiteError, match="a -> b -> c -> a"):
+        PrerequisiteGraph({"a": ["c"], "b": ["a"], "c": ["b"], "d": []})
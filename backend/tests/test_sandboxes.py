@@ -0,0 +1,161 @@
+"""Tests for executor backends and the pre-warmed sandbox pool."""
+import json
+import os
+import subprocess
+
+import pytest
+
+from app.services.sandboxes import (
+    BACKEND_DIR,
+    JAIL_ENV_VAR,
+    SANDBOX_DIR,
+    WARM_SCRIPT,
+    JailExecutor,
+    SandboxPool,
+    SubprocessExecutor,
+    create_executor,
+)
+
+PRINT_PID = "import os\nprint(os.getpid(), 'torch' in __import__('sys').modules)\n"
+
+
+def _can_unshare() -> bool:
+    try:
+        return subprocess.run(["unshare", "--user", "--net", "true"], capture_output=True).returncode == 0
+    except OSError:
+        return False
+
+
+def test_pool_hands_out_warm_sandboxes_and_refills():
+    pool = SandboxPool(SubprocessExecutor(), size=1)
+    pool.fill()
+    assert len(pool) == 1
+    try:
+        first = pool.run(PRINT_PID, timeout=30)
+        assert len(pool) == 1
+        second = pool.run(PRINT_PID, timeout=30)
+    finally:
+        pool.close()
+
+    assert first.returncode == 0 and second.returncode == 0
+    first_pid, preloaded = first.stdout.split()
+    # Every job gets a fresh process with torch already imported
+    assert first_pid != second.stdout.split()[0]
+    assert preloaded == "True"
+    assert len(pool) == 0
+
+
+def test_timeout_kills_the_sandbox():
+    pool = SandboxPool(SubprocessExecutor(), size=0)
+    sandbox = pool.acquire()
+    with pytest.raises(subprocess.TimeoutExpired):
+        sandbox.run("while True: pass\n", timeout=5)
+    assert not sandbox.alive
+
+
+def test_errors_and_exit_status_are_reported():
+    pool = SandboxPool(SubprocessExecutor(), size=0)
+    failed = pool.run("def f():\n    raise ValueError('boom')\nf()\n", timeout=30)
+    exited = pool.run("import sys\nsys.exit(3)\n", timeout=30)
+
+    assert failed.returncode == 1
+    assert "raise ValueError('boom')" in failed.stderr
+    assert exited.returncode == 3
+
+
+def test_jail_command_and_limits():
+    executor = JailExecutor(
+        {"PATH": "/usr/bin"}, max_file_bytes=1024, overlays={"/cache": "/host/cache"}, seccomp=False
+    )
+    command = executor.command(WARM_SCRIPT)
+
+    assert command[0] == "unshare" and "--net" in command and "--mount" in command
+    assert command[-2:] == ["python", str(WARM_SCRIPT)]
+    assert json.loads(executor.env[JAIL_ENV_VAR]) == {
+        "max_file_bytes": 1024,
+        "memory_bytes": 0,
+        "shm_bytes": 0,
+        "tmp_bytes": 0,
+        "read_only": [],
+        "overlays": {"/cache": "/host/cache"},
+        "hidden": [],
+        "seccomp": False,
+    }
+
+
+@pytest.mark.skipif(not _can_unshare(), reason="user namespaces are not available")
+def test_jailed_sandbox_has_no_network_or_ptrace():
+    pool = SandboxPool(JailExecutor(dict(os.environ)), size=0)
+    result = pool.run(
+        "import ctypes, os, socket\n"
+        "libc = ctypes.CDLL(None, use_errno=True)\n"
+        "print(os.getpid(), libc.ptrace(0, 0, 0, 0), ctypes.get_errno())\n"
+        "socket.create_connection(('1.1.1.1', 80), timeout=1)\n",
+        timeout=30,
+    )
+
+    assert result.stdout.split() == ["1", "-1", "1"]  # PID 1, EPERM
+    assert "Network is unreachable" in result.stderr
+
+
+@pytest.mark.skipif(not _can_unshare(), reason="user namespaces are not available")
+def test_jailed_sandbox_only_writes_to_its_tmp_and_overlays(tmp_path):
+    """The host filesystem is read-only; overlay writes never reach the host."""
+    cache, store = tmp_path / "cache", tmp_path / "store"
+    cache.mkdir()
+    store.mkdir()
+    (cache / "entry").write_text("compiled")
+    executor = JailExecutor(
+        dict(os.environ), read_only=[str(store)], overlays={str(cache): str(cache)}
+    )
+    result = SandboxPool(executor, size=0).run(
+        "import os, site\n"
+        f"print(os.access({str(SANDBOX_DIR)!r}, os.W_OK), os.access(site.getsitepackages()[0], os.W_OK))\n"
+        f"print(os.path.isdir({str(store)!r}), os.access({str(store)!r}, os.W_OK))\n"
+        f"cache = {str(cache)!r}\n"
+        "print(open(os.path.join(cache, 'entry')).read())\n"
+        "open(os.path.join(cache, 'entry'), 'w').write('poisoned')\n"
+        "open('scratch.txt', 'w').write('ok')\n"
+        "print(os.getcwd(), os.path.exists('/tmp/scratch.txt'))\n",
+        timeout=30,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split("\n")[:4] == ["False False", "True False", "compiled", "/tmp True"]
+    assert (cache / "entry").read_text() == "compiled"
+
+
+@pytest.mark.skipif(not _can_unshare(), reason="user namespaces are not available")
+def test_jailed_sandbox_cannot_clone_namespaces():
+    """clone with CLONE_NEW* flags is denied, clone3 is unavailable; threads and fork work."""
+    result = SandboxPool(JailExecutor(dict(os.environ)), size=0).run(
+        "import ctypes, multiprocessing, platform, threading\n"
+        "libc = ctypes.CDLL(None, use_errno=True)\n"
+        "clone = {'x86_64': 56, 'aarch64': 220}[platform.machine()]\n"
+        "print(libc.syscall(clone, 0x10000000 | 17, 0, 0, 0, 0), ctypes.get_errno())\n"
+        "print(libc.syscall(435, 0, 0), ctypes.get_errno())\n"
+        "thread = threading.Thread(target=print, args=('thread',))\n"
+        "thread.start(); thread.join()\n"
+        "child = multiprocessing.get_context('fork').Process(target=print, args=('fork',))\n"
+        "child.start(); child.join()\n",
+        timeout=30,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split("\n")[:4] == ["-1 1", "-1 38", "thread", "fork"]  # EPERM, ENOSYS
+
+
+@pytest.mark.skipif(not _can_unshare(), reason="user namespaces are not available")
+def test_jailed_sandbox_sees_no_app_secrets(monkeypatch):
+    """Only allow-listed variables are inherited; the app and its .env are hidden."""
+    monkeypatch.setenv("DISPATCHER_TOKEN", "secret")
+    result = SandboxPool(create_executor("jail"), size=0).run(
+        "import os\n"
+        "print('DISPATCHER_TOKEN' in os.environ, 'PATH' in os.environ)\n"
+        f"print(os.path.exists({str(BACKEND_DIR / 'tests')!r}), os.listdir({str(BACKEND_DIR / 'app')!r}))\n"
+        f"print(os.path.isfile({str(SANDBOX_DIR / '_warm.py')!r}))\n",
+        timeout=30,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split("\n")[:3] == ["False True", "False ['sandbox']", "True"]
@@ -0,0 +1,113 @@
+"""Tests for incremental lesson sessions."""
+import pytest
+
+from app.services.cell_graph import CellGraph, analyze_cell
+from app.services.sessions import LessonSession, SessionError, SessionManager
+
+CELLS = [
+    ("a", "x = 2"),
+    ("b", "y = x * 3\nprint(y)"),
+    ("c", "import torch\nz = torch.ones(2)\nprint(z.sum().item())"),
+    ("d", "print(y + 1)"),
+    ("e", "x = 100"),
+]
+
+
+def test_analysis_ignores_names_bound_in_the_cell():
+    """A cell's own imports, loop variables and locals aren't dependencies."""
+    symbols = analyze_cell(
+        "import torch\n"
+        "t = torch.zeros(3)\n"
+        "for i in range(3):\n"
+        "    t[i] = i * scale\n"
+        "def f(a):\n"
+        "    b = a + offset\n"
+        "    return b\n"
+        "model.fc.weight.data.mul_(2)\n"
+    )
+    assert symbols.uses == {"range", "scale", "offset", "model"}
+    assert symbols.defines == {"torch", "t", "i", "f", "model"}
+
+
+def test_downstream_follows_reads_of_changed_names():
+    graph = CellGraph(CELLS)
+    assert [graph.ids[i] for i in graph.dependencies(3)] == ["b"]
+    # Editing "a" affects "b" (reads x) and "d" (reads y), not "c" or "e"
+    assert [graph.ids[i] for i in graph.update(0, "x = 5")] == ["b", "d"]
+
+
+@pytest.fixture
+def session():
+    session = LessonSession("lesson", CELLS)
+    yield session
+    session.close()
+
+
+def test_edits_rerun_only_affected_cells(session):
+    """Running a cell runs what it needs; an edit re-runs its downstream cells."""
+    response = session.run("d", None, 10, True)
+    assert [r.cell_id for r in response.results] == ["a", "b", "d"]
+    assert response.results[-1].stdout == "7\n"
+
+    response = session.run("a", "x = 5", 10, True)
+    assert [r.cell_id for r in response.results] == ["a", "b", "d"]
+    assert response.results[-1].stdout == "16\n"
+    assert response.stale == []
+
+    # Without running downstream, dependent cells are reported stale
+    response = session.run("a", "x = 1", 10, False)
+    assert [r.cell_id for r in response.results] == ["a"]
+    assert response.stale == ["b", "d"]
+    response = session.run("d", None, 10, True)
+    assert [r.cell_id for r in response.results] == ["b", "d"]
+    assert response.results[-1].stdout == "4\n"
+    assert response.stale == []
+
+
+def test_overwritten_bindings_are_restored(session):
+    """A later cell rebinding a name makes earlier readers re-run its definer."""
+    session.run("e", None, 10, True)
+    response = session.run("b", None, 10, True)
+    assert [r.cell_id for r in response.results] == ["a", "b"]
+    assert response.results[-1].stdout == "6\n"
+
+
+def test_failing_cell_stops_the_chain(session):
+    session.run("d", None, 10, True)
+    response = session.run("a", "x = undefined_name", 10, True)
+    assert [r.cell_id for r in response.results] == ["a"]
+    assert not response.results[0].success
+    assert "NameError" in response.results[0].error
+    assert response.stale == ["b", "d"]
+
+
+def test_cells_go_through_the_preflight(session):
+    """The execution policy applies to edited cells too, without starting the process."""
+    response = session.run("a", "import subprocess\nx = 2", 10, True)
+    result = response.results[0]
+    assert [r.cell_id for r in response.results] == ["a"]
+    assert not result.success and result.diagnostics[0].kind == "policy"
+    assert "subprocess" in result.error
+    assert session._process is None
+
+
+def test_eviction_skips_sessions_running_a_cell():
+    """Making room never waits for a busy session; an idle one goes instead."""
+    manager = SessionManager(max_sessions=2, idle_timeout=600)
+    busy = manager.create("lesson", CELLS)
+    idle = manager.create("lesson", CELLS)
+    idle.last_used = busy.last_used + 1
+    with busy.lock:
+        newest = manager.create("lesson", CELLS)
+        assert manager.get(busy.id) is busy
+        assert manager.get(idle.id) is None
+        with newest.lock:
+            # Only busy sessions left to close: the limit waits for them
+            manager.create("lesson", CELLS)
+            assert len(manager) == 3
+    manager.create("lesson", CELLS)
+    assert len(manager) == 2 and manager.get(busy.id) is None
+    # A run that got the session before it was evicted doesn't restart it
+    with pytest.raises(SessionError):
+        busy.run("a", None, 10, True)
+    manager.close_all()
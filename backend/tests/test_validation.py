@@ -0,0 +1,49 @@
+"""Tests for the validation service."""
+from app.models import ValidationResult
+from app.services.validation import ValidationService
+
+
+def test_multiline_test_runs_as_one_block():
+    """A test spanning several lines (e.g. a with block) is indented as a whole."""
+    service = ValidationService()
+    response = service._validate_with_asserts(
+        "x = torch.ones(3)",
+        [
+            "assert x.shape == (3,)",
+            "with torch.no_grad():\n    y = x * 2\n    assert y.sum() == 6, 'wrong sum'",
+        ],
+    )
+    assert response.result == ValidationResult.PASSED
+    assert response.passed_tests == 2
+
+
+def test_failing_test_without_message_reports_its_source():
+    """An assertion without a message is reported with the test code."""
+    service = ValidationService()
+    response = service._validate_with_asserts("x = 1", ['assert x == "2"'])
+    assert response.result == ValidationResult.FAILED
+    assert 'assert x == "2"' in response.feedback
+
+
+def test_time_budget_only_counts_user_code():
+    """Code past its budget times out, with the time split by phase."""
+    service = ValidationService(timeout=1)
+    response = service._validate_with_asserts(
+        "def spin():\n    while True:\n        pass", ["spin()"]
+    )
+    assert response.result == ValidationResult.TIMEOUT
+    timing = response.timing
+    assert timing is not None
+    # Imports ran before the budget started; the tests ran out of it
+    assert timing.imports is not None and timing.imports > 0
+    assert 1.0 <= timing.tests < 1.5
+    assert timing.total >= timing.imports + timing.tests
+
+
+def test_timing_breakdown_for_passing_run():
+    """A passing validation reports every phase."""
+    response = ValidationService()._validate_with_asserts("x = 1", ["assert x == 1"])
+    assert response.result == ValidationResult.PASSED
+    timing = response.timing
+    for phase in ("startup", "imports", "user_code", "tests", "teardown"):
+        assert getattr(timing, phase) is not None
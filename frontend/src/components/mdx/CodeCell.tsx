@@ -1,4 +1,4 @@
-import { useState, useCallback } from 'react'
+import { useState, useCallback, useRef } from 'react'
 import Editor from '@monaco-editor/react'
 import { Play, Copy, Check, RotateCcw } from 'lucide-react'
 import { Button } from '../ui/Button'
@@ -19,21 +19,26 @@ export function CodeCell({ id, children, onExecute }: CodeCellProps) {
   const [copied, setCopied] = useState(false)
 
   const { ready, loading: pyodideLoading, execute } = usePyodide()
+  // Running again supersedes the previous run on the server; only the
+  // latest run's result is shown
+  const latestRun = useRef(0)
 
   const handleRun = useCallback(async () => {
-    if (!ready || isRunning) return
+    if (!ready) return
 
+    const run = ++latestRun.current
     setIsRunning(true)
     setOutput(null)
 
     try {
-      const result = await execute(code)
+      const result = await execute(code, id)
+      if (run !== latestRun.current) return
       setOutput(result)
       onExecute?.(result)
     } finally {
-      setIsRunning(false)
+      if (run === latestRun.current) setIsRunning(false)
     }
-  }, [code, ready, isRunning, execute, onExecute])
+  }, [code, id, ready, execute, onExecute])
 
   const handleCopy = useCallback(() => {
     navigator.clipboard.writeText(code)
@@ -80,11 +85,11 @@ export function CodeCell({ id, children, onExecute }: CodeCellProps) {
             variant="primary"
             size="sm"
             onClick={handleRun}
-            loading={isRunning}
-            disabled={!ready || isRunning}
+            disabled={!ready}
+            title={isRunning ? 'Stop this run and start a new one' : undefined}
           >
-            <Play className="w-4 h-4 mr-1" />
-            Run
+            <Play className={`w-4 h-4 mr-1 ${isRunning ? 'animate-pulse' : ''}`} />
+            {isRunning ? 'Rerun' : 'Run'}
           </Button>
         </div>
       </div>
@@ -120,10 +125,19 @@ export function CodeCell({ id, children, onExecute }: CodeCellProps) {
             {output.stdout && <span className="text-dark-text">{output.stdout}</span>}
             {output.stderr && <span className="text-red-400">{output.stderr}</span>}
             {output.error && <span className="text-red-400">{output.error}</span>}
-            {!output.stdout && !output.stderr && !output.error && (
+            {!output.stdout && !output.stderr && !output.error && !output.figures?.length && (
               <span className="text-dark-muted italic">No output</span>
             )}
           </pre>
+          {output.figures?.map((figure) => (
+            <img
+              key={figure.id}
+              src={figure.url}
+              alt="Figure"
+              loading="lazy"
+              className="block max-w-full p-3 bg-white"
+            />
+          ))}
         </div>
       )}
     </div>
@@ -47,7 +47,7 @@ export function usePyodide(): UsePyodideResult {
     }
   }, [])
 
-  const execute = useCallback(async (code: string): Promise<CodeExecutionResult> => {
+  const execute = useCallback(async (code: string, cellId?: string): Promise<CodeExecutionResult> => {
     if (!ready) {
       return {
         success: false,
@@ -57,7 +57,7 @@ export function usePyodide(): UsePyodideResult {
       }
     }
 
-    return executePython(code)
+    return executePython(code, cellId)
   }, [ready])
 
   return { ready, loading, error, execute }
@@ -1,10 +1,19 @@
-import type { Curriculum, Module, ValidationRequest, ValidationResponse, DocInfo, CodeExecutionResult } from '../types'
+import type { Curriculum, Module, LearningPath, ValidationRequest, ValidationResponse, DocInfo, CodeExecutionResult, LessonSession, CellRunRequest, CellRunResponse } from '../types'
 
 export interface CodeExecutionRequest {
   code: string
   timeout?: number
+  profile?: boolean
+  figure_format?: 'png' | 'svg'
+  shared?: boolean
+  job_id?: string
+  cell_id?: string
 }
 
+// Identifies this tab to the server: a new run of a cell supersedes
+// (cancels) the previous run of that cell by the same client
+export const CLIENT_ID = crypto.randomUUID()
+
 const API_BASE = '/api'
 
 class ApiError extends Error {
@@ -31,6 +40,43 @@ async function fetchJson<T>(url: string, options?: RequestInit): Promise<T> {
   return response.json()
 }
 
+// DocRef lookups issued in the same tick are sent as one batch request
+let pendingDocs: Map<string, Array<{ resolve: (info: DocInfo) => void; reject: (err: Error) => void }>> | null = null
+
+function flushDocBatch() {
+  const batch = pendingDocs
+  pendingDocs = null
+  if (!batch) return
+
+  fetchJson<{ docs: Record<string, DocInfo | null> }>(`${API_BASE}/docs/pytorch-batch`, {
+    method: 'POST',
+    body: JSON.stringify({ symbols: [...batch.keys()] }),
+  })
+    .then(({ docs }) => {
+      batch.forEach((waiters, symbol) => {
+        const info = docs[symbol]
+        waiters.forEach(({ resolve, reject }) =>
+          info ? resolve(info) : reject(new ApiError(404, `Documentation for '${symbol}' not found`))
+        )
+      })
+    })
+    .catch((err) => {
+      batch.forEach((waiters) => waiters.forEach(({ reject }) => reject(err)))
+    })
+}
+
+function getDocInfoBatched(symbol: string): Promise<DocInfo> {
+  return new Promise((resolve, reject) => {
+    if (!pendingDocs) {
+      pendingDocs = new Map()
+      setTimeout(flushDocBatch, 0)
+    }
+    const waiters = pendingDocs.get(symbol) ?? []
+    waiters.push({ resolve, reject })
+    pendingDocs.set(symbol, waiters)
+  })
+}
+
 export const api = {
   // Curriculum endpoints
   getCurriculum: (): Promise<Curriculum> =>
@@ -42,21 +88,50 @@ export const api = {
   listModules: (): Promise<string[]> =>
     fetchJson(`${API_BASE}/modules`),
 
+  getModulePrerequisites: (moduleId: string): Promise<LearningPath> =>
+    fetchJson(`${API_BASE}/modules/${moduleId}/prerequisites`),
+
+  getModuleUnlocks: (moduleId: string): Promise<string[]> =>
+    fetchJson(`${API_BASE}/modules/${moduleId}/unlocks`),
+
+  getNextModules: (completed: string[]): Promise<string[]> => {
+    const params = new URLSearchParams()
+    completed.forEach((id) => params.append('completed', id))
+    return fetchJson(`${API_BASE}/learning-path/next?${params}`)
+  },
+
   // Validation endpoint
   validateExercise: (request: ValidationRequest): Promise<ValidationResponse> =>
     fetchJson(`${API_BASE}/validate`, {
       method: 'POST',
-      body: JSON.stringify(request),
+      body: JSON.stringify({ client_id: CLIENT_ID, ...request }),
     }),
 
   // Documentation endpoints
   getDocInfo: (symbol: string): Promise<DocInfo> =>
-    fetchJson(`${API_BASE}/docs/pytorch/${encodeURIComponent(symbol)}`),
+    getDocInfoBatched(symbol),
 
   // Code execution endpoint
   executeCode: (request: CodeExecutionRequest): Promise<CodeExecutionResult> =>
     fetchJson(`${API_BASE}/execute`, {
+      method: 'POST',
+      body: JSON.stringify({ client_id: CLIENT_ID, ...request }),
+    }),
+
+  // Stop a running execution or validation (only this client's jobs)
+  cancelJob: (jobId: string): Promise<{ cancelled: string }> =>
+    fetchJson(`${API_BASE}/jobs/${jobId}/cancel?client_id=${CLIENT_ID}`, { method: 'POST' }),
+
+  // Incremental lesson sessions (persistent namespace per lesson)
+  createLessonSession: (moduleId: string): Promise<LessonSession> =>
+    fetchJson(`${API_BASE}/modules/${moduleId}/sessions`, { method: 'POST' }),
+
+  runSessionCell: (sessionId: string, cellId: string, request: CellRunRequest = {}): Promise<CellRunResponse> =>
+    fetchJson(`${API_BASE}/sessions/${sessionId}/cells/${cellId}/run`, {
       method: 'POST',
       body: JSON.stringify(request),
     }),
+
+  closeLessonSession: (sessionId: string): Promise<{ closed: string }> =>
+    fetchJson(`${API_BASE}/sessions/${sessionId}`, { method: 'DELETE' }),
 }
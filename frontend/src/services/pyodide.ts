@@ -30,7 +30,7 @@ export async function loadPyodideInstance(): Promise<void> {
   await backendChecking
 }
 
-export async function executePython(code: string): Promise<CodeExecutionResult> {
+export async function executePython(code: string, cellId?: string): Promise<CodeExecutionResult> {
   const startTime = performance.now()
 
   try {
@@ -39,7 +39,7 @@ export async function executePython(code: string): Promise<CodeExecutionResult>
     }
 
     // eslint-disable-next-line @typescript-eslint/no-explicit-any
-    const result: any = await api.executeCode({ code, timeout: 30 })
+    const result: any = await api.executeCode({ code, timeout: 30, cell_id: cellId })
 
     // Backend returns execution_time in seconds, convert to ms
     const execTime = result.execution_time || result.executionTime
@@ -50,6 +50,14 @@ export async function executePython(code: string): Promise<CodeExecutionResult>
       stderr: result.stderr || '',
       error: result.error,
       executionTime: execTime ? execTime * 1000 : performance.now() - startTime,
+      timing: result.timing,
+      profile: result.profile,
+      figures: result.figures,
+      worker: result.worker,
+      compileCache: result.compile_cache,
+      diagnostics: result.diagnostics,
+      jobId: result.job_id,
+      cancelled: result.cancelled,
     }
   } catch (error) {
     return {
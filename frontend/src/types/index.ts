@@ -30,6 +30,12 @@ export interface Curriculum {
   total_estimated_minutes: number
 }
 
+export interface LearningPath {
+  module_id: string
+  prerequisites: string[]
+  total_estimated_minutes: number
+}
+
 export interface Exercise {
   id?: string
   starterCode: string
@@ -47,16 +53,108 @@ export interface ValidationRequest {
   exercise_id: string
   module_id: string
   code: string
+  job_id?: string
+}
+
+// Where the time of an execution went, in seconds (measured in the worker)
+export interface ExecutionTiming {
+  queue?: number
+  startup?: number
+  imports?: number
+  user_code?: number
+  tests?: number
+  teardown?: number
+  total: number
+}
+
+// Result of running code with profile: true
+export interface ProfiledOperator {
+  name: string
+  calls: number
+  self_cpu_time_us: number
+  cpu_time_us: number
+  self_memory_bytes: number
+  input_shapes?: string
+}
+
+export interface ExecutionProfile {
+  operators: ProfiledOperator[]
+  self_cpu_time_total_us: number
+  peak_tensor_memory_bytes: number
+  peak_python_memory_bytes: number
+  event_count: number
+  events_truncated: boolean
+}
+
+// Figure drawn by executed code (matplotlib), served from /api/blobs
+export interface ExecutionFigure {
+  id: string
+  url: string
+  media_type: string
+  bytes: number
+}
+
+// Incremental lesson sessions
+export interface SessionCell {
+  id: string
+  defines: string[]
+  uses: string[]
+  depends_on: string[]
+  syntax_error?: string
+}
+
+export interface LessonSession {
+  session_id: string
+  module_id: string
+  cells: SessionCell[]
+}
+
+export interface CellRunRequest {
+  code?: string
+  timeout?: number
+  run_downstream?: boolean
+}
+
+export interface CellRunResult {
+  cell_id: string
+  success: boolean
+  stdout: string
+  stderr: string
+  error?: string
+  execution_time: number
+  figures: ExecutionFigure[]
+}
+
+export interface CellRunResponse {
+  results: CellRunResult[]
+  stale: string[]
+}
+
+// torch.compile graphs loaded from the shared cache vs compiled
+export interface CompileCacheStats {
+  hits: number
+  misses: number
+}
+
+// Problem found before running the code (the code was not run)
+export interface CodeDiagnostic {
+  kind: 'syntax' | 'policy' | 'long_running'
+  message: string
+  line?: number
+  column?: number
 }
 
 export interface ValidationResponse {
-  result: 'passed' | 'failed' | 'error' | 'timeout'
+  result: 'passed' | 'failed' | 'error' | 'timeout' | 'cancelled'
   passed_tests: number
   total_tests: number
   feedback: string
   error_message?: string
   stdout: string
   stderr: string
+  timing?: ExecutionTiming
+  diagnostics?: CodeDiagnostic[]
+  job_id?: string
 }
 
 export interface DocInfo {
@@ -80,6 +178,15 @@ export interface CodeExecutionResult {
   stderr: string
   error?: string
   executionTime?: number
+  timing?: ExecutionTiming
+  profile?: ExecutionProfile
+  figures?: ExecutionFigure[]
+  compileCache?: CompileCacheStats
+  worker?: string
+  diagnostics?: CodeDiagnostic[]
+  jobId?: string
+  // Stopped by a cancel, a disconnect or a newer run of the same cell
+  cancelled?: boolean
 }
 
 // UI State Types
@@ -3,27 +3,55 @@
 Script para executar todos os code snippets do curso e verificar se funcionam.
 
 Usado pelo CI para detectar código desatualizado.
+
+As células são executadas em paralelo num pool de processos "quentes" (que já
+importaram torch), e células cujo conteúdo, versão do torch e preâmbulo não
+mudaram desde a última execução bem-sucedida são puladas.
+
+Com --snapshot, a saída normalizada e os tempos (wall/CPU) de cada célula são
+gravados em scripts/snapshots/torch-<versão>.json, com seed e número de threads
+fixos. Com --compare, a execução atual é comparada a um snapshot gravado
+(por padrão o mais recente), reportando diferenças de saída e células que
+ficaram mais lentas que o limite — útil ao atualizar a versão do PyTorch.
+
+Uso:
+    python scripts/run-snippets.py
+    python scripts/run-snippets.py --workers 4 --junit snippets.xml --json snippets.json
+    python scripts/run-snippets.py --no-cache        # executa tudo
+    python scripts/run-snippets.py --fresh           # um interpretador novo por célula
+    python scripts/run-snippets.py --snapshot        # grava o snapshot da versão atual
+    python scripts/run-snippets.py --compare 2.2.0   # compara com o snapshot do torch 2.2.0
 """
 
+import argparse
+import contextlib
+import difflib
+import hashlib
+import io
+import json
+import os
 import re
+import resource
+import signal
 import subprocess
 import sys
 import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from importlib import metadata
 from pathlib import Path
+from xml.etree import ElementTree as ET
 
+# A extração das CodeCells é a mesma do backend (app/mdx.py só usa a stdlib)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.mdx import extract_code_cells  # noqa: E402
 
-def extract_code_cells(mdx_content: str) -> list[tuple[str, str]]:
-    """Extrai código de CodeCells do MDX."""
-    pattern = r'<CodeCell\s+id="([^"]+)">([\s\S]*?)</CodeCell>'
-    matches = re.findall(pattern, mdx_content)
-    return [(cell_id, code.strip()) for cell_id, code in matches]
-
-
-def run_code(code: str, timeout: int = 30) -> tuple[bool, str]:
-    """Executa código Python e retorna (sucesso, output/erro)."""
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
-        # Adicionar imports comuns
-        full_code = """
+# Imports comuns disponíveis em todas as células
+PREAMBLE = """
 import warnings
 warnings.filterwarnings('ignore')
 import torch
@@ -33,71 +61,670 @@ import torch.optim as optim
 from torch.utils.data import Dataset, DataLoader, TensorDataset
 import numpy as np
 
-""" + code
-        f.write(full_code)
+"""
+
+DEFAULT_CACHE = Path(".cache/snippets.json")
+SNAPSHOT_DIR = Path(__file__).parent / "snapshots"
+SNAPSHOT_FORMAT = 1
+
+# Reexecução determinística (snapshots): seed e threads fixos antes de cada célula
+DETERMINISM = """
+import random as _random
+_random.seed({seed})
+np.random.seed({seed})
+torch.manual_seed({seed})
+torch.set_num_threads({threads})
+"""
+
+
+@dataclass
+class Cell:
+    """Uma CodeCell de uma lição."""
+
+    module: str
+    cell_id: str
+    code: str
+
+    @property
+    def name(self) -> str:
+        return f"{self.module}/{self.cell_id}"
+
+
+@dataclass
+class CellResult:
+    """Resultado da execução de uma célula."""
+
+    name: str
+    status: str  # "passed", "failed" ou "cached"
+    duration: float = 0.0
+    cpu_time: float = 0.0
+    output: str = ""
+    error: str = ""
+
+
+def collect_cells(content_dir: Path) -> list[Cell]:
+    """Coleta todas as CodeCells de todas as lições, em ordem."""
+    cells = []
+    for module_dir in sorted(d for d in content_dir.iterdir() if d.is_dir()):
+        lesson_file = module_dir / "lesson.mdx"
+        if not lesson_file.exists():
+            continue
+        content = lesson_file.read_text(encoding="utf-8")
+        for cell_id, code in extract_code_cells(content):
+            cells.append(Cell(module_dir.name, cell_id, code))
+    return cells
+
+
+def torch_version() -> str:
+    """Versão do torch instalada, sem importá-lo."""
+    try:
+        return metadata.version("torch")
+    except metadata.PackageNotFoundError:
+        return "none"
+
+
+def cell_key(cell: Cell, version: str) -> str:
+    """Hash do conteúdo da célula, do preâmbulo e das versões de torch/Python."""
+    h = hashlib.sha256()
+    for part in (PREAMBLE, cell.code, version, sys.version):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def load_cache(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path: Path, cache: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(cache, indent=1, sort_keys=True), encoding="utf-8")
+
+
+def run_code(code: str, timeout: int = 30, prelude: str = "") -> tuple[bool, str]:
+    """Executa código Python num interpretador novo e retorna (sucesso, output/erro)."""
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
+        f.write(PREAMBLE + prelude + code)
         script_path = f.name
 
     try:
         result = subprocess.run(
-            ["python", script_path],
+            [sys.executable, script_path],
             capture_output=True,
             text=True,
             timeout=timeout,
         )
-        Path(script_path).unlink()
-
         if result.returncode != 0:
             return False, result.stderr
         return True, result.stdout
     except subprocess.TimeoutExpired:
-        Path(script_path).unlink()
         return False, f"Timeout após {timeout}s"
     except Exception as e:
-        Path(script_path).unlink()
         return False, str(e)
+    finally:
+        Path(script_path).unlink(missing_ok=True)
+
+
+# --- Worker (executado nos processos do pool) ---
+
+_preamble_namespace: dict = {}
+_determinism = ""
+
+
+class CellTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise CellTimeout()
+
+
+def warm_worker(determinism: str = "") -> None:
+    """Inicializa o worker: importa o preâmbulo uma única vez."""
+    global _determinism
+    exec(PREAMBLE, _preamble_namespace)
+    signal.signal(signal.SIGALRM, _on_alarm)
+    _determinism = determinism
+
+
+def _reset_torch_state() -> None:
+    """Desfaz alterações globais comuns que uma célula pode deixar para a próxima."""
+    import torch
+
+    torch.set_grad_enabled(True)
+    torch.set_default_dtype(torch.float32)
+    torch.manual_seed(torch.initial_seed())
+
+
+def run_in_worker(
+    name: str, code: str, timeout: int
+) -> tuple[bool, str, float, float]:
+    """
+    Executa uma célula num namespace novo.
+
+    Retorna (sucesso, output/erro, duração, tempo de CPU).
+    """
+    namespace = dict(_preamble_namespace)
+    namespace["__name__"] = "__main__"
+    if _determinism:
+        exec(_determinism, namespace)
+    output = io.StringIO()
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            exec(compile(code, name, "exec"), namespace)
+        ok, text = True, output.getvalue()
+    except CellTimeout:
+        ok, text = False, f"Timeout após {timeout}s"
+    except BaseException:
+        ok, text = False, output.getvalue() + traceback.format_exc()
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        _reset_torch_state()
+    return ok, text, time.perf_counter() - start, time.process_time() - cpu_start
+
+
+# --- Orquestração ---
+
+
+def _children_cpu_time() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_fresh(cells: list[Cell], timeout: int, determinism: str = "") -> list[CellResult]:
+    """Executa cada célula num interpretador novo (modo antigo, mais lento)."""
+    results = []
+    for cell in cells:
+        start = time.perf_counter()
+        cpu_start = _children_cpu_time()
+        ok, output = run_code(cell.code, timeout, determinism)
+        results.append(
+            CellResult(
+                cell.name,
+                "passed" if ok else "failed",
+                time.perf_counter() - start,
+                # Inclui a importação do torch pelo interpretador novo
+                cpu_time=_children_cpu_time() - cpu_start,
+                output=output if ok else "",
+                error="" if ok else output,
+            )
+        )
+    return results
+
+
+def run_pool(
+    cells: list[Cell], workers: int, timeout: int, determinism: str = ""
+) -> list[CellResult]:
+    """Executa as células num pool de workers quentes."""
+    results: dict[str, CellResult] = {}
+    crashed: list[Cell] = []
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=warm_worker, initargs=(determinism,)
+    ) as pool:
+        futures = {pool.submit(run_in_worker, c.name, c.code, timeout): c for c in cells}
+        for future in as_completed(futures):
+            cell = futures[future]
+            try:
+                ok, output, duration, cpu_time = future.result()
+            except BrokenProcessPool:
+                crashed.append(cell)
+                continue
+            results[cell.name] = CellResult(
+                cell.name,
+                "passed" if ok else "failed",
+                duration,
+                cpu_time=cpu_time,
+                output=output if ok else "",
+                error="" if ok else output,
+            )
+            print(f"{'✓' if ok else '✗'} {cell.name} ({duration:.2f}s)", flush=True)
+
+    # Um worker que morreu (segfault, os._exit...) derruba o pool inteiro;
+    # reexecuta essas células isoladamente para identificar a culpada.
+    for result in run_fresh(crashed, timeout, determinism):
+        results[result.name] = result
+        print(f"{'✓' if result.status == 'passed' else '✗'} {result.name} (isolada)", flush=True)
+
+    return [results[c.name] for c in cells]
+
+
+# --- Snapshots ---
+
+_ADDRESS = re.compile(r"\b0x[0-9a-fA-F]{6,}\b")
+_DURATION = re.compile(r"\b\d+(?:\.\d+)?\s?(?:ns|µs|us|ms|s)\b")
+_LONG_FLOAT = re.compile(r"(?<![\w.])-?\d+\.\d{5,}")
+_SPEEDUP = re.compile(r"~?\b\d+(?:\.\d+)?x\b")
+# id() e outros inteiros que dependem do processo
+_LARGE_INT = re.compile(r"(?<![\w.])\d{12,}\b")
+VOLATILE_LINE = "<variável>"
+
+
+def normalize_output(text: str) -> str:
+    """
+    Normaliza a saída de uma célula para comparação entre execuções.
+
+    Remove endereços de memória, ids e tempos medidos pela própria célula, e
+    arredonda floats longos para 4 casas (diferenças no último dígito entre
+    versões do PyTorch não são mudanças de conteúdo).
+    """
+    text = _ADDRESS.sub("0x…", text)
+    text = _LARGE_INT.sub("<id>", text)
+    text = _DURATION.sub("<tempo>", text)
+    text = _SPEEDUP.sub("<N>x", text)
+    text = _LONG_FLOAT.sub(lambda m: f"{float(m.group()):.4f}".replace("-0.0000", "0.0000"), text)
+    lines = [line.rstrip() for line in text.splitlines()]
+    return "\n".join(lines).strip("\n")
+
+
+def error_summary(error: str) -> str:
+    """Última linha do traceback (tipo e mensagem da exceção), normalizada."""
+    lines = error.strip().splitlines()
+    return normalize_output(lines[-1]) if lines else ""
+
+
+def snapshot_path(version: str) -> Path:
+    return SNAPSHOT_DIR / f"torch-{version}.json"
+
+
+def _volatile_lines(outputs: list[str]) -> list[int] | str:
+    """Linhas que mudaram entre execuções idênticas ("all" se o tamanho mudou)."""
+    split = [o.splitlines() for o in outputs]
+    if len({len(lines) for lines in split}) > 1:
+        return "all"
+    return [i for i, lines in enumerate(zip(*split)) if len(set(lines)) > 1]
+
+
+def _mask(text: str, volatile: list[int] | str) -> str:
+    if volatile == "all":
+        return VOLATILE_LINE
+    lines = text.splitlines()
+    for i in volatile:
+        if i < len(lines):
+            lines[i] = VOLATILE_LINE
+    return "\n".join(lines)
+
+
+def _merge_volatile(a: list[int] | str, b: list[int] | str) -> list[int] | str:
+    if a == "all" or b == "all":
+        return "all"
+    return sorted(set(a) | set(b))
+
+
+def build_snapshot(
+    runs: list[list[CellResult]], version: str, seed: int, threads: int, mode: str
+) -> dict:
+    """
+    Snapshot com a saída normalizada e os tempos de cada célula.
+
+    Com mais de uma execução, os tempos são os menores observados e as linhas
+    da saída que variaram entre execuções (valores de torch.empty, medições de
+    speedup...) ficam marcadas como voláteis e são ignoradas na comparação.
+    """
+    cells = {}
+    for attempts in zip(*runs):
+        first = attempts[0]
+        outputs = [normalize_output(r.output) for r in attempts]
+        cells[first.name] = {
+            "status": first.status,
+            "output": outputs[0],
+            "error": error_summary(first.error),
+            "volatile": _volatile_lines(outputs),
+            "wall": round(min(r.duration for r in attempts), 4),
+            "cpu": round(min(r.cpu_time for r in attempts), 4),
+        }
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "torch_version": version,
+        "python_version": sys.version.split()[0],
+        "seed": seed,
+        "threads": threads,
+        "mode": mode,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "cells": cells,
+    }
+
+
+def find_snapshot(ref: str, version: str) -> Path | None:
+    """
+    Resolve o snapshot de referência: um arquivo, uma versão do torch ou
+    "latest" (o da versão atual, se existir, senão o gravado mais recentemente).
+    """
+    if ref != "latest":
+        path = Path(ref)
+        if path.is_file():
+            return path
+        path = snapshot_path(ref)
+        return path if path.is_file() else None
+
+    if snapshot_path(version).is_file():
+        return snapshot_path(version)
+    candidates = []
+    for path in SNAPSHOT_DIR.glob("torch-*.json"):
+        snapshot = load_cache(path)
+        if snapshot.get("format") == SNAPSHOT_FORMAT:
+            candidates.append((snapshot.get("created_at", ""), path))
+    return max(candidates)[1] if candidates else None
+
+
+def compare_snapshots(
+    baseline: dict, current: dict, slowdown: float, min_delta: float
+) -> dict:
+    """
+    Compara dois snapshots.
+
+    Uma célula regrediu quando seu tempo (wall) ficou mais de ``slowdown``
+    vezes maior e ao menos ``min_delta`` segundos mais lento.
+    """
+    before, after = baseline["cells"], current["cells"]
+    report = {
+        "baseline_torch_version": baseline["torch_version"],
+        "torch_version": current["torch_version"],
+        "new_cells": sorted(after.keys() - before.keys()),
+        "removed_cells": sorted(before.keys() - after.keys()),
+        "status_changes": [],
+        "output_changes": [],
+        "regressions": [],
+    }
+
+    for name in report["new_cells"]:
+        if after[name]["status"] == "failed":
+            report["status_changes"].append(
+                {"cell": name, "before": None, "after": "failed",
+                 "error": after[name]["error"]}
+            )
+
+    for name in sorted(after.keys() & before.keys()):
+        old, new = before[name], after[name]
+        if old["status"] != new["status"]:
+            report["status_changes"].append(
+                {"cell": name, "before": old["status"], "after": new["status"],
+                 "error": new["error"]}
+            )
+            continue
+        volatile = _merge_volatile(old.get("volatile", []), new.get("volatile", []))
+        old_output = _mask(old["output"], volatile)
+        new_output = _mask(new["output"], volatile)
+        if old_output != new_output or old["error"] != new["error"]:
+            diff = difflib.unified_diff(
+                (old_output or old["error"]).splitlines(),
+                (new_output or new["error"]).splitlines(),
+                f"torch-{baseline['torch_version']}",
+                f"torch-{current['torch_version']}",
+                lineterm="",
+            )
+            report["output_changes"].append({"cell": name, "diff": "\n".join(diff)})
+        if (
+            new["wall"] > old["wall"] * slowdown
+            and new["wall"] - old["wall"] >= min_delta
+        ):
+            report["regressions"].append(
+                {
+                    "cell": name,
+                    "before": old["wall"],
+                    "after": new["wall"],
+                    "ratio": round(new["wall"] / old["wall"], 2) if old["wall"] else None,
+                    "cpu_before": old["cpu"],
+                    "cpu_after": new["cpu"],
+                }
+            )
+
+    report["regressions"].sort(key=lambda r: r["before"] - r["after"])
+    return report
+
+
+def print_comparison(report: dict) -> None:
+    print(f"\n{'=' * 50}")
+    print(
+        f"Comparação: torch {report['baseline_torch_version']} → "
+        f"{report['torch_version']}"
+    )
+
+    for change in report["status_changes"]:
+        print(f"\n✗ {change['cell']}: {change['before'] or 'nova'} → {change['after']}")
+        if change["error"]:
+            print(f"  {change['error']}")
+
+    for change in report["output_changes"]:
+        print(f"\n≠ {change['cell']}: saída mudou")
+        print(change["diff"][:2000])
+
+    if report["regressions"]:
+        print("\nMais lentas que o limite:")
+        for r in report["regressions"]:
+            ratio = f"{r['ratio']:.1f}x" if r["ratio"] else "—"
+            print(f"  {r['before']:6.2f}s → {r['after']:6.2f}s ({ratio})  {r['cell']}")
+
+    if report["new_cells"]:
+        print(f"\nCélulas novas (sem referência): {len(report['new_cells'])}")
+    if report["removed_cells"]:
+        print(f"Células removidas: {len(report['removed_cells'])}")
+
+    print(
+        f"\nMudanças de status: {len(report['status_changes'])}, "
+        f"saídas diferentes: {len(report['output_changes'])}, "
+        f"regressões de tempo: {len(report['regressions'])}"
+    )
+
+
+def comparison_failed(report: dict) -> bool:
+    return bool(
+        report["status_changes"] or report["output_changes"] or report["regressions"]
+    )
+
+
+def write_junit(path: Path, results: list[CellResult], total_time: float) -> None:
+    """Escreve um relatório JUnit XML."""
+    failures = sum(r.status == "failed" for r in results)
+    skipped = sum(r.status == "cached" for r in results)
+    suite = ET.Element(
+        "testsuite",
+        name="snippets",
+        tests=str(len(results)),
+        failures=str(failures),
+        skipped=str(skipped),
+        time=f"{total_time:.3f}",
+    )
+    for r in results:
+        module, _, cell_id = r.name.partition("/")
+        case = ET.SubElement(
+            suite, "testcase", classname=module, name=cell_id, time=f"{r.duration:.3f}"
+        )
+        if r.status == "failed":
+            message = (r.error.strip().splitlines() or ["falhou"])[-1]
+            failure = ET.SubElement(case, "failure", message=message)
+            failure.text = r.error
+        elif r.status == "cached":
+            ET.SubElement(case, "skipped", message="inalterada desde a última execução verde")
+    ET.ElementTree(suite).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def write_json(
+    path: Path,
+    results: list[CellResult],
+    total_time: float,
+    version: str,
+    comparison: dict | None = None,
+) -> None:
+    """Escreve um relatório JSON com o tempo de cada célula."""
+    report = {
+        "torch_version": version,
+        "total_time": round(total_time, 3),
+        "summary": {
+            status: sum(r.status == status for r in results)
+            for status in ("passed", "failed", "cached")
+        },
+        "cells": [asdict(r) for r in results],
+    }
+    if comparison is not None:
+        report["comparison"] = comparison
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
 
 
 def main():
-    content_dir = Path("content")
-    if not content_dir.exists():
-        print("Erro: Diretório 'content' não encontrado")
+    parser = argparse.ArgumentParser(description="Executa as CodeCells do curso")
+    parser.add_argument("--content-dir", type=Path, default=Path("content"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--timeout", type=int, default=30, help="Timeout por célula (s)")
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE)
+    parser.add_argument("--no-cache", action="store_true", help="Executa todas as células")
+    parser.add_argument("--fresh", action="store_true", help="Um interpretador novo por célula")
+    parser.add_argument("--junit", type=Path, help="Relatório JUnit XML")
+    parser.add_argument("--json", type=Path, help="Relatório JSON")
+    parser.add_argument(
+        "--snapshot", action="store_true", help="Grava o snapshot da versão atual do torch"
+    )
+    parser.add_argument(
+        "--compare",
+        nargs="?",
+        const="latest",
+        metavar="REF",
+        help="Compara com um snapshot (versão do torch, arquivo ou 'latest')",
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=2,
+        help="Execuções por célula em --snapshot/--compare (menor tempo; detecta saídas voláteis)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed dos snapshots")
+    parser.add_argument("--threads", type=int, default=1, help="Threads do torch nos snapshots")
+    parser.add_argument(
+        "--slowdown",
+        type=float,
+        default=1.5,
+        help="Fator de lentidão a partir do qual uma célula é uma regressão",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=0.1,
+        help="Diferença mínima (s) para contar uma regressão de tempo",
+    )
+    args = parser.parse_args()
+
+    if not args.content_dir.exists():
+        print(f"Erro: Diretório '{args.content_dir}' não encontrado")
         return 1
 
-    modules = sorted([d for d in content_dir.iterdir() if d.is_dir()])
-    total_cells = 0
-    failed_cells = []
+    started = time.perf_counter()
+    version = torch_version()
+    cells = collect_cells(args.content_dir)
+    cache = {} if args.no_cache else load_cache(args.cache)
+    keys = {c.name: cell_key(c, version) for c in cells}
 
-    for module_dir in modules:
-        lesson_file = module_dir / "lesson.mdx"
-        if not lesson_file.exists():
-            continue
+    baseline = None
+    if args.compare:
+        baseline_path = find_snapshot(args.compare, version)
+        if baseline_path is None:
+            print(f"Erro: snapshot '{args.compare}' não encontrado em {SNAPSHOT_DIR}")
+            return 1
+        baseline = load_cache(baseline_path)
+        print(f"Comparando com {baseline_path}")
 
-        content = lesson_file.read_text(encoding="utf-8")
-        cells = extract_code_cells(content)
+    determinism = ""
+    if args.snapshot or baseline is not None:
+        # Snapshots executam tudo, com seed e threads fixos
+        seed = baseline["seed"] if baseline else args.seed
+        threads = baseline["threads"] if baseline else args.threads
+        determinism = DETERMINISM.format(seed=seed, threads=threads)
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+            os.environ[var] = str(threads)
+        to_run = cells
+    else:
+        to_run = [c for c in cells if keys[c.name] not in cache]
+        print(f"{len(cells)} células, {len(cells) - len(to_run)} inalteradas desde a última execução verde")
 
-        for cell_id, code in cells:
-            total_cells += 1
-            print(f"Executando {module_dir.name}/{cell_id}...", end=" ")
+    if args.fresh:
+        ran = run_fresh(to_run, args.timeout, determinism)
+    else:
+        ran = (
+            run_pool(to_run, max(1, args.workers), args.timeout, determinism)
+            if to_run
+            else []
+        )
+    ran_by_name = {r.name: r for r in ran}
 
-            success, output = run_code(code)
-            if success:
-                print("✓")
-            else:
-                print("✗")
-                failed_cells.append((f"{module_dir.name}/{cell_id}", output))
+    results = []
+    new_cache = {}
+    for cell in cells:
+        key = keys[cell.name]
+        result = ran_by_name.get(cell.name)
+        if result is None:
+            results.append(CellResult(cell.name, "cached", cache[key].get("duration", 0.0)))
+            new_cache[key] = cache[key]
+        else:
+            results.append(result)
+            if result.status == "passed":
+                new_cache[key] = {"cell": cell.name, "duration": round(result.duration, 3)}
+
+    if not args.no_cache:
+        save_cache(args.cache, new_cache)
+
+    total_time = time.perf_counter() - started
+    failed_cells = [r for r in results if r.status == "failed"]
 
     print(f"\n{'=' * 50}")
-    print(f"Total: {total_cells} code cells")
-    print(f"Sucesso: {total_cells - len(failed_cells)}")
+    print(f"Total: {len(results)} code cells em {total_time:.1f}s")
+    print(f"Sucesso: {sum(r.status == 'passed' for r in results)}")
+    print(f"Inalteradas (cache): {sum(r.status == 'cached' for r in results)}")
     print(f"Falhas: {len(failed_cells)}")
 
+    slowest = sorted((r for r in results if r.status != "cached"), key=lambda r: -r.duration)[:5]
+    if slowest:
+        print("\nMais lentas:")
+        for r in slowest:
+            print(f"  {r.duration:6.2f}s  {r.name}")
+
     if failed_cells:
         print("\nFALHAS:")
-        for cell_id, error in failed_cells:
-            print(f"\n--- {cell_id} ---")
-            print(error[:500])
+        for r in failed_cells:
+            print(f"\n--- {r.name} ---")
+            print(r.error[:500])
+
+    exit_code = 1 if failed_cells else 0
+    mode = "fresh" if args.fresh else "pool"
+    comparison = None
+    if determinism:
+        runs = [results]
+        for _ in range(args.runs - 1):
+            print("\nExecutando novamente para detectar saídas voláteis...")
+            if args.fresh:
+                runs.append(run_fresh(cells, args.timeout, determinism))
+            else:
+                runs.append(run_pool(cells, max(1, args.workers), args.timeout, determinism))
+        snapshot = build_snapshot(runs, version, seed, threads, mode)
+        if args.snapshot:
+            path = snapshot_path(version)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(
+                json.dumps(snapshot, indent=1, ensure_ascii=False, sort_keys=True) + "\n",
+                encoding="utf-8",
+            )
+            print(f"\nSnapshot gravado em {path}")
+        if baseline is not None:
+            if baseline.get("mode") != mode:
+                print(
+                    f"\nAviso: o snapshot foi gravado no modo '{baseline.get('mode')}' "
+                    f"e esta execução usa '{mode}'; os tempos não são comparáveis"
+                )
+            comparison = compare_snapshots(baseline, snapshot, args.slowdown, args.min_delta)
+            print_comparison(comparison)
+            # Na comparação, falhas que já existiam no snapshot não contam
+            exit_code = 1 if comparison_failed(comparison) else 0
+
+    if args.junit:
+        write_junit(args.junit, results, total_time)
+    if args.json:
+        write_json(args.json, results, total_time, version, comparison)
 
-    return 1 if failed_cells else 0
+    return exit_code
 
 
 if __name__ == "__main__":
@@ -64,6 +64,11 @@ def main():
             print(f"✓ Atualizado: {mdx_file}")
 
     print(f"\nTotal: {len(updated_files)} arquivos atualizados")
+    if updated_files:
+        print(
+            "Com o novo PyTorch instalado, compare as saídas e tempos das células com:\n"
+            "    python scripts/run-snippets.py --compare"
+        )
     return 0
 
 
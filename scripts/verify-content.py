@@ -7,91 +7,545 @@ Verifica:
 - Frontmatter está correto
 - Exercícios referenciados existem
 - Links de pré-requisitos são válidos
+- Pré-requisitos não formam ciclos
+- Testes e soluções dos exercícios compilam
+- A solução de cada exercício passa nos próprios testes
+
+As soluções são executadas em paralelo num pool de processos que já
+importaram torch, várias vezes cada, para detectar testes instáveis (que
+passam numa execução e falham em outra) e exercícios lentos.
+
+Uso:
+    python scripts/verify-content.py
+    python scripts/verify-content.py --workers 4 --repeat 3 --report verify-report.json
+    python scripts/verify-content.py --no-exec      # só estrutura e compilação
 """
 
+import argparse
+import ast
+import contextlib
+import io
 import json
+import os
 import re
+import signal
+import statistics
 import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from graphlib import CycleError, TopologicalSorter
+from importlib import metadata
 from pathlib import Path
 
 import frontmatter
 
+# Mesmos imports que o ValidationService coloca antes do código do aluno
+PREAMBLE = """
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+"""
+
 
-def verify_module(module_dir: Path, all_modules: set) -> list[str]:
-    """Verifica um módulo e retorna lista de erros."""
-    errors = []
-    module_id = module_dir.name
+@dataclass
+class LoadedModule:
+    """Um módulo lido do disco uma única vez."""
 
-    # Verificar arquivos necessários
+    module_id: str
+    metadata: dict = field(default_factory=dict)
+    lesson: str = ""
+    exercises: dict = field(default_factory=dict)
+    errors: list[str] = field(default_factory=list)
+
+
+@dataclass
+class ExerciseReport:
+    """Resultado da verificação de um exercício."""
+
+    name: str
+    status: str = "passed"  # "passed", "failed", "flaky", "invalid" ou "skipped"
+    runs: int = 0
+    duration: float = 0.0  # mediana das execuções (s)
+    slow: bool = False
+    errors: list[str] = field(default_factory=list)
+    test_durations: list[float] = field(default_factory=list)  # mediana por teste (s)
+
+
+def load_module(module_dir: Path) -> LoadedModule:
+    """Lê lesson.mdx e exercises.json de um módulo."""
+    module = LoadedModule(module_dir.name)
     lesson_file = module_dir / "lesson.mdx"
     exercises_file = module_dir / "exercises.json"
 
     if not lesson_file.exists():
-        errors.append(f"[{module_id}] Faltando lesson.mdx")
-        return errors
+        module.errors.append(f"[{module.module_id}] Faltando lesson.mdx")
+        return module
 
-    # Verificar frontmatter
     try:
         post = frontmatter.load(lesson_file)
-        required_fields = ["title", "order", "prerequisites", "estimatedMinutes", "pytorchVersion"]
-        for field in required_fields:
-            if field not in post.metadata:
-                errors.append(f"[{module_id}] Faltando campo no frontmatter: {field}")
+        module.metadata = post.metadata
+        module.lesson = post.content
     except Exception as e:
-        errors.append(f"[{module_id}] Erro ao parsear frontmatter: {e}")
+        module.errors.append(f"[{module.module_id}] Erro ao parsear frontmatter: {e}")
+        return module
+
+    if exercises_file.exists():
+        try:
+            module.exercises = json.loads(exercises_file.read_text(encoding="utf-8"))
+        except json.JSONDecodeError as e:
+            module.errors.append(f"[{module.module_id}] Erro no exercises.json: {e}")
+            module.exercises = None
+    else:
+        module.exercises = None
+
+    return module
+
+
+def verify_module(module: LoadedModule, all_modules: set) -> list[str]:
+    """Verifica um módulo e retorna lista de erros."""
+    errors = list(module.errors)
+    module_id = module.module_id
+    if not module.lesson:
         return errors
 
+    # Verificar frontmatter
+    required_fields = ["title", "order", "prerequisites", "estimatedMinutes", "pytorchVersion"]
+    for field_name in required_fields:
+        if field_name not in module.metadata:
+            errors.append(f"[{module_id}] Faltando campo no frontmatter: {field_name}")
+
     # Verificar pré-requisitos
-    for prereq in post.get("prerequisites", []):
+    for prereq in module.metadata.get("prerequisites", []):
         if prereq not in all_modules:
             errors.append(f"[{module_id}] Pré-requisito inválido: {prereq}")
 
     # Verificar exercícios
-    content = lesson_file.read_text(encoding="utf-8")
-    exercise_refs = re.findall(r'<Exercise\s+id="([^"]+)"', content)
+    exercise_refs = re.findall(r'<Exercise\s+id="([^"]+)"', module.lesson)
 
-    if exercises_file.exists():
-        try:
-            exercises = json.loads(exercises_file.read_text(encoding="utf-8"))
-            for ref in exercise_refs:
-                if ref not in exercises:
-                    errors.append(f"[{module_id}] Exercício referenciado mas não definido: {ref}")
-            for ex_id in exercises:
-                if ex_id not in exercise_refs:
-                    errors.append(f"[{module_id}] Exercício definido mas não usado: {ex_id}")
-        except json.JSONDecodeError as e:
-            errors.append(f"[{module_id}] Erro no exercises.json: {e}")
-    elif exercise_refs:
+    if module.exercises is not None:
+        for ref in exercise_refs:
+            if ref not in module.exercises:
+                errors.append(f"[{module_id}] Exercício referenciado mas não definido: {ref}")
+        for ex_id in module.exercises:
+            if ex_id not in exercise_refs:
+                errors.append(f"[{module_id}] Exercício definido mas não usado: {ex_id}")
+    elif exercise_refs and not module.errors:
         errors.append(f"[{module_id}] Exercícios referenciados mas exercises.json não existe")
 
     return errors
 
 
+def verify_prerequisite_graph(modules: list[LoadedModule]) -> list[str]:
+    """Verifica que os pré-requisitos formam um grafo acíclico."""
+    # Erros de frontmatter já são reportados por verify_module
+    graph = {m.module_id: m.metadata.get("prerequisites", []) for m in modules if m.lesson}
+
+    try:
+        tuple(TopologicalSorter(graph).static_order())
+    except CycleError as e:
+        cycle = " -> ".join(reversed(e.args[1]))
+        return [f"Ciclo de pré-requisitos: {cycle}"]
+    return []
+
+
+def compile_exercise(name: str, exercise: dict) -> list[str]:
+    """Compila a solução e cada teste de um exercício; retorna os erros."""
+    errors = []
+    validation = exercise.get("validation", {})
+    validation_type = validation.get("type", "assert")
+
+    if "solution" not in exercise:
+        errors.append(f"[{name}] Exercício sem solution")
+    else:
+        try:
+            compile(exercise["solution"], f"{name}/solution", "exec")
+        except SyntaxError as e:
+            errors.append(f"[{name}] Solução não compila (linha {e.lineno}): {e.msg}")
+
+    if validation_type == "assert":
+        tests = validation.get("tests", [])
+        if not tests:
+            errors.append(f"[{name}] Exercício sem testes")
+        for i, test in enumerate(tests, 1):
+            try:
+                compile(test, f"{name}/test-{i}", "exec")
+            except SyntaxError as e:
+                errors.append(f"[{name}] Teste {i} não compila: {e.msg}")
+    elif validation_type != "output":
+        errors.append(f"[{name}] Tipo de validação desconhecido: {validation_type}")
+
+    return errors
+
+
+_DEFINES = re.compile(r"^(?:(?:async\s+)?(?:class|def)\s+(\w+)|([\w.]+)\s*(?::[^=]*)?=(?!=))")
+
+
+def _top_level_blocks(code: str) -> list[list[str]]:
+    """Divide o código em blocos de linhas, um por instrução de nível zero."""
+    blocks: list[list[str]] = []
+    for line in code.splitlines():
+        starts_block = line[:1] not in ("", " ", "\t", ")", "]", "}")
+        if starts_block or not blocks:
+            blocks.append([line])
+        else:
+            blocks[-1].append(line)
+    return blocks
+
+
+def _block_key(lines: list[str]) -> str | None:
+    """
+    Chave para casar um bloco do starterCode com uma instrução da solução:
+    o nome definido (atribuição, classe, função) ou o cabeçalho de um
+    bloco composto (``for i, layer in enumerate(model):``).
+    """
+    first = lines[0].split("#", 1)[0].strip()
+    match = _DEFINES.match(first)
+    if match:
+        return match.group(1) or match.group(2)
+    if first.endswith(":"):
+        return re.sub(r"\s+", " ", first)
+    return None
+
+
+def _is_hole(lines: list[str]) -> bool:
+    """Comentário seguido de linhas em branco: o espaço onde o aluno escreve."""
+    blank = [line for line in lines[1:] if not line.strip()]
+    return lines[0].lstrip().startswith("#") and len(blank) == len(lines) - 1 >= 1
+
+
+def complete_starter(starter: str, solution: str) -> str:
+    """
+    Monta o código que o aluno enviaria: o starterCode com as lacunas
+    preenchidas pela solução.
+
+    A solução traz só as instruções que o aluno escreve (``y = x ** 3``,
+    ``y.backward()``...). Uma instrução que define um nome (ou abre o mesmo
+    bloco ``for``/``if``) substitui o bloco correspondente do starterCode
+    (``y = `` incompleto, uma classe com métodos vazios...); as demais
+    preenchem os espaços em branco deixados após comentários entre as
+    instruções casadas (``# Faça backward``).
+    """
+    tree = ast.parse(solution)
+    lines = solution.splitlines()
+    chunks = []
+    for i, node in enumerate(tree.body):
+        start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+        end = tree.body[i + 1].lineno - 1 if i + 1 < len(tree.body) else len(lines)
+        chunk = "\n".join(lines[start - 1 : end]).rstrip()
+        chunks.append((_block_key(chunk.splitlines()), chunk))
+
+    blocks = _top_level_blocks(starter)
+    keys = [_block_key(block) for block in blocks]
+    holes = [i for i, block in enumerate(blocks) if _is_hole(block)]
+
+    # Instruções que casam com um bloco, em ordem crescente no starterCode
+    positions: list[int | None] = []
+    cursor = -1
+    for key, _ in chunks:
+        matches = [i for i, k in enumerate(keys) if key and k == key and i not in positions]
+        after = [i for i in matches if i > cursor] or matches
+        positions.append(after[0] if after else None)
+        if after:
+            cursor = after[0]
+
+    placed: dict[int, list[str]] = {}
+    before: dict[int, list[str]] = {}
+    i = 0
+    while i < len(chunks):
+        if positions[i] is not None:
+            placed.setdefault(positions[i], []).append(chunks[i][1])
+            i += 1
+            continue
+        # Grupo de instruções sem bloco correspondente: vão para os espaços
+        # em branco entre a instrução casada anterior e a próxima
+        j = i
+        while j < len(chunks) and positions[j] is None:
+            j += 1
+        lo = max((p for p in positions[:i] if p is not None), default=-1)
+        hi = positions[j] if j < len(chunks) else len(blocks)
+        group = [chunk for _, chunk in chunks[i:j]]
+        gap = [h for h in holes if lo < h < hi and h not in placed][-len(group):]
+        if gap:
+            for hole, chunk in zip(gap, group):
+                placed[hole] = [chunk]
+            placed[gap[-1]].extend(group[len(gap):])
+        elif lo >= 0:
+            placed[lo].extend(group)
+        else:
+            before.setdefault(hi, []).extend(group)
+        i = j
+
+    output = []
+    for index, block in enumerate(blocks):
+        output.extend(before.get(index, []))
+        if index not in placed:
+            output.extend(block)
+        elif index in holes:
+            output.append(block[0])
+            output.extend(placed[index])
+            output.extend(block[1:])
+        else:
+            output.extend(placed[index])
+            # Comentários e linhas em branco que seguiam a lacuna
+            output.extend(l for l in block[1:] if not l.strip() or l.lstrip().startswith("#"))
+    output.extend(before.get(len(blocks), []))
+    return "\n".join(output) + "\n"
+
+
+# --- Worker (executado nos processos do pool) ---
+
+_preamble_namespace: dict = {}
+
+
+class ExerciseTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise ExerciseTimeout()
+
+
+def warm_worker() -> None:
+    """Inicializa o worker: importa o preâmbulo uma única vez."""
+    exec(PREAMBLE, _preamble_namespace)
+    signal.signal(signal.SIGALRM, _on_alarm)
+
+
+def run_exercise(name: str, exercise: dict, timeout: float) -> dict:
+    """
+    Executa a solução e os testes de um exercício num namespace novo.
+
+    Retorna ``{"error": str | None, "tests": [(passou, mensagem, duração)],
+    "duration": float}``, com o mesmo critério do ValidationService: cada
+    teste roda isolado e uma exceção conta como falha daquele teste.
+    """
+    validation = exercise.get("validation", {})
+    namespace = dict(_preamble_namespace)
+    namespace["__name__"] = "__main__"
+    stdout = io.StringIO()
+    tests = []
+    error = None
+
+    code = complete_starter(exercise.get("starterCode", ""), exercise["solution"])
+    start = time.perf_counter()
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(io.StringIO()):
+            exec(compile(code, f"{name}/solution", "exec"), namespace)
+            if validation.get("type", "assert") == "output":
+                expected = validation.get("expected_output", "").strip()
+                actual = stdout.getvalue().strip()
+                message = "" if actual == expected else f"Saída diferente: {actual[:200]!r}"
+                tests.append((actual == expected, message, time.perf_counter() - start))
+            else:
+                for i, test in enumerate(validation.get("tests", []), 1):
+                    test_start = time.perf_counter()
+                    try:
+                        exec(compile(test, f"{name}/test-{i}", "exec"), namespace)
+                        tests.append((True, "", time.perf_counter() - test_start))
+                    except AssertionError as e:
+                        tests.append((False, str(e) or test, time.perf_counter() - test_start))
+                    except ExerciseTimeout:
+                        raise
+                    except Exception as e:
+                        tests.append(
+                            (False, f"{type(e).__name__}: {e}", time.perf_counter() - test_start)
+                        )
+    except ExerciseTimeout:
+        error = f"Timeout após {timeout}s"
+    except BaseException:
+        error = traceback.format_exc(limit=-1).strip().splitlines()[-1]
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+    return {"error": error, "tests": tests, "duration": time.perf_counter() - start}
+
+
+# --- Orquestração ---
+
+
+def summarize(name: str, runs: list[dict], slow_threshold: float) -> ExerciseReport:
+    """Combina as execuções repetidas de um exercício num relatório."""
+    report = ExerciseReport(name, runs=len(runs))
+    report.duration = round(statistics.median(r["duration"] for r in runs), 4)
+    report.slow = report.duration > slow_threshold
+
+    outcomes = [
+        (r["error"], tuple(passed for passed, _, _ in r["tests"])) for r in runs
+    ]
+    failing = [r for r in runs if r["error"] or not all(p for p, _, _ in r["tests"])]
+
+    if failing and len(failing) < len(runs):
+        report.status = "flaky"
+    elif failing:
+        report.status = "failed"
+    elif len(set(outcomes)) > 1:
+        report.status = "flaky"
+
+    for run in failing[:1]:
+        if run["error"]:
+            report.errors.append(f"[{name}] Solução falhou: {run['error']}")
+        for i, (passed, message, _) in enumerate(run["tests"], 1):
+            if not passed:
+                report.errors.append(f"[{name}] Teste {i} falhou com a solução: {message}")
+    if report.status == "flaky":
+        report.errors.insert(
+            0, f"[{name}] Instável: falhou em {len(failing)} de {len(runs)} execuções"
+        )
+
+    complete = [r["tests"] for r in runs if not r["error"]]
+    if complete and len({len(t) for t in complete}) == 1:
+        report.test_durations = [
+            round(statistics.median(t[i][2] for t in complete), 4)
+            for i in range(len(complete[0]))
+        ]
+    return report
+
+
+def run_exercises(
+    exercises: dict[str, dict],
+    workers: int,
+    repeat: int,
+    timeout: float,
+    slow_threshold: float,
+) -> list[ExerciseReport]:
+    """Executa cada exercício ``repeat`` vezes num pool de workers quentes."""
+    runs: dict[str, list[dict]] = {name: [] for name in exercises}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_worker) as pool:
+        # Repetições intercaladas, para caírem em workers (e estados de RNG) diferentes
+        futures = {
+            pool.submit(run_exercise, name, exercise, timeout): name
+            for _ in range(repeat)
+            for name, exercise in exercises.items()
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                runs[name].append(future.result())
+            except BrokenProcessPool:
+                runs[name].append(
+                    {"error": "O processo do worker morreu", "tests": [], "duration": 0.0}
+                )
+
+    return [summarize(name, runs[name], slow_threshold) for name in exercises]
+
+
+def torch_installed() -> bool:
+    try:
+        metadata.version("torch")
+        return True
+    except metadata.PackageNotFoundError:
+        return False
+
+
 def main():
-    content_dir = Path("content")
+    parser = argparse.ArgumentParser(description="Verifica a integridade do conteúdo do curso")
+    parser.add_argument("--content-dir", type=Path, default=Path("content"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Execuções por exercício (detecta instáveis)"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=10, help="Timeout por execução (s), como na validação"
+    )
+    parser.add_argument(
+        "--slow", type=float, default=2.0, help="Exercícios mais lentos que isso (s) são avisados"
+    )
+    parser.add_argument("--no-exec", action="store_true", help="Não executa as soluções")
+    parser.add_argument("--report", type=Path, help="Relatório JSON")
+    args = parser.parse_args()
+
+    content_dir = args.content_dir
     if not content_dir.exists():
-        print("Erro: Diretório 'content' não encontrado")
+        print(f"Erro: Diretório '{content_dir}' não encontrado")
         return 1
 
-    # Listar todos os módulos
-    modules = [d for d in sorted(content_dir.iterdir()) if d.is_dir() and not d.name.startswith(".")]
-    all_module_ids = {m.name for m in modules}
+    started = time.perf_counter()
+
+    # Listar e ler todos os módulos
+    module_dirs = [d for d in sorted(content_dir.iterdir()) if d.is_dir() and not d.name.startswith(".")]
+    modules = [load_module(d) for d in module_dirs]
+    all_module_ids = {m.module_id for m in modules}
 
     print(f"Verificando {len(modules)} módulos...\n")
 
     all_errors = []
-    for module_dir in modules:
-        errors = verify_module(module_dir, all_module_ids)
-        all_errors.extend(errors)
+    for module in modules:
+        all_errors.extend(verify_module(module, all_module_ids))
+    all_errors.extend(verify_prerequisite_graph(modules))
+
+    # Compilar soluções e testes
+    runnable = {}
+    reports = []
+    for module in modules:
+        for ex_id, exercise in (module.exercises or {}).items():
+            name = f"{module.module_id}/{ex_id}"
+            errors = compile_exercise(name, exercise)
+            if errors:
+                all_errors.extend(errors)
+                reports.append(ExerciseReport(name, status="invalid", errors=errors))
+            else:
+                runnable[name] = exercise
+
+    # Executar soluções contra os testes
+    warnings = []
+    if args.no_exec:
+        reports.extend(ExerciseReport(name, status="skipped") for name in runnable)
+    elif not torch_installed():
+        print("Aviso: torch não está instalado; as soluções não serão executadas\n")
+        reports.extend(ExerciseReport(name, status="skipped") for name in runnable)
+    elif runnable:
+        print(f"Executando {len(runnable)} soluções ({args.repeat}x cada)...\n")
+        executed = run_exercises(
+            runnable, max(1, args.workers), max(1, args.repeat), args.timeout, args.slow
+        )
+        for report in executed:
+            all_errors.extend(report.errors)
+            if report.slow:
+                warnings.append(f"[{report.name}] Lento: {report.duration:.2f}s (mediana)")
+        reports.extend(executed)
+
+    total_time = time.perf_counter() - started
+
+    if args.report:
+        summary = {}
+        for report in reports:
+            summary[report.status] = summary.get(report.status, 0) + 1
+        args.report.write_text(
+            json.dumps(
+                {
+                    "modules": len(modules),
+                    "total_time": round(total_time, 3),
+                    "summary": summary,
+                    "slow": sum(r.slow for r in reports),
+                    "errors": all_errors,
+                    "warnings": warnings,
+                    "exercises": [asdict(r) for r in reports],
+                },
+                indent=2,
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+
+    if warnings:
+        print("AVISOS:")
+        for warning in warnings:
+            print(f"  ! {warning}")
+        print()
 
     if all_errors:
         print("ERROS ENCONTRADOS:")
         for error in all_errors:
             print(f"  ✗ {error}")
-        print(f"\nTotal: {len(all_errors)} erros")
+        print(f"\nTotal: {len(all_errors)} erros ({total_time:.1f}s)")
         return 1
     else:
-        print("✓ Todos os módulos verificados com sucesso!")
+        print(f"✓ Todos os módulos verificados com sucesso! ({total_time:.1f}s)")
         return 0
 
 